@@ -1,23 +1,13 @@
-import time
-from django import conf
 import google.generativeai as genai  # Keep LLM import here if resolver uses it
 import json
 import re
 from abc import ABC, abstractmethod
+from typing import List, Optional
 from world import WorldState
 import config
-try:
-    # Also catch general API errors
-    from google.api_core.exceptions import ResourceExhausted, GoogleAPICallError
-except ImportError:
-    # Provide fallback or raise an error if the necessary library is not installed
-    print("Warning: google-api-core not installed. API error handling may not work correctly.")
 
-    class ResourceExhausted(Exception):
-        pass  # Define a dummy exception if import fails
-
-    class GoogleAPICallError(Exception):
-        pass  # Define a dummy exception if import fails
+# Optional "loudness: <n>" parameter of any action (see _split_loudness)
+LOUDNESS_PATTERN = re.compile(r"\s*,?\s*loudness:\s*(\d+)\s*,?", re.IGNORECASE)
 
 
 class BaseActionResolver(ABC):
@@ -45,6 +35,7 @@ class BaseActionResolver(ABC):
                 "action_type": "MOVE" | "SPEAK" | "INTERACT" | "OBSERVE" | "WAIT" | "FAIL" | "UNKNOWN",
                 "parameters": dict, # Action specific details derived by the resolver
                 "outcome_description": str, # What an observer sees happen
+                "event_radius": int, # Optional: moves away the outcome can be perceived (loud actions)
                 # List of direct state changes, e.g., [('agent_location', agent_name, 'NewLoc'), ('lock_state', 'ShelterDoor', False)]
                 "world_state_updates": list,
             }
@@ -52,6 +43,41 @@ class BaseActionResolver(ABC):
         """
         pass
 
+    def follow_route(self, agent_name: str, agent_location: str, world_state) -> Optional[dict]:
+        """
+        Resolves the next hop of a multi-hop MOVE in progress locally, without an LLM
+        call. Returns None (the agent plans as usual) if the agent is not on a route.
+        """
+        route = world_state.get_agent_route(agent_name)
+        if not route or route[0] not in world_state.get_reachable_locations(agent_location):
+            return None
+        next_hop, destination = route[0], route[-1]
+        if next_hop == destination:
+            outcome_description = f"{agent_name} reaches the {destination}."
+        else:
+            outcome_description = f"{agent_name} walks on through the {next_hop} towards the {destination}."
+        return {
+            "success": True,
+            "action_type": "MOVE",
+            "parameters": {"destination": next_hop, "route": list(route)},
+            "outcome_description": outcome_description,
+            "world_state_updates": [('agent_location', agent_name, next_hop)],
+        }
+
+    @staticmethod
+    def _split_loudness(params_str: str):
+        """Removes an optional "loudness: <n>" entry from the parameters; returns (rest, event radius)."""
+        match = LOUDNESS_PATTERN.search(params_str)
+        if not match:
+            return params_str, 0
+        radius = min(int(match.group(1)), getattr(config, 'EVENT_MAX_RADIUS', 3))
+        return (params_str[:match.start()] + ", " + params_str[match.end():]).strip(" ,"), radius
+
+    @staticmethod
+    def _route_updates(agent_name: str, path: List[str]) -> List[tuple]:
+        """Updates starting a multi-hop MOVE: the first hop now, the rest on the agent's next turns."""
+        return [('agent_location', agent_name, path[1]), ('agent_route', agent_name, path[2:])]
+
 
 class LLMActionResolver(BaseActionResolver):
     """
@@ -67,17 +93,10 @@ class LLMActionResolver(BaseActionResolver):
         # Maybe pass specific rule functions or data? For now, keep it simple.
         self.world_ref = world_state_ref_for_prompting_rules  # Use carefully
 
-    def resolve(self, agent_name: str, agent_location: str, action_output: str, world_state: WorldState) -> dict:
-        if config.SIMULATION_MODE == 'debug' or config.SIMULATION_MODE == 'only_resolver':
-            print(
-                f"[LLM Resolver @ {agent_location}]: Resolving for {agent_name}: '{action_output}'\n")
-
-        # 1. Craft Prompt (Similar to old Interpreter prompt, but focused on resolution)
-        prompt = f"""You are the Action Resolver for a simulation.
-Agent '{agent_name}' at location '{agent_location}' intends to: "{action_output}"
-
-This is what the agent '{agent_name}' senses about the world:
-{world_state.get_static_context_for_agent(agent_name)}
+    def _prompt_prefix(self, agent_name: str) -> str:
+        """Stable part of the prompt (task, format spec, examples), reused across calls for an agent."""
+        return f"""You are the Action Resolver for a simulation.
+Each request gives you what an agent intends to do and what that agent senses about the world.
 
 Analyze the agent's intent. 
 Is it possible? 
@@ -94,6 +113,7 @@ Output your analysis as a single line of text with exactly four parts, separated
     - For OBSERVE: "target: <what_is_observed>"
     - For WAIT: "duration: <e.g., a moment, briefly>"
     - For FAIL or UNKNOWN: This part can be a brief reason for failure/unknown, or left empty if the reason is clear from the outcome description.
+    - Only if the action is loud enough to be heard from nearby locations (a gunshot, an engine starting, a scream), add ", loudness: <number of locations away it can be heard, 1 to 3>".
 4.  Outcome Description: A sentence describing what an observer sees happen.
 
 Examples of the single-line output format:
@@ -106,10 +126,28 @@ Intent: "wait a moment" -> SUCCESS | WAIT | duration: a moment | {agent_name} wa
 Intent: "fly to the moon" (if impossible) -> FAILURE | FAIL | reason: impossible action | {agent_name} attempts an impossible action.
 
 Ensure your output is a single line in this exact format:
-SUCCESS_STATUS | ACTION_TYPE | PARAMETERS | OUTCOME_DESCRIPTION
+SUCCESS_STATUS | ACTION_TYPE | PARAMETERS | OUTCOME_DESCRIPTION"""
+
+    def _prompt_suffix(self, agent_name: str, agent_location: str, action_output: str, world_state: WorldState) -> str:
+        """Volatile part of the prompt (the intent and the agent's world context)."""
+        return f"""Agent '{agent_name}' at location '{agent_location}' intends to: "{action_output}"
+
+This is what the agent '{agent_name}' senses about the world:
+{world_state.get_static_context_for_agent(agent_name)}
+
 Your single-line output:
 """
 
+    def resolve(self, agent_name: str, agent_location: str, action_output: str, world_state: WorldState) -> dict:
+        if config.SIMULATION_MODE == 'debug' or config.SIMULATION_MODE == 'only_resolver':
+            print(
+                f"[LLM Resolver @ {agent_location}]: Resolving for {agent_name}: '{action_output}'\n")
+
+        # 1. Craft Prompt (Similar to old Interpreter prompt, but focused on resolution)
+        # Sent as [prefix, suffix] so the stable prefix can be context-cached (llm/context_cache.py)
+        prompt = [self._prompt_prefix(agent_name),
+                  self._prompt_suffix(agent_name, agent_location, action_output, world_state)]
+
         # 2. Call LLM & Parse
         try:
             response = self.llm.generate_content(prompt)
@@ -133,7 +171,9 @@ Your single-line output:
 
                 # --- Start: Simplified Targeted Parameter Parsing ---
                 action_params = {}
-                text_to_parse = params_str.strip()
+                text_to_parse, event_radius = self._split_loudness(params_str.strip())
+                if event_radius:
+                    resolved_action["event_radius"] = event_radius
                 # action_type_upper is already set in resolved_action["action_type"]
 
                 # (Existing parameter parsing logic - condensed for brevity)
@@ -255,7 +295,7 @@ Your single-line output:
                         # world_state_updates remains empty for the move
                     elif destination == agent_location:
                         resolved_action["success"] = True
-                    elif destination not in world_state.location_descriptions:
+                    elif destination not in world_state.locations:
                         objects_in_destination = world_state.get_location_property(
                             agent_location, "contains")
                         if config.SIMULATION_MODE == 'debug':
@@ -286,9 +326,17 @@ Your single-line output:
 
                         # world_state_updates remains empty for the move
                     elif destination not in world_state.get_reachable_locations(agent_location):
-                        resolved_action["success"] = False
-                        resolved_action["outcome_description"] = f"{agent_name} tries to move to '{destination}' from {agent_location}, but there is no direct path."
-                        # world_state_updates remains empty for the move
+                        # Not a direct exit: walk the shortest route, one hop per turn, with no further LLM calls
+                        path = world_state.find_path(agent_location, destination) if getattr(
+                            config, 'MULTI_HOP_MOVES', True) else None
+                        if path is None:
+                            resolved_action["success"] = False
+                            resolved_action["outcome_description"] = f"{agent_name} tries to move to '{destination}' from {agent_location}, but there is no direct path."
+                            # world_state_updates remains empty for the move
+                        elif llm_says_move_successful:
+                            action_params["route"] = path[1:]
+                            resolved_action["world_state_updates"].extend(
+                                self._route_updates(agent_name, path))
                     else:
                         # Destination is valid, known, and reachable.
                         # Proceed with the move only if the LLM *also* considered it a success.
@@ -314,22 +362,17 @@ Your single-line output:
                             resolved_action["success"] = True
                         else:
                             # Verify the object exists in the agent's current location
-                            current_location_items = world_state.get_location_property(
-                                agent_location, "contains")
-                            item_found_in_location = False
-                            if isinstance(current_location_items, list):
-                                for item_data in current_location_items:
-                                    if isinstance(item_data, dict) and item_data.get("object") == object_name:
-                                        item_found_in_location = True
-                                        # Object found, create update for its state
-                                        resolved_action["world_state_updates"].append(
-                                            ('item_state', agent_location,
-                                             object_name, new_object_state)
-                                        )
-                                        # LLM's outcome_description is generally used.
-                                        # Optionally, refine if needed:
-                                        # resolved_action["outcome_description"] = f"{agent_name} interacts with {object_name}, changing its state to '{new_object_state}'."
-                                        break  # Item found and update added
+                            item_data = world_state.get_item(agent_location, object_name)
+                            item_found_in_location = item_data is not None
+                            if item_found_in_location:
+                                # Object found, create update for its state (under its canonical name)
+                                resolved_action["world_state_updates"].append(
+                                    ('item_state', agent_location,
+                                     item_data.get("object"), new_object_state)
+                                )
+                                # LLM's outcome_description is generally used.
+                                # Optionally, refine if needed:
+                                # resolved_action["outcome_description"] = f"{agent_name} interacts with {object_name}, changing its state to '{new_object_state}'."
 
                             if not item_found_in_location:
                                 resolved_action["success"] = True
@@ -351,7 +394,7 @@ Your single-line output:
 
                     if msg:
                         if target_agent:
-                            if target_agent in world_state.get_agents_at(agent_location):
+                            if world_state.is_agent_at(target_agent, agent_location):
                                 resolved_action["outcome_description"] = f"{agent_name} to {target_agent}, \"{msg}\""
                             elif target_agent in world_state.registered_agents:
                                 resolved_action["outcome_description"] = f"{agent_name} tries to speak to {target_agent} but {target_agent} is not close enough to hear it."
@@ -372,12 +415,6 @@ Your single-line output:
                     "outcome_description": f"{agent_name} provides an unclear response ('{raw_output}').",
                     "world_state_updates": []
                 }
-        except ResourceExhausted as e:
-            print(
-                f"[{self.name} Error]: LLM generation failed: {e}. Waiting 10 seconds and retrying...")
-            time.sleep(10)
-            return self.resolve(agent_name, agent_location, action_output, world_state)
-
         except Exception as e:
             print(f"[LLM Resolver Error]: LLM call or processing failed: {e}")
             # Check for response object and prompt feedback if available
@@ -406,17 +443,10 @@ class LLMActionResolverWithReason(BaseActionResolver):
         # Maybe pass specific rule functions or data? For now, keep it simple.
         self.world_ref = world_state_ref_for_prompting_rules  # Use carefully
 
-    def resolve(self, agent_name: str, agent_location: str, action_output: str, world_state: WorldState) -> dict:
-        if config.SIMULATION_MODE == 'debug' or config.SIMULATION_MODE == 'only_resolver':
-            print(
-                f"[LLM Resolver @ {agent_location}]: Resolving for {agent_name}: '{action_output}'\n")
-
-        # 1. Craft Prompt (Similar to old Interpreter prompt, but focused on resolution)
-        prompt = f"""You are the Action Resolver for a simulation.
-Agent '{agent_name}' at location '{agent_location}' intends to: "{action_output}"
-
-This is what the agent '{agent_name}' senses about the world:
-{world_state.get_static_context_for_agent(agent_name)}
+    def _prompt_prefix(self, agent_name: str) -> str:
+        """Stable part of the prompt (task, format spec, examples), reused across calls for an agent."""
+        return f"""You are the Action Resolver for a simulation.
+Each request gives you what an agent intends to do and what that agent senses about the world.
 
 Analyze the agent's intent. 
 Is it possible? 
@@ -433,6 +463,7 @@ Output your analysis as a single line of text with exactly four parts, separated
     - For OBSERVE: "target: <what_is_observed>"
     - For WAIT: "duration: <e.g., a moment, briefly>"
     - For FAIL or UNKNOWN: This part can be a brief reason for failure/unknown, or left empty if the reason is clear from the outcome description.
+    - Only if the action is loud enough to be heard from nearby locations (a gunshot, an engine starting, a scream), add ", loudness: <number of locations away it can be heard, 1 to 3>".
 4.  Outcome Description: Describe what an observer sees happen.
 5. Outcome Reason: A sentence explaining why the agent took that action.
 
@@ -446,10 +477,28 @@ Intent: "wait a moment" -> SUCCESS | WAIT | duration: a moment | {agent_name} wa
 Intent: "fly to the moon" (if impossible) -> FAILURE | FAIL | reason: impossible action | {agent_name} attempts an impossible action.
 
 Ensure your output is a single line in this exact format:
-SUCCESS_STATUS | ACTION_TYPE | PARAMETERS | OUTCOME_DESCRIPTION | OUTCOME_REASON
+SUCCESS_STATUS | ACTION_TYPE | PARAMETERS | OUTCOME_DESCRIPTION | OUTCOME_REASON"""
+
+    def _prompt_suffix(self, agent_name: str, agent_location: str, action_output: str, world_state: WorldState) -> str:
+        """Volatile part of the prompt (the intent and the agent's world context)."""
+        return f"""Agent '{agent_name}' at location '{agent_location}' intends to: "{action_output}"
+
+This is what the agent '{agent_name}' senses about the world:
+{world_state.get_static_context_for_agent(agent_name)}
+
 Your single-line output:
 """
 
+    def resolve(self, agent_name: str, agent_location: str, action_output: str, world_state: WorldState) -> dict:
+        if config.SIMULATION_MODE == 'debug' or config.SIMULATION_MODE == 'only_resolver':
+            print(
+                f"[LLM Resolver @ {agent_location}]: Resolving for {agent_name}: '{action_output}'\n")
+
+        # 1. Craft Prompt (Similar to old Interpreter prompt, but focused on resolution)
+        # Sent as [prefix, suffix] so the stable prefix can be context-cached (llm/context_cache.py)
+        prompt = [self._prompt_prefix(agent_name),
+                  self._prompt_suffix(agent_name, agent_location, action_output, world_state)]
+
         # 2. Call LLM & Parse
         try:
             response = self.llm.generate_content(prompt)
@@ -474,7 +523,9 @@ Your single-line output:
 
                 # --- Start: Simplified Targeted Parameter Parsing ---
                 action_params = {}
-                text_to_parse = params_str.strip()
+                text_to_parse, event_radius = self._split_loudness(params_str.strip())
+                if event_radius:
+                    resolved_action["event_radius"] = event_radius
                 # action_type_upper is already set in resolved_action["action_type"]
 
                 # (Existing parameter parsing logic - condensed for brevity)
@@ -596,7 +647,7 @@ Your single-line output:
                         # world_state_updates remains empty for the move
                     elif destination == agent_location:
                         resolved_action["success"] = True
-                    elif destination not in world_state.location_descriptions:
+                    elif destination not in world_state.locations:
                         objects_in_destination = world_state.get_location_property(
                             agent_location, "contains")
                         if config.SIMULATION_MODE == 'debug':
@@ -627,9 +678,17 @@ Your single-line output:
 
                         # world_state_updates remains empty for the move
                     elif destination not in world_state.get_reachable_locations(agent_location):
-                        resolved_action["success"] = False
-                        resolved_action["outcome_description"] = f"{agent_name} tries to move to '{destination}' from {agent_location}, but there is no direct path."
-                        # world_state_updates remains empty for the move
+                        # Not a direct exit: walk the shortest route, one hop per turn, with no further LLM calls
+                        path = world_state.find_path(agent_location, destination) if getattr(
+                            config, 'MULTI_HOP_MOVES', True) else None
+                        if path is None:
+                            resolved_action["success"] = False
+                            resolved_action["outcome_description"] = f"{agent_name} tries to move to '{destination}' from {agent_location}, but there is no direct path."
+                            # world_state_updates remains empty for the move
+                        elif llm_says_move_successful:
+                            action_params["route"] = path[1:]
+                            resolved_action["world_state_updates"].extend(
+                                self._route_updates(agent_name, path))
                     else:
                         # Destination is valid, known, and reachable.
                         # Proceed with the move only if the LLM *also* considered it a success.
@@ -655,22 +714,17 @@ Your single-line output:
                             resolved_action["success"] = True
                         else:
                             # Verify the object exists in the agent's current location
-                            current_location_items = world_state.get_location_property(
-                                agent_location, "contains")
-                            item_found_in_location = False
-                            if isinstance(current_location_items, list):
-                                for item_data in current_location_items:
-                                    if isinstance(item_data, dict) and item_data.get("object") == object_name:
-                                        item_found_in_location = True
-                                        # Object found, create update for its state
-                                        resolved_action["world_state_updates"].append(
-                                            ('item_state', agent_location,
-                                             object_name, new_object_state)
-                                        )
-                                        # LLM's outcome_description is generally used.
-                                        # Optionally, refine if needed:
-                                        # resolved_action["outcome_description"] = f"{agent_name} interacts with {object_name}, changing its state to '{new_object_state}'."
-                                        break  # Item found and update added
+                            item_data = world_state.get_item(agent_location, object_name)
+                            item_found_in_location = item_data is not None
+                            if item_found_in_location:
+                                # Object found, create update for its state (under its canonical name)
+                                resolved_action["world_state_updates"].append(
+                                    ('item_state', agent_location,
+                                     item_data.get("object"), new_object_state)
+                                )
+                                # LLM's outcome_description is generally used.
+                                # Optionally, refine if needed:
+                                # resolved_action["outcome_description"] = f"{agent_name} interacts with {object_name}, changing its state to '{new_object_state}'."
 
                             if not item_found_in_location:
                                 resolved_action["success"] = True
@@ -692,7 +746,7 @@ Your single-line output:
 
                     if msg:
                         if target_agent:
-                            if target_agent in world_state.get_agents_at(agent_location):
+                            if world_state.is_agent_at(target_agent, agent_location):
                                 resolved_action["outcome_description"] = f"{agent_name} to {target_agent}, \"{msg}\""
                             elif target_agent in world_state.registered_agents:
                                 resolved_action["outcome_description"] = f"{agent_name} tries to speak to {target_agent} but {target_agent} is not close enough to hear it."
@@ -714,12 +768,6 @@ Your single-line output:
                     "outcome_description": f"{agent_name} provides an unclear response ('{raw_output}').",
                     "world_state_updates": []
                 }
-        except ResourceExhausted as e:
-            print(
-                f"[{self.name} Error]: LLM generation failed: {e}. Waiting 10 seconds and retrying...")
-            time.sleep(10)
-            return self.resolve(agent_name, agent_location, action_output, world_state)
-
         except Exception as e:
             print(f"[LLM Resolver Error]: LLM call or processing failed: {e}")
             # Check for response object and prompt feedback if available
@@ -1,6 +1,8 @@
 # agent.py
+import copy
 from agent.memory import BaseMemory
 from agent.planning import BasePlanning
+from event_arena import perception_entry
 # from world import WorldState
 import config
 class Agent:
@@ -17,14 +19,33 @@ class Agent:
         self.action_buffer = None  # Store the output of plan() before resolution
         print(f"Agent {name} initialized with {type(memory_module).__name__} and {type(planning_module).__name__}.")
 
+    def fork(self) -> 'Agent':
+        """
+        Returns a copy of this agent for a branch run (see WorldState.fork). Goals and
+        intent are copied, memory is forked (entries shared), the planning module is shared.
+        """
+        clone = copy.copy(self)
+        clone.goals = list(self.goals)
+        clone.memory = self.memory.fork(clone)
+        return clone
+
     def perceive(self, event):
         """Processes a perceived event from the world and stores it in memory."""
-        # Simple formatting for now, could be more sophisticated
-        perception_text = f"You just perceived in step {event.step} of the simulation the following event at {event.location}{f' by {event.triggered_by}' if event.triggered_by else ''}: {event.description}"
+        # A shared arena entry formatted by _perception_text when a prompt is built (text for eager memories)
+        perception_text = perception_entry(event, Agent._perception_text, self.memory.RENDERS_EAGERLY)
         self.memory.add_observation(perception_text)
         # if config.SIMULATION_MODE == 'debug': -------------------------------------------------> temporally disabled
         #     print(f"DEBUG {self.name} Perceived: {perception_text}") # Optional debug
 
+    def perceive_batch(self, events):
+        """Stores several perceived events (an EventQueue flush) with one memory write."""
+        eager = self.memory.RENDERS_EAGERLY
+        self.memory.add_observations([perception_entry(event, Agent._perception_text, eager) for event in events])
+
+    @staticmethod
+    def _perception_text(event) -> str:
+        return f"You just perceived in step {event.step} of the simulation the following event at {event.location}{f' by {event.triggered_by}' if event.triggered_by else ''}: {event.description}"
+
     def add_goal(self, goal_description: str):
         """Adds a new goal to the agent's list."""
         if goal_description not in self.goals:
@@ -39,18 +60,28 @@ class Agent:
         Agent's thinking cycle. Uses memory, goals, and planning to decide next action intent.
         Does NOT execute the action, just returns the intended output.
         """
-        # 1. Get memory context
-        memory_context = self.memory.get_memory_context()
-
-        # 2. Get minimal static world context (if needed by the thinker)
-        static_context = world_state.get_static_context_for_agent(self.name)
+        # 1-2. Get memory context and minimal static world context
+        static_context, memory_context = self.planning_inputs(world_state)
 
         # 3. Plan (call the planning module)
         # Pass agent reference (for personality/goals), static context, and memory context
         action_output = self.planning.generate_output(
             self, static_context, memory_context)
 
-        # 4. Store intended action (important!)
+        # 4. Store intended action
+        return self.adopt_intent(action_output, world_state)
+
+    def planning_inputs(self, world_state):
+        """Returns the (static world context, memory context) pair the planning prompt is built from."""
+        memory_context = self.memory.get_memory_context()
+        static_context = world_state.get_static_context_for_agent(self.name)
+        return static_context, memory_context
+
+    def adopt_intent(self, action_output: str, world_state):
+        """
+        Stores an intended action as this agent's plan for the turn, whether it came from
+        plan() or from a batch planner that planned several agents in one request.
+        """
         self.action_buffer = action_output
         # Also add own *intended* action to memory for self-reflection
         observation = f"You {self.name} intended in step {world_state.current_step} of the simulation the following action at {world_state.agent_locations[self.name]}: {action_output}"
@@ -1,33 +1,67 @@
 # memory.py
-import time
+import copy
 import config
 import google.generativeai as genai  # Add this import
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING, Optional, List, Dict, Any
+from concurrent.futures import Future
+from collections import deque
+from typing import TYPE_CHECKING, Deque, Optional, List, Dict, Any
+from llm.client import AsyncLLMClient
 if TYPE_CHECKING:
     from agent import Agent
-try:
-    # Also catch general API errors
-    from google.api_core.exceptions import ResourceExhausted, GoogleAPICallError
-except ImportError:
-    # Provide fallback or raise an error if the necessary library is not installed
-    print("Warning: google-api-core not installed. API error handling may not work correctly.")
-
-    class ResourceExhausted(Exception):
-        pass  # Define a dummy exception if import fails
-
-    class GoogleAPICallError(Exception):
-        pass  # Define a dummy exception if import fails
+
+
+def _memory_entry(observation: Any) -> Any:
+    """Short-term entry for an observation: stripped text, or an arena ref (event_arena.py) kept as is."""
+    return observation.strip() if isinstance(observation, str) else observation
+
+
+# SimpleMemory's context: _RECOLLECTIONS + the buffer, or _NO_MEMORIES when it is empty
+_RECOLLECTIONS = "Recollections (most recent last):\n"
+_RECOLLECTIONS_LENGTH = len(_RECOLLECTIONS)
+_NO_MEMORIES = "No specific memories recalled."
+
+
 # --- Base Memory Class ---
 
 
 class BaseMemory(ABC):
     """Abstract base class for agent memory modules."""
 
+    # Attributes holding what the memory has accumulated; saved in checkpoints.
+    STATE_ATTRIBUTES: tuple = ()
+    # True when add_observation formats entries right away: such memories get perceived
+    # events as text rather than as event arena refs (see event_arena.perception_entry).
+    RENDERS_EAGERLY: bool = False
+
     def __init__(self, agent: 'Agent'):
         """Initializes the memory module, linking it to its agent."""
         self.agent = agent  # Store the agent reference
 
+    def get_state(self) -> Dict[str, Any]:
+        """Returns the accumulated memory as plain data (for checkpoints)."""
+        return {name: getattr(self, name) for name in self.STATE_ATTRIBUTES}
+
+    def set_state(self, state: Dict[str, Any]):
+        """Restores memory saved by get_state()."""
+        for name in self.STATE_ATTRIBUTES:
+            if name in state:
+                setattr(self, name, state[name])
+
+    def fork(self, agent: 'Agent') -> 'BaseMemory':
+        """
+        Returns a copy of this memory for a forked agent (see Agent.fork). The entries
+        are shared; only the containers holding them are copied, so what either side
+        adds afterwards stays its own.
+        """
+        clone = copy.copy(self)
+        clone.agent = agent
+        for name in self.STATE_ATTRIBUTES:
+            value = getattr(self, name)
+            if isinstance(value, (list, dict)):
+                setattr(clone, name, copy.copy(value))
+        return clone
+
     @abstractmethod
     def add_observation(self, observation_text: str, step: Optional[int] = None, type: str = "Generic"):
         """Adds a piece of information to memory.
@@ -39,6 +73,12 @@ class BaseMemory(ABC):
         """
         pass
 
+    def add_observations(self, observation_texts: List[str], step: Optional[int] = None, type: str = "Generic"):
+        """Adds several observations at once (a batch of perceived events). Memories with
+        reflections override it to check the reflection trigger once per batch."""
+        for observation_text in observation_texts:
+            self.add_observation(observation_text, step=step, type=type)
+
     @abstractmethod
     def get_memory_context(self, **kwargs) -> str:
         """Returns a string summary of relevant memories for the LLM prompt.
@@ -53,57 +93,228 @@ class BaseMemory(ABC):
 
 
 class SimpleMemory(BaseMemory):
-    """A basic rolling string buffer memory."""
+    """
+    A basic rolling text buffer memory. The text is kept as a deque of lines with
+    a running character count, so adding and trimming cost O(entry) instead of
+    O(buffer). The context is brought up to date only when read, by cutting what
+    was trimmed off the context last read and adding the lines written since
+    (cheaper than joining every line). While the memory is read after every write
+    it keeps no lines: each entry goes straight into the context, as the plain
+    string buffer did, until a write is not read. Trimming cuts exactly where the
+    plain string buffer did.
+    """
+
+    STATE_ATTRIBUTES = ("memory_buffer",)
+    RENDERS_EAGERLY = True
 
     def __init__(self, agent: 'Agent', max_length: int = config.MAX_MEMORY_TOKENS):
         """Initializes SimpleMemory."""
         super().__init__(agent)
-        self.memory_buffer = ""
         self.max_length = max_length  # Approximate character length
+        # The buffer split on "\n" (empty when the buffer is ""), None while only the context is kept
+        self._lines: Optional[Deque[str]] = deque()
+        self._length = 0  # len(self.memory_buffer)
+        # The context as last read; since then _new_lines lines were added at the end
+        # of _lines and _cut characters trimmed off the front of the buffer
+        self._context = _NO_MEMORIES
+        self._new_lines = 0
+        self._cut = 0
+        self._read_since_write = False
+        self._read_after_each_write = False  # the write before the last one was read too
+
+    @property
+    def memory_buffer(self) -> str:
+        """The buffer text, entries separated by newlines."""
+        context = self.get_memory_context()
+        return context[_RECOLLECTIONS_LENGTH:] if self._length else ""
+
+    @memory_buffer.setter
+    def memory_buffer(self, text: str):
+        self._lines = deque(text.split("\n")) if text else deque()
+        self._length = len(text)
+        self._context = f"{_RECOLLECTIONS}{text}" if text else _NO_MEMORIES
+        self._new_lines = self._cut = 0
+        self._read_since_write = self._read_after_each_write = False
 
     def add_observation(self, observation_text: str, step: Optional[int] = None, type: str = "Generic"):
         """Adds observation text to the buffer, prepending type/step if available."""
-        # Format the entry with available metadata
-        prefix = f"[T:{type}" + \
-            (f" S:{step}" if step is not None else "") + "] "
-        new_entry = prefix + observation_text.strip()
+        # Format the entry with available metadata (arena refs are rendered into the buffer)
+        if step is not None:
+            new_entry = f"[T:{type} S:{step}] {str(observation_text).strip()}"
+        else:
+            new_entry = f"[T:{type}] {str(observation_text).strip()}"
+
+        read = self._read_since_write
+        self._read_since_write = False
+        if read and (self._lines is None or self._read_after_each_write):
+            # Read after every write: append to the context, cutting what is trimmed in the same copy
+            self._lines = None
+            length = self._length
+            context = self._context
+            total = length + 1 + len(new_entry) if length else len(new_entry)
+            if total <= self.max_length:
+                self._context = f"{context}\n{new_entry}" if length else f"{_RECOLLECTIONS}{new_entry}"
+                self._length = total
+                return
+            # Cut at the first newline at or after `excess` in f"{buffer}\n{new_entry}"
+            excess = total - self.max_length
+            if length and excess <= length:
+                first_newline = context.find('\n', _RECOLLECTIONS_LENGTH + excess)
+                if first_newline != -1:
+                    context = f"{_RECOLLECTIONS}{context[first_newline + 1:]}\n{new_entry}"
+                    self._context = context
+                    self._length = len(context) - _RECOLLECTIONS_LENGTH
+                    return
+                rest = new_entry  # the cut falls on the separator
+            else:
+                excess -= length + 1 if length else 0
+                first_newline = new_entry.find('\n', excess)
+                rest = new_entry[first_newline + 1:] if first_newline != -1 else new_entry[excess:]
+            self._context = f"{_RECOLLECTIONS}{rest}" if rest else _NO_MEMORIES
+            self._length = len(rest)
+            return
+
+        self._read_after_each_write = read
+        if self._lines is None:
+            # Written without a read: back to lines
+            self._lines = deque(self._context[_RECOLLECTIONS_LENGTH:].split("\n")) if self._length else deque()
 
         # Add new observation, ensuring separation
-        # Don't overwrite new_entry here
-        if self.memory_buffer:
-            self.memory_buffer = f"{self.memory_buffer}\n{new_entry}"
+        if self._lines:
+            self._length += 1
+        if "\n" in new_entry:
+            entry_lines = new_entry.split("\n")
+            self._lines.extend(entry_lines)
+            self._new_lines += len(entry_lines)
         else:
-            self.memory_buffer = new_entry
+            self._lines.append(new_entry)
+            self._new_lines += 1
+        self._length += len(new_entry)
 
         # Trim if exceeds max length (simple truncation from the beginning)
-        if len(self.memory_buffer) > self.max_length:
-            excess = len(self.memory_buffer) - self.max_length
-            # Try to cut off at a newline to keep entries somewhat intact
-            first_newline = self.memory_buffer.find('\n', excess)
-            if first_newline != -1:
-                self.memory_buffer = self.memory_buffer[first_newline+1:]
-            else:  # If no newline found after excess, just truncate
-                self.memory_buffer = self.memory_buffer[excess:]
-        # if config.SIMULATION_MODE == 'debug':
-        #     # Debug
-        #     print(
-        #         f"DEBUG Memory Add: Added '{new_entry[:50]}...'. Buffer size: {len(self.memory_buffer)}")
+        if self._length > self.max_length:
+            length = self._length
+            self._trim(self._length - self.max_length)
+            self._cut += length - self._length
+
+    def _trim(self, excess: int):
+        """Drops the text up to the first newline at or after offset `excess` (whole lines), or the first `excess` characters if there is none."""
+        lines = self._lines
+        newline_at = -1  # offset of the newline ending the line about to be dropped
+        while len(lines) > 1:
+            newline_at += len(lines[0]) + 1
+            self._length -= len(lines.popleft()) + 1
+            if newline_at >= excess:
+                return
+        # No newline after `excess`: just truncate the last line
+        last = lines[0][excess - newline_at - 1:]
+        if last:
+            lines[0] = last
+        else:
+            lines.clear()
+        self._length = len(last)
 
     def get_memory_context(self, **kwargs) -> str:
         """Returns the entire (potentially trimmed) memory buffer."""
-        if not self.memory_buffer:
-            return "No specific memories recalled."
-        return f"Recollections (most recent last):\n{self.memory_buffer}"
+        self._read_since_write = True
+        if self._new_lines:
+            lines, new_lines = self._lines, self._new_lines
+            if len(lines) > new_lines:
+                # What is left of the last context, then the new lines
+                added = lines[-1] if new_lines == 1 else "\n".join(
+                    [lines[i] for i in range(len(lines) - new_lines, len(lines))])
+                if self._cut:
+                    self._context = f"{_RECOLLECTIONS}{self._context[_RECOLLECTIONS_LENGTH + self._cut:]}\n{added}"
+                else:
+                    self._context = f"{self._context}\n{added}"
+            else:
+                # Nothing is left of it
+                memory_buffer = "\n".join(lines)
+                self._context = f"{_RECOLLECTIONS}{memory_buffer}" if memory_buffer else _NO_MEMORIES
+            self._new_lines = self._cut = 0
+        return self._context
+
+    def fork(self, agent: 'Agent') -> 'BaseMemory':
+        clone = super().fork(agent)
+        clone._lines = deque(self._lines) if self._lines is not None else None
+        return clone
 
     def clear(self):
         self.memory_buffer = ""
 
 # --- Short-Long Term Memory with Reflection ---
 
-class ShortLongTMemory(BaseMemory):
+class ReflectionMixin:
+    """
+    Reflection handling shared by the short/long-term memories: runs a reflection
+    prompt (in the background with ASYNC_REFLECTIONS and an AsyncLLMClient) and
+    stores the result in long_term_memory. Background reflections are collected
+    before the memory is read, saved or forked. Expects reflection_model,
+    long_term_memory and _pending_reflections on the memory.
+    """
+
+    def _generate_reflection(self, full_prompt: str):
+        """Stores a reflection on full_prompt now, or submits it to run in the background."""
+        if self._reflect_in_background():
+            self._pending_reflections.append(
+                self.reflection_model.submit(full_prompt))
+            return
+        try:
+            response = self.reflection_model.generate_content(full_prompt)
+            self._store_reflection(response.text.strip())
+        except Exception as e:
+            print(
+                f"ERROR {self.agent.name}: Failed to generate reflection: {e}")
+            # Optionally add a placeholder LTM entry indicating failure?
+
+    def _reflect_in_background(self) -> bool:
+        """True if reflections should overlap with the simulation instead of blocking it."""
+        return getattr(config, 'ASYNC_REFLECTIONS', False) and isinstance(self.reflection_model, AsyncLLMClient)
+
+    def _store_reflection(self, reflection_text: str):
+        if reflection_text:
+            self.long_term_memory.append(reflection_text)
+            # TEMPORAL ------------------------------------->
+            print(
+                f"DEBUG {self.agent.name} Reflection Added: {reflection_text}")
+
+            if config.SIMULATION_MODE == 'debug':
+                print(
+                    f"DEBUG {self.agent.name} Reflection Added: '{reflection_text[:80]}...'")
+        else:
+            print(
+                f"WARN {self.agent.name}: Reflection generated empty text.")
+
+    def _collect_pending_reflections(self):
+        """Waits for background reflections and stores them in submission order."""
+        while self._pending_reflections:
+            future = self._pending_reflections.pop(0)
+            try:
+                self._store_reflection(future.result().text.strip())
+            except Exception as e:
+                print(
+                    f"ERROR {self.agent.name}: Failed to generate reflection: {e}")
+
+    def get_state(self) -> Dict[str, Any]:
+        # Background reflections belong to the state being saved
+        self._collect_pending_reflections()
+        return super().get_state()
+
+    def fork(self, agent: 'Agent') -> 'BaseMemory':
+        # Background reflections belong to both sides of the fork
+        self._collect_pending_reflections()
+        clone = super().fork(agent)
+        clone._pending_reflections = []
+        return clone
+
+
+class ShortLongTMemory(ReflectionMixin, BaseMemory):
     """Memory storing recent events (short-term) and LLM-generated
        reflections/summaries (long-term). Does NOT use embeddings."""
 
+    STATE_ATTRIBUTES = ("short_term_memory", "long_term_memory",
+                        "unreflected_count", "is_initial_prompt")
+
     def __init__(self, agent: 'Agent', reflection_model_instance: Optional[genai.GenerativeModel] = None, reflection_threshold: int = 5):
         """
         Initializes ShortLongTermMemory.
@@ -122,6 +333,8 @@ class ShortLongTMemory(BaseMemory):
         self.is_initial_prompt = False  # Flag for initial prompt
 
         self.reflection_model = reflection_model_instance
+        # Reflections submitted to the async LLM client, collected before the next prompt
+        self._pending_reflections: List[Future] = []
         
         # Configure and instantiate the reflection model
         try:
@@ -141,7 +354,7 @@ class ShortLongTMemory(BaseMemory):
 
     def add_observation(self, observation_text: str, step: Optional[int] = None, type: str = "Generic"):
         """Adds observation to short-term memory and triggers reflection if threshold is met."""
-        memory_entry = observation_text.strip()
+        memory_entry = _memory_entry(observation_text)
         self.short_term_memory.append(memory_entry)
         self.unreflected_count += 1
                                                                 # TEMPORAL ------------------------------------->
@@ -151,6 +364,15 @@ class ShortLongTMemory(BaseMemory):
             self._reflect()
             self.unreflected_count = 0  # Reset counter after reflection
 
+    def add_observations(self, observation_texts: List[str], step: Optional[int] = None, type: str = "Generic"):
+        """Adds a batch of observations; a batch crossing the threshold triggers one reflection over all of its unreflected entries."""
+        entries = [_memory_entry(observation_text) for observation_text in observation_texts]
+        self.short_term_memory.extend(entries)
+        self.unreflected_count += len(entries)
+        if self.reflection_model and self.unreflected_count >= self.reflection_threshold:
+            self._reflect()
+            self.unreflected_count = 0  # Reset counter after reflection
+
     def _reflect(self):
         """Generates and stores a long-term reflection based on recent short-term memories."""
         if not self.reflection_model:
@@ -161,10 +383,9 @@ class ShortLongTMemory(BaseMemory):
             # Should not happen if called correctly, but safety check
             return
 
-        # Get the most recent memories that haven't been reflected upon yet
-        # For simplicity, we take the last 'reflection_threshold' entries.
-        # A more robust way might track indices, but this works for now.
-        memories_to_reflect = self.short_term_memory[-self.reflection_threshold:]
+        # Get the most recent memories that haven't been reflected upon yet: the
+        # last 'unreflected_count' entries (more than the threshold after a batch)
+        memories_to_reflect = self.short_term_memory[max(0, len(self.short_term_memory) - self.unreflected_count):]
 
         # --- Prepare Prompt for Reflection LLM ---
         # Basic agent context
@@ -201,29 +422,12 @@ class ShortLongTMemory(BaseMemory):
             f"--- Reflection Prompt ---\n{full_prompt}\n-----------------------")
 
         # --- Call LLM for Reflection ---
-        try:
-            response = self.reflection_model.generate_content(full_prompt)
-            reflection_text = response.text.strip()
-
-            if reflection_text:
-                self.long_term_memory.append(reflection_text)
-                print(f"DEBUG {self.agent.name} Reflection Added: {reflection_text}")# TEMPORAL ------------------------------------->
-                
-                if config.SIMULATION_MODE == 'debug':
-                    print(
-                        f"DEBUG {self.agent.name} Reflection Added: '{reflection_text[:80]}...'")
-            else:
-                print(
-                    f"WARN {self.agent.name}: Reflection generated empty text.")
-
-        except Exception as e:
-            print(
-                f"ERROR {self.agent.name}: Failed to generate reflection: {e}")
-            # Optionally add a placeholder LTM entry indicating failure?
+        self._generate_reflection(full_prompt)
 
     def get_memory_context(self, **kwargs) -> str:
         """Returns a formatted string containing both long-term reflections
            and recent short-term observations."""
+        self._collect_pending_reflections()
 
         context = "Core Reflections and Summaries:\n"
         if self.long_term_memory:
@@ -261,16 +465,20 @@ class ShortLongTMemory(BaseMemory):
 
     def clear(self):
         """Clears both short-term and long-term memory."""
+        self._collect_pending_reflections()
         self.short_term_memory = []
         self.long_term_memory = []
         self.unreflected_count = 0
         print(f"DEBUG {self.agent.name}: Memory cleared.")
 
 
-class ShortLongTMemoryIdentityOnly(BaseMemory):
+class ShortLongTMemoryIdentityOnly(ReflectionMixin, BaseMemory):
     """Memory storing recent events (short-term) and LLM-generated
        reflections/summaries (long-term). Does NOT use embeddings."""
 
+    STATE_ATTRIBUTES = ("short_term_memory", "long_term_memory",
+                        "unreflected_count", "is_initial_prompt")
+
     def __init__(self, agent: 'Agent', reflection_model_instance: Optional[genai.GenerativeModel] = None, reflection_threshold: int = 5):
         """
         Initializes ShortLongTermMemory.
@@ -289,6 +497,8 @@ class ShortLongTMemoryIdentityOnly(BaseMemory):
         self.is_initial_prompt = False  # Flag for initial prompt
 
         self.reflection_model = reflection_model_instance
+        # Reflections submitted to the async LLM client, collected before the next prompt
+        self._pending_reflections: List[Future] = []
 
         # Configure and instantiate the reflection model
         try:
@@ -308,7 +518,7 @@ class ShortLongTMemoryIdentityOnly(BaseMemory):
 
     def add_observation(self, observation_text: str, step: Optional[int] = None, type: str = "Generic"):
         """Adds observation to short-term memory and triggers reflection if threshold is met."""
-        memory_entry = observation_text.strip()
+        memory_entry = _memory_entry(observation_text)
         self.short_term_memory.append(memory_entry)
         self.unreflected_count += 1
         # TEMPORAL ------------------------------------->
@@ -318,6 +528,15 @@ class ShortLongTMemoryIdentityOnly(BaseMemory):
             self._reflect()
             self.unreflected_count = 0  # Reset counter after reflection
 
+    def add_observations(self, observation_texts: List[str], step: Optional[int] = None, type: str = "Generic"):
+        """Adds a batch of observations; a batch crossing the threshold triggers one reflection over all of its unreflected entries."""
+        entries = [_memory_entry(observation_text) for observation_text in observation_texts]
+        self.short_term_memory.extend(entries)
+        self.unreflected_count += len(entries)
+        if self.reflection_model and self.unreflected_count >= self.reflection_threshold:
+            self._reflect()
+            self.unreflected_count = 0  # Reset counter after reflection
+
     def _reflect(self):
         """Generates and stores a long-term reflection based on recent short-term memories."""
         if not self.reflection_model:
@@ -328,10 +547,9 @@ class ShortLongTMemoryIdentityOnly(BaseMemory):
             # Should not happen if called correctly, but safety check
             return
 
-        # Get the most recent memories that haven't been reflected upon yet
-        # For simplicity, we take the last 'reflection_threshold' entries.
-        # A more robust way might track indices, but this works for now.
-        memories_to_reflect = self.short_term_memory[-self.reflection_threshold:]
+        # Get the most recent memories that haven't been reflected upon yet: the
+        # last 'unreflected_count' entries (more than the threshold after a batch)
+        memories_to_reflect = self.short_term_memory[max(0, len(self.short_term_memory) - self.unreflected_count):]
 
         # --- Prepare Prompt for Reflection LLM ---
         # Basic agent context
@@ -366,36 +584,12 @@ class ShortLongTMemoryIdentityOnly(BaseMemory):
             f"--- Reflection Prompt ---\n{full_prompt}\n-----------------------")
 
         # --- Call LLM for Reflection ---
-        try:
-            response = self.reflection_model.generate_content(full_prompt)
-            reflection_text = response.text.strip()
-
-            if reflection_text:
-                self.long_term_memory.append(reflection_text)
-                # TEMPORAL ------------------------------------->
-                print(
-                    f"DEBUG {self.agent.name} Reflection Added: {reflection_text}")
-
-                if config.SIMULATION_MODE == 'debug':
-                    print(
-                        f"DEBUG {self.agent.name} Reflection Added: '{reflection_text[:80]}...'")
-            else:
-                print(
-                    f"WARN {self.agent.name}: Reflection generated empty text.")
-        except ResourceExhausted as e:
-            print(
-                f"[{self.agent.name} Error]: LLM generation failed: {e}. Waiting 10 seconds and retrying...")
-            time.sleep(10)
-            return self._reflect()
-        
-        except Exception as e:
-            print(
-                f"ERROR {self.agent.name}: Failed to generate reflection: {e}")
-            # Optionally add a placeholder LTM entry indicating failure?
+        self._generate_reflection(full_prompt)
 
     def get_memory_context(self, **kwargs) -> str:
         """Returns a formatted string containing both long-term reflections
            and recent short-term observations."""
+        self._collect_pending_reflections()
 
         context = "Core Reflections and Summaries:\n"
         if self.long_term_memory:
@@ -433,6 +627,7 @@ class ShortLongTMemoryIdentityOnly(BaseMemory):
 
     def clear(self):
         """Clears both short-term and long-term memory."""
+        self._collect_pending_reflections()
         self.short_term_memory = []
         self.long_term_memory = []
         self.unreflected_count = 0
@@ -1,20 +1,11 @@
 # planning.py
-import time
+import json
+import re
+from typing import Dict
 import google.generativeai as genai
 import config
 from abc import ABC, abstractmethod
-try:
-    # Also catch general API errors
-    from google.api_core.exceptions import ResourceExhausted, GoogleAPICallError
-except ImportError:
-    # Provide fallback or raise an error if the necessary library is not installed
-    print("Warning: google-api-core not installed. API error handling may not work correctly.")
-
-    class ResourceExhausted(Exception):
-        pass  # Define a dummy exception if import fails
-
-    class GoogleAPICallError(Exception):
-        pass  # Define a dummy exception if import fails
+from llm.common import prompt_text
     
 class BasePlanning(ABC):
     """Abstract base class for agent thinking/decision-making modules."""
@@ -32,23 +23,15 @@ class SimplePlanning(BasePlanning):
         self.llm = model # Pass the initialized model instance
         self.is_initial_prompt=False
 
-    def generate_output(self, agent, static_world_context, memory_context): 
-        """Formats prompt and calls the Gemini API."""
-
-        prompt = f"""You are {agent.name}, a character in a simulated world.
+    def _prompt_prefix(self, agent) -> str:
+        """Stable part of the prompt (persona, instructions, examples), reused across turns."""
+        return f"""You are {agent.name}, a character in a simulated world.
 Your personality: {agent.personality}.
 Your gender: {getattr(agent, 'gender', 'Not specified')}.
 Your goals: {agent.goals}
 Your background: {agent.background}
 
-Your current world situation:
-
-{static_world_context}
-
-Your recent memories and perceptions (most recent last):
-
-{memory_context}
-
+Each turn you are given your current world situation and your recent memories and perceptions.
 Based on your personality, goals, gender, situation, and memories, what do you think, say, or do next?
 Choose and describe ONE single action, or utterance. You can be descriptive but must focus on only one action.
 If you speak, use quotes. If you act, describe the action.
@@ -70,11 +53,28 @@ Examples of valid single intents:
 - Wait silently and observe Bob's next move.
 - Respond to Alice, "The forest does look interesting, but I'm more concerned about finding food and water first. What kind of potion are you making?"
 
-Important: Provide only ONE action, thought, or utterance. Do not combine multiple actions.
+Important: Provide only ONE action, thought, or utterance. Do not combine multiple actions."""
+
+    def _prompt_suffix(self, static_world_context, memory_context) -> str:
+        """Volatile part of the prompt (world context plus memory), rebuilt every turn."""
+        return f"""Your current world situation:
+
+{static_world_context}
+
+Your recent memories and perceptions (most recent last):
+
+{memory_context}
+
 Your action output (one single action):"""
+
+    def generate_output(self, agent, static_world_context, memory_context): 
+        """Formats prompt and calls the Gemini API."""
+        # Sent as [prefix, suffix] so the stable prefix can be context-cached (llm/context_cache.py)
+        prompt = [self._prompt_prefix(agent),
+                  self._prompt_suffix(static_world_context, memory_context)]
         if self.is_initial_prompt==False:
             self.is_initial_prompt=True
-            print(f"[{agent.name} Prompt]: {prompt}")  #TEMPORAL ------------------------------------->
+            print(f"[{agent.name} Prompt]: {prompt_text(prompt)}")  #TEMPORAL ------------------------------------->
         # if config.SIMULATION_MODE == 'debug':
         #     print(f"\n[{agent.name} is thinking...]")
         # print(f"--- DEBUG PROMPT for {agent.name} ---\n{prompt}\n--------------------")
@@ -98,7 +98,7 @@ Your action output (one single action):"""
 
         except Exception as e:
             print(f"[{agent.name} Error]: LLM generation failed: {e}")
-            if hasattr(response, 'prompt_feedback') and response.prompt_feedback.block_reason:
+            if 'response' in locals() and hasattr(response, 'prompt_feedback') and response.prompt_feedback.block_reason:
                 print(
                     f"[{agent.name} Safety Block]: Reason: {response.prompt_feedback.block_reason}")
             return f"Intend to pause due to confusion."  # Return an intent
@@ -113,9 +113,8 @@ class SimplePlanningIdentityOnly(BasePlanning):
         self.llm = model  # Pass the initialized model instance
         self.is_initial_prompt = False
 
-    def generate_output(self, agent, static_world_context, memory_context):
-        """Formats prompt and calls the Gemini API."""
-
+    def _prompt_prefix(self, agent) -> str:
+        """Stable part of the prompt (identity, instructions, examples), reused across turns."""
         prompt = f"You are {agent.name}, a character in a simulated world.\n"
 
 
@@ -127,14 +126,7 @@ class SimplePlanningIdentityOnly(BasePlanning):
 
         # Add the rest of the multi-line content
         prompt += f"""
-Your current world situation:
-
-{static_world_context}
-
-Your recent memories and perceptions (most recent last):
-
-{memory_context}
-
+Each turn you are given your current world situation and your recent memories and perceptions.
 Based on your identity, situation, and memories, what do you think, say, or do next?
 Choose and describe ONE single action, or utterance. You can be descriptive but must focus on only one action.
 If you speak, use quotes. If you act, describe the action.
@@ -154,12 +146,30 @@ Examples of valid single intents:
 - Wait silently and observe Bob's next move.
 - Respond to Alice, "The forest does look interesting, but I'm more concerned about finding food and water first. What kind of potion are you making?"
 
-Important: Provide only ONE action, thought, or utterance. Do not combine multiple actions.
+Important: Provide only ONE action, thought, or utterance. Do not combine multiple actions."""
+        return prompt
+
+    def _prompt_suffix(self, static_world_context, memory_context) -> str:
+        """Volatile part of the prompt (world context plus memory), rebuilt every turn."""
+        return f"""Your current world situation:
+
+{static_world_context}
+
+Your recent memories and perceptions (most recent last):
+
+{memory_context}
+
 Your action output (one single action):"""
+
+    def generate_output(self, agent, static_world_context, memory_context):
+        """Formats prompt and calls the Gemini API."""
+        # Sent as [prefix, suffix] so the stable prefix can be context-cached (llm/context_cache.py)
+        prompt = [self._prompt_prefix(agent),
+                  self._prompt_suffix(static_world_context, memory_context)]
         if self.is_initial_prompt == False:
             self.is_initial_prompt = True
             # TEMPORAL ------------------------------------->
-            print(f"[{agent.name} Prompt]: {prompt}")
+            print(f"[{agent.name} Prompt]: {prompt_text(prompt)}")
         # if config.SIMULATION_MODE == 'debug':
         #     print(f"\n[{agent.name} is thinking...]")
         # print(f"--- DEBUG PROMPT for {agent.name} ---\n{prompt}\n--------------------")
@@ -181,16 +191,115 @@ Your action output (one single action):"""
             # print(f"[{agent.name} Response]: {utterance}")  #TEMPORAL ------------------------------------->
             return utterance
 
-        except ResourceExhausted as e:
-            print(
-                f"[{agent.name} Error]: LLM generation failed: {e}. Waiting 10 seconds and retrying...")
-            time.sleep(10)
-            return self.generate_output(agent, static_world_context, memory_context)
-        
         except Exception as e:
             print(f"[{agent.name} Error]: LLM generation failed: {e}")
-            # check if the error is  "429 You exceeded your current quota,...", in that case, wait 10 seconds and retry the request
-            if hasattr(response, 'prompt_feedback') and response.prompt_feedback.block_reason:
+            # Quota (429) errors are retried with backoff by the shared rate limiter (llm/rate_limiter.py)
+            if 'response' in locals() and hasattr(response, 'prompt_feedback') and response.prompt_feedback.block_reason:
                 print(
                     f"[{agent.name} Safety Block]: Reason: {response.prompt_feedback.block_reason}")
             return f"Intend to pause due to confusion."  # Return an intent
+
+
+class BatchPlanningIdentityOnly:
+    """
+    Plans several agents in a single LLM request (identity-only prompts, like
+    SimplePlanningIdentityOnly). The shared instructions are sent once, followed
+    by one block per agent; the model answers with a JSON list of
+    {"agent": name, "intent": text} entries. Each entry is validated, and any
+    agent whose entry is missing or malformed is planned with its own
+    planning module instead.
+    """
+    MAX_INTENT_CHARS = 600
+
+    def __init__(self, model, generation_config: dict):
+        self.llm = model
+        self.generation_config = generation_config
+        # Metrics
+        self.batches = 0
+        self.batched_agents = 0
+        self.fallbacks = 0
+
+    def build_prompt(self, agents, contexts) -> str:
+        """contexts: {agent name: (static world context, memory context)}"""
+        prompt = f"""BATCH PLANNING: you control {len(agents)} characters in a simulated world.
+For EACH character below, decide what they think, say, or do next, based only on their own identity, situation, and memories.
+Each character chooses and describes ONE single action, or utterance. If they speak, use quotes. If they act, describe the action.
+Characters can only interact with agents present in their same location.
+
+Examples of valid single intents:
+- Walk towards the Forest Edge to see if I can find any berries.
+- Ask Bob, "Did you hear that strange noise coming from the shelter? It sounded like scratching."
+- Carefully examine the ground near the shelter for any tracks or clues.
+- Wait silently and observe Bob's next move.
+"""
+        for agent in agents:
+            static_world_context, memory_context = contexts[agent.name]
+            prompt += f"\n=== AGENT: {agent.name} ===\n"
+            prompt += f"Identity: {agent.identity}\n"
+            if agent.initial_context:
+                prompt += f"Context: {agent.initial_context}\n"
+            prompt += f"""Current world situation:
+{static_world_context}
+Recent memories and perceptions (most recent last):
+{memory_context}
+"""
+        names = ", ".join(f'"{agent.name}"' for agent in agents)
+        prompt += f"""
+=== OUTPUT ===
+Respond with ONLY a JSON list, one entry per character ({names}), each with ONE single action:
+[{{"agent": "<name>", "intent": "<one single action or utterance>"}}]"""
+        return prompt
+
+    def parse_response(self, text: str, agent_names) -> Dict[str, str]:
+        """Returns the valid {agent name: intent} entries of a batch response; invalid ones are dropped."""
+        text = re.sub(r"^```(?:json)?\s*|\s*```$", "", text.strip())
+        match = re.search(r"\[.*\]", text, re.DOTALL)
+        if not match:
+            return {}
+        try:
+            entries = json.loads(match.group(0))
+        except json.JSONDecodeError:
+            return {}
+        intents = {}
+        for entry in entries if isinstance(entries, list) else []:
+            if not isinstance(entry, dict):
+                continue
+            name, intent = entry.get("agent"), entry.get("intent")
+            if name not in agent_names or name in intents or not isinstance(intent, str):
+                continue
+            intent = intent.strip()
+            if intent and len(intent) <= self.MAX_INTENT_CHARS:
+                intents[name] = intent
+        return intents
+
+    def plan_batch(self, agents, world_state) -> Dict[str, str]:
+        """Returns an intent for every agent: from the batch response, or from an individual fallback call."""
+        contexts = {agent.name: agent.planning_inputs(world_state) for agent in agents}
+        intents = {}
+        if len(agents) > 1:
+            generation_config = dict(self.generation_config)
+            # Room for every agent's answer plus the JSON framing.
+            generation_config["max_output_tokens"] = generation_config.get(
+                "max_output_tokens", 128) * len(agents) + 32
+            try:
+                response = self.llm.generate_content(
+                    self.build_prompt(agents, contexts), generation_config=generation_config)
+                intents = self.parse_response(response.text, {agent.name for agent in agents})
+            except Exception as e:
+                print(f"[Batch Planning Error]: LLM generation failed: {e}")
+            self.batches += 1
+            self.batched_agents += len(intents)
+
+        for agent in agents:
+            if agent.name not in intents:
+                if len(agents) > 1:
+                    self.fallbacks += 1
+                    if config.SIMULATION_MODE == 'debug':
+                        print(f"[Batch Planning]: No valid entry for {agent.name}, planning individually.")
+                static_world_context, memory_context = contexts[agent.name]
+                intents[agent.name] = agent.planning.generate_output(
+                    agent, static_world_context, memory_context)
+        return intents
+
+    def stats(self) -> Dict[str, int]:
+        return {"batches": self.batches, "batched_agents": self.batched_agents, "fallbacks": self.fallbacks}
@@ -0,0 +1,69 @@
+# src_GM/benchmarks/bench_agents_at.py
+"""
+Micro-benchmark for WorldState.get_agents_at: the location -> agents reverse
+index against the previous full scan of agent_locations, at 1k agents and
+200 locations. Measures the three call patterns of a simulation turn:
+get_agents_at for every location (Director summary / full state string) and
+get_static_context_for_agent for every agent (planning and resolution).
+
+Run from src_GM:  python -m benchmarks.bench_agents_at
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+
+config.SIMULATION_MODE = "story"  # no per-call debug output
+config.WORLD_CONTEXT_CACHE_ENABLED = False  # measure the lookup itself, not the fragment cache
+
+from world import WorldState  # noqa: E402
+from benchmarks.bench_engine_scaling import make_world_data  # noqa: E402
+
+
+def scan_agents_at(world: WorldState, location_name: str):
+    """The pre-index implementation: a scan over every agent's location."""
+    return [name for name, loc in world.agent_locations.items() if loc == location_name]
+
+
+def timed(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def run(num_agents: int = 1000, num_locations: int = 200, repeat: int = 20):
+    world = WorldState(known_locations_data=make_world_data(num_locations))
+    locations = list(world.locations)
+    for i in range(num_agents):
+        world.add_agent_to_location(f"Agent{i}", locations[i % num_locations])
+
+    for location in locations:
+        assert world.get_agents_at(location) == scan_agents_at(world, location)
+
+    indexed_all = timed(lambda: [world.get_agents_at(loc) for loc in locations], repeat)
+    scan_all = timed(lambda: [scan_agents_at(world, loc) for loc in locations], repeat)
+
+    indexed_context = timed(
+        lambda: [world.get_static_context_for_agent(name) for name in world.agent_locations], 3)
+    original = world.get_agents_at
+    world.get_agents_at = lambda loc: scan_agents_at(world, loc)
+    try:
+        scan_context = timed(
+            lambda: [world.get_static_context_for_agent(name) for name in world.agent_locations], 3)
+    finally:
+        world.get_agents_at = original
+
+    print(f"{num_agents} agents / {num_locations} locations")
+    print(f"{'operation':<42} {'scan (ms)':>10} {'index (ms)':>11} {'speedup':>8}")
+    for label, scan, indexed in [
+            ("get_agents_at, every location", scan_all, indexed_all),
+            ("static context, every agent", scan_context, indexed_context)]:
+        print(f"{label:<42} {scan * 1000:>10.2f} {indexed * 1000:>11.2f} {scan / indexed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    run()
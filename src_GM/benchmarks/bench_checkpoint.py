@@ -0,0 +1,88 @@
+# src_GM/benchmarks/bench_checkpoint.py
+"""
+Measures checkpoint cost as the world grows: snapshot + compress + write, and
+read + decompress + restore (including the columnar history, rebuilt from the
+on-disk event store), with agents whose memories hold a long history.
+Uses the stub LLM; no network or API key needed.
+
+Run from src_GM:  python -m benchmarks.bench_checkpoint
+"""
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+
+from benchmarks.bench_engine_scaling import build  # noqa: E402
+from checkpoint import (load_checkpoint, restore_event_columns, restore_simulation,  # noqa: E402
+                        save_checkpoint, snapshot_simulation)
+from event_store import ColumnarEventStore, EventStore  # noqa: E402
+
+config.ASYNC_REFLECTIONS = False
+
+
+def populate(world, agents, director, steps: int, event_dir: str):
+    """Fills memories and the event history as if `steps` steps had run (no LLM calls)."""
+    world.event_store = EventStore(event_dir)
+    world.event_columns = ColumnarEventStore()
+    for step in range(1, steps + 1):
+        world.current_step = step
+        for agent in agents:
+            text = f"{agent.name} looks around the {world.agent_locations[agent.name]} at step {step}."
+            world.log_event(text, "action_outcome", world.agent_locations[agent.name], agent.name)
+            agent.memory.short_term_memory.append(f"[Step {step}] {text}")
+            director.memory.short_term_memory.append(f"[Step {step}] {text}")
+        for agent in agents[:5]:
+            agent.memory.long_term_memory.append(f"{agent.name} reflects on step {step}.")
+
+
+def measure(num_agents: int, num_locations: int, steps: int, directory: str):
+    with contextlib.redirect_stdout(io.StringIO()):
+        world, agents, director, _, _ = build(num_agents, num_locations)
+        event_dir = os.path.join(directory, f"events-{num_agents}")
+        populate(world, agents, director, steps, event_dir)
+        fresh_world, fresh_agents, fresh_director, _, _ = build(num_agents, num_locations)
+    fresh_world.event_columns = ColumnarEventStore()
+    path = os.path.join(directory, f"bench-{num_agents}.ckpt")
+
+    start = time.perf_counter()
+    size = save_checkpoint(snapshot_simulation(world, agents, director, steps, {"turns": 0}), path)
+    save_s = time.perf_counter() - start
+    world.event_store.close()
+    start = time.perf_counter()
+    state = load_checkpoint(path)
+    restore_simulation(state, fresh_world, fresh_agents, fresh_director)
+    fresh_world.event_store = EventStore(event_dir, reset=False)
+    fresh_world.event_store.truncate_after(steps)
+    restore_event_columns(state, fresh_world)
+    restore_s = time.perf_counter() - start
+
+    assert fresh_world.agent_locations == world.agent_locations
+    assert fresh_world.get_static_context_for_agent("Agent0") == world.get_static_context_for_agent("Agent0")
+    assert fresh_agents[0].memory.get_memory_context() == agents[0].memory.get_memory_context()
+    assert len(fresh_world.event_columns) == len(world.event_columns)
+    assert fresh_world.event_columns.row(len(world.event_columns) - 1) == world.event_columns.row(len(world.event_columns) - 1)
+    return save_s, restore_s, size, len(world.event_columns)
+
+
+def run():
+    directory = tempfile.mkdtemp(prefix="bench_checkpoint_")
+    try:
+        print(f"{'agents':>7} {'locations':>10} {'steps':>6} {'events':>8} {'save (ms)':>10} "
+              f"{'restore (ms)':>13} {'size (KB)':>10}")
+        for num_agents, num_locations, steps in [(10, 10, 30), (100, 50, 30), (500, 200, 30), (1000, 500, 50)]:
+            save_s, restore_s, size, events = measure(num_agents, num_locations, steps, directory)
+            print(f"{num_agents:>7} {num_locations:>10} {steps:>6} {events:>8} {save_s * 1000:>10.1f} "
+                  f"{restore_s * 1000:>13.1f} {size / 1024:>10.1f}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    run()
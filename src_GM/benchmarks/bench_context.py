@@ -0,0 +1,62 @@
+# src_GM/benchmarks/bench_context.py
+"""
+Benchmark for WorldState.get_static_context_for_agent with the per-location
+fragment cache (WORLD_CONTEXT_CACHE_ENABLED) on and off. Each simulated turn
+renders every agent's context twice (planning and resolution) and then applies
+one item state change and one move, the mutations that invalidate fragments.
+
+Run from src_GM:  python -m benchmarks.bench_context
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+
+config.SIMULATION_MODE = "story"  # no per-call debug output
+
+from world import WorldState  # noqa: E402
+from benchmarks.bench_engine_scaling import make_world_data  # noqa: E402
+
+
+def simulate(cached: bool, num_agents: int, num_locations: int, items_per_location: int, turns: int):
+    config.WORLD_CONTEXT_CACHE_ENABLED = cached
+    world = WorldState(known_locations_data=make_world_data(num_locations, items_per_location))
+    locations = list(world.locations)
+    agents = [f"Agent{i}" for i in range(num_agents)]
+    for i, name in enumerate(agents):
+        world.add_agent_to_location(name, locations[i % num_locations])
+
+    rendered = []
+    start = time.perf_counter()
+    for turn in range(turns):
+        name = agents[turn % num_agents]
+        for _ in range(2):
+            rendered.append(world.get_static_context_for_agent(name))
+        location = world.agent_locations[name]
+        world.apply_state_updates(
+            [("item_state", location, f"item {location.split()[1]}-0", f"state {turn}"),
+             ("agent_location", name, world.get_reachable_locations(location)[0])], triggered_by=name)
+        # Everyone else re-reads their context (e.g. the Director summary or reflections)
+        for other in agents[:: max(1, num_agents // 20)]:
+            rendered.append(world.get_static_context_for_agent(other))
+    return time.perf_counter() - start, rendered, world
+
+
+def run(num_agents: int = 200, num_locations: int = 40, items_per_location: int = 50, turns: int = 2000):
+    plain_s, plain_out, _ = simulate(False, num_agents, num_locations, items_per_location, turns)
+    cached_s, cached_out, world = simulate(True, num_agents, num_locations, items_per_location, turns)
+    assert plain_out == cached_out, "cached context differs from the freshly rendered one"
+    config.WORLD_CONTEXT_CACHE_ENABLED = True
+
+    print(f"{num_agents} agents / {num_locations} locations x {items_per_location} items, {turns} turns, "
+          f"{len(cached_out)} context renders")
+    print(f"uncached: {plain_s * 1000:.1f} ms   cached: {cached_s * 1000:.1f} ms   "
+          f"speedup: {plain_s / cached_s:.1f}x")
+    print(f"cache stats: {world.context_cache_stats()}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,84 @@
+# src_GM/benchmarks/bench_dispatch.py
+"""
+Event delivery cost: DirectEventDispatcher (scans every registered agent per event)
+against SubscriptionEventDispatcher (per-location subscriptions kept up to date by
+the world's movement listeners), with agents moving between events. Agents only
+count what they perceive, so the numbers are the dispatcher's own cost. Both
+dispatchers must deliver every event to the same agents in the same order.
+
+Run from src_GM:  python -m benchmarks.bench_dispatch
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+
+config.SIMULATION_MODE = "story"  # no per-call debug output
+
+from event_dispatcher import DirectEventDispatcher, SubscriptionEventDispatcher  # noqa: E402
+from world import Event, WorldState  # noqa: E402
+from benchmarks.bench_engine_scaling import make_world_data  # noqa: E402
+
+
+class CountingAgent:
+    def __init__(self, name: str):
+        self.name = name
+        self.perceived = 0
+
+    def perceive(self, event):
+        self.perceived += 1
+
+
+def make_script(num_agents: int, num_locations: int, num_events: int, rng: random.Random):
+    """Events (5% global) interleaved with moves: ('move', agent, location) or ('event', Event)."""
+    script = []
+    for i in range(num_events):
+        script.append(("move", f"Agent{rng.randrange(num_agents)}", f"Loc {rng.randrange(num_locations)}"))
+        location = f"Loc {rng.randrange(num_locations)}"
+        scope = "global" if rng.random() < 0.05 else "action_outcome"
+        script.append(("event", Event(f"Event {i}", location, scope, i, f"Agent{rng.randrange(num_agents)}")))
+    return script
+
+
+def run_script(dispatcher, num_agents: int, num_locations: int, script, record: bool):
+    world = WorldState(known_locations_data=make_world_data(num_locations, 0))
+    dispatcher.attach(world)
+    for i in range(num_agents):
+        agent = CountingAgent(f"Agent{i}")
+        world.add_agent_to_location(agent.name, f"Loc {i % num_locations}", triggered_by="Setup")
+        world.register_agent(agent)
+    world.event_log.clear()
+    deliveries = []
+    dispatch_s = 0.0
+    for kind, *args in script:
+        if kind == "move":
+            world.add_agent_to_location(args[0], args[1], triggered_by="Setup")  # moves without logging
+        else:
+            start = time.perf_counter()
+            recipients = dispatcher.dispatch_event(args[0], world.registered_agents, world.agent_locations)
+            dispatch_s += time.perf_counter() - start
+            if record:
+                deliveries.append(recipients)
+    return dispatch_s, deliveries, sum(agent.perceived for agent in world.registered_agents.values())
+
+
+def run(num_events: int = 5_000):
+    rng = random.Random(0)
+    print(f"{num_events} events (5% global), one move per event")
+    print(f"{'agents':>7} {'locations':>10} {'deliveries':>11} {'direct (us/event)':>18} "
+          f"{'subscription (us/event)':>24} {'speedup':>8}")
+    for num_agents, num_locations in [(10, 4), (100, 20), (1_000, 200), (5_000, 1_000)]:
+        script = make_script(num_agents, num_locations, num_events, rng)
+        direct_s, expected, direct_count = run_script(DirectEventDispatcher(), num_agents, num_locations, script, True)
+        sub_s, delivered, sub_count = run_script(SubscriptionEventDispatcher(), num_agents, num_locations, script, True)
+        assert delivered == expected and sub_count == direct_count
+        print(f"{num_agents:>7} {num_locations:>10} {direct_count:>11} {direct_s / num_events * 1e6:>18.1f} "
+              f"{sub_s / num_events * 1e6:>24.1f} {direct_s / sub_s:>7.1f}x")
+
+
+if __name__ == "__main__":
+    run()
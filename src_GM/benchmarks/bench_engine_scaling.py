@@ -0,0 +1,99 @@
+# src_GM/benchmarks/bench_engine_scaling.py
+"""
+Measures simulation steps/sec of the engine itself (world, resolver parsing,
+dispatcher, memory) with the deterministic stub LLM, as agent and location
+counts grow. No network or API key needed.
+
+Run from src_GM:  python -m benchmarks.bench_engine_scaling
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+
+config.LLM_BACKEND = "stub"
+config.SIMULATION_MODE = "story"  # quietest built-in mode
+
+from main import (get_action_resolver, get_event_dispatcher, get_memory_module,  # noqa: E402
+                  get_planning_module, create_llm_instance)
+from world import WorldState, Event  # noqa: E402
+from agent.agent import Agent  # noqa: E402
+from director import Director  # noqa: E402
+
+
+def make_world_data(num_locations: int, items_per_location: int = 3) -> dict:
+    """A ring of locations with a few shortcuts, each holding some items."""
+    data = {}
+    for i in range(num_locations):
+        exits = {f"Loc {(i + 1) % num_locations}", f"Loc {(i - 1) % num_locations}",
+                 f"Loc {(i * 7) % num_locations}"} - {f"Loc {i}"}
+        data[f"Loc {i}"] = {
+            "description": f"Synthetic location number {i}.",
+            "exits_to": sorted(exits),
+            "properties": {"contains": [
+                {"object": f"item {i}-{j}", "state": "idle",
+                 "optional_description": f"A synthetic item {j}."}
+                for j in range(items_per_location)]},
+        }
+    return data
+
+
+def build(num_agents: int, num_locations: int, items_per_location: int = 3):
+    world = WorldState(known_locations_data=make_world_data(num_locations, items_per_location))
+    dispatcher = get_event_dispatcher(config.EVENT_PERCEPTION_MODEL)
+    dispatcher.attach(world)
+    agents = []
+    for i in range(num_agents):
+        agent = Agent(name=f"Agent{i}", gender="", personality="", identity="A synthetic agent.",
+                      initial_context="", memory_module=None,
+                      planning_module=get_planning_module(config.AGENT_PLANNING_TYPE))
+        agent.memory = get_memory_module(agent, config.AGENT_MEMORY_TYPE)
+        world.add_agent_to_location(agent.name, f"Loc {i % num_locations}", triggered_by="Setup")
+        world.register_agent(agent)
+        agents.append(agent)
+    director = Director(world, create_llm_instance(config.MODEL_NAME, config.DIRECTOR_GEN_CONFIG, purpose="Director"),
+                        "A synthetic benchmark story.", None, dispatcher)
+    director.memory = get_memory_module(director, config.AGENT_MEMORY_TYPE)
+    resolver = get_action_resolver(config.ACTION_RESOLVER_TYPE, world_ref=world)
+    return world, agents, director, resolver, dispatcher
+
+
+def run_steps(world, agents, director, resolver, dispatcher, steps: int):
+    """The per-turn core of main.run_simulation, minus console output and pauses."""
+    for _ in range(steps):
+        world.advance_step()
+        for agent in random.sample(agents, len(agents)):
+            director.director_step()
+            current_loc = world.agent_locations[agent.name]
+            intent = agent.plan(world)
+            result = resolver.resolve(agent.name, current_loc, intent, world)
+            if result.get("world_state_updates"):
+                world.apply_state_updates(result["world_state_updates"], triggered_by=agent.name)
+            world.log_event(result["outcome_description"], "action_outcome", current_loc, agent.name)
+            event = Event(result["outcome_description"], current_loc, "action_outcome",
+                          world.current_step, agent.name)
+            dispatcher.dispatch_event(event, world.registered_agents, world.agent_locations)
+            director.perceive(event)
+
+
+def main():
+    random.seed(0)
+    steps = 5
+    print(f"{'agents':>7} {'locations':>10} {'steps/sec':>10} {'turns/sec':>10}")
+    for num_agents, num_locations in [(2, 4), (10, 20), (50, 50), (100, 200)]:
+        with contextlib.redirect_stdout(io.StringIO()):
+            sim = build(num_agents, num_locations)
+            start = time.perf_counter()
+            run_steps(*sim, steps=steps)
+            elapsed = time.perf_counter() - start
+        print(f"{num_agents:>7} {num_locations:>10} {steps / elapsed:>10.2f} {steps * num_agents / elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# src_GM/benchmarks/bench_event_arena.py
+"""
+Memory held by perceived events with and without the shared event arena: N
+co-located agents (ShortLongTMemoryIdentityOnly) and the Director perceive the same
+events. Without the arena every listener stores its own formatted sentence; with it
+each event is stored once and memories hold a shared reference, rendered when a
+prompt is built. Also times building a memory context both ways and checks the
+prompts are identical.
+
+Run from src_GM:  python -m benchmarks.bench_event_arena
+"""
+import contextlib
+import gc
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+
+config.SIMULATION_MODE = "story"  # no per-call debug output
+
+import event_arena  # noqa: E402
+from agent.agent import Agent  # noqa: E402
+from agent.memory import ShortLongTMemoryIdentityOnly  # noqa: E402
+from world import Event  # noqa: E402
+
+
+def build_agents(num_agents: int):
+    with contextlib.redirect_stdout(io.StringIO()):
+        agents = [Agent(f"Agent{i}", "", "", "A synthetic agent.", "", None, None) for i in range(num_agents)]
+        for agent in agents:
+            agent.memory = ShortLongTMemoryIdentityOnly(agent, None)
+    return agents
+
+
+def perceive_all(agents, events, arena_enabled: bool):
+    """Bytes allocated while every agent perceives every event (kept alive by the memories)."""
+    config.EVENT_ARENA_ENABLED = arena_enabled
+    event_arena.set_event_arena(event_arena.EventArena())
+    gc.collect()
+    tracemalloc.start()
+    for event in events:
+        for agent in agents:
+            agent.perceive(event)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+
+def run(num_events: int = 2_000):
+    events = [Event(f"Agent{i % 7} does something noticeable with the old wooden cart near the well.",
+                    "Village Square", "action_outcome", i // 10, f"Agent{i % 7}") for i in range(num_events)]
+    print(f"{num_events} events, every listener perceives every event")
+    print(f"{'listeners':>9} {'strings (KB)':>13} {'arena (KB)':>11} {'bytes/event/listener':>21} "
+          f"{'arena bytes/event/listener':>27} {'context, strings (ms)':>22} {'context, arena (ms)':>20}")
+    for num_agents in [1, 10, 100, 500]:
+        text_agents, ref_agents = build_agents(num_agents), build_agents(num_agents)
+        text_bytes = perceive_all(text_agents, events, arena_enabled=False)
+        ref_bytes = perceive_all(ref_agents, events, arena_enabled=True)
+
+        start = time.perf_counter()
+        text_contexts = [agent.memory.get_memory_context() for agent in text_agents]
+        text_s = time.perf_counter() - start
+        start = time.perf_counter()
+        ref_contexts = [agent.memory.get_memory_context() for agent in ref_agents]
+        ref_s = time.perf_counter() - start
+        assert ref_contexts == text_contexts
+
+        per_pair = num_events * num_agents
+        print(f"{num_agents:>9} {text_bytes / 1024:>13.0f} {ref_bytes / 1024:>11.0f} {text_bytes / per_pair:>21.1f} "
+              f"{ref_bytes / per_pair:>27.1f} {text_s * 1000 / num_agents:>22.2f} {ref_s * 1000 / num_agents:>20.2f}")
+
+
+if __name__ == "__main__":
+    run()
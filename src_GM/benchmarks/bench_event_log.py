@@ -0,0 +1,101 @@
+# src_GM/benchmarks/bench_event_log.py
+"""
+Benchmark for the world event log: the ring buffer against the previous
+list.pop(0) trim at growing capacities (the log structure alone), and the
+append-only event store (logging cost, a ranged read through the step index,
+a full replay).
+
+Run from src_GM:  python -m benchmarks.bench_event_log
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+
+config.SIMULATION_MODE = "story"  # no per-call debug output
+
+from world import Event, WorldState  # noqa: E402
+from event_store import EventStore, read_events  # noqa: E402
+from benchmarks.bench_engine_scaling import make_world_data  # noqa: E402
+
+
+def list_log(events, capacity: int):
+    """The pre-ring-buffer implementation: append, then pop(0) above capacity."""
+    log = []
+    for event in events:
+        log.append(event)
+        if len(log) > capacity:
+            log.pop(0)
+    return log
+
+
+def ring_log(events, capacity: int):
+    """The ring buffer WorldState.event_log now uses."""
+    log = deque(maxlen=capacity)
+    for event in events:
+        log.append(event)
+    return log
+
+
+def log_world(events, capacity: int, event_store=None) -> WorldState:
+    config.MAX_RECENT_EVENTS = capacity // 2
+    world = WorldState(known_locations_data=make_world_data(4), event_store=event_store)
+    for event in events:
+        world.current_step = event.step
+        world.log_event(event.description, event.scope, event.location, event.triggered_by)
+    return world
+
+
+def make_events(count: int, per_step: int = 20):
+    return [Event(f"Agent{i % 50} does thing number {i}.", f"Loc {i % 4}", "action_outcome",
+                  i // per_step, f"Agent{i % 50}") for i in range(count)]
+
+
+def run(count: int = 100_000):
+    events = make_events(count)
+    print(f"{count} events")
+    print(f"{'capacity':>9} {'list.pop(0) (ms)':>17} {'ring buffer (ms)':>17} {'speedup':>8}")
+    for capacity in [30, 1_000, 10_000, 30_000]:
+        start = time.perf_counter()
+        expected = list_log(events, capacity)
+        list_s = time.perf_counter() - start
+        start = time.perf_counter()
+        ring_log(events, capacity)
+        ring_s = time.perf_counter() - start
+        assert list(log_world(events[-3 * capacity:], capacity).event_log) == expected
+        print(f"{capacity:>9} {list_s * 1000:>17.1f} {ring_s * 1000:>17.1f} {list_s / ring_s:>7.1f}x")
+
+    directory = tempfile.mkdtemp(prefix="bench_event_store_")
+    try:
+        start = time.perf_counter()
+        log_world(events, 30)
+        plain_s = time.perf_counter() - start
+        store = EventStore(directory, steps_per_segment=10)
+        start = time.perf_counter()
+        log_world(events, 30, event_store=store)
+        store.close()
+        write_s = time.perf_counter() - start
+        last_step = events[-1].step
+        start = time.perf_counter()
+        window = list(read_events(directory, last_step - 5, last_step - 1))
+        range_s = time.perf_counter() - start
+        start = time.perf_counter()
+        replayed = list(read_events(directory))
+        full_s = time.perf_counter() - start
+        assert replayed == events and window == [e for e in events if last_step - 5 <= e.step <= last_step - 1]
+        stats = store.stats()
+        print(f"event store: logging {plain_s * 1000:.1f} ms without it, {write_s * 1000:.1f} ms with it "
+              f"({stats['bytes_written'] / 1e6:.1f} MB, {stats['segments']} segments)")
+        print(f"event store: read 5 steps {range_s * 1000:.2f} ms, full replay {full_s * 1000:.1f} ms")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,82 @@
+# src_GM/benchmarks/bench_event_query.py
+"""
+Benchmark for ColumnarEventStore.query against a full scan of the Event list:
+"all events at <location> in steps a-b by <actor>" and two looser queries, over
+a synthetic history. Also reports memory and the save/load round trip.
+
+Run from src_GM:  python -m benchmarks.bench_event_query
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+
+config.SIMULATION_MODE = "story"  # no per-call debug output
+
+from world import Event  # noqa: E402
+from event_store import ColumnarEventStore  # noqa: E402
+
+
+def make_history(num_events: int, num_agents: int = 40, num_locations: int = 30, per_step: int = 25):
+    rng = random.Random(0)
+    events = []
+    for i in range(num_events):
+        actor = f"Agent{rng.randrange(num_agents)}" if rng.random() < 0.9 else None
+        events.append(Event(f"{actor or 'The world'} does thing number {i}.", f"Loc {rng.randrange(num_locations)}",
+                            "action_outcome" if actor else "local", i // per_step, actor))
+    return events
+
+
+def scan(events, location="*", actor="*", from_step=None, to_step=None):
+    return [e for e in events
+            if (location == "*" or e.location == location) and (actor == "*" or e.triggered_by == actor)
+            and (from_step is None or e.step >= from_step) and (to_step is None or e.step <= to_step)]
+
+
+def timed(func, repeat: int = 20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def run(num_events: int = 200_000):
+    events = make_history(num_events)
+    start = time.perf_counter()
+    store = ColumnarEventStore.from_events(events)
+    build_s = time.perf_counter() - start
+    last_step = events[-1].step
+    queries = [
+        ("location + actor + 400 steps", dict(location="Loc 3", actor="Agent7", from_step=last_step // 2, to_step=last_step // 2 + 400)),
+        ("actor, all steps", dict(actor="Agent7")),
+        ("steps a-b only", dict(from_step=100, to_step=120)),
+    ]
+    print(f"{num_events} events, columnar build {build_s * 1000:.0f} ms, {store.stats()}")
+    print(f"{'query':<30} {'rows':>6} {'scan (ms)':>10} {'columnar (ms)':>14} {'speedup':>8}")
+    for label, filters in queries:
+        scan_s, expected = timed(lambda: scan(events, **filters))
+        query_s, result = timed(lambda: store.query(**filters))
+        assert result == expected
+        print(f"{label:<30} {len(result):>6} {scan_s * 1000:>10.2f} {query_s * 1000:>14.3f} {scan_s / query_s:>7.1f}x")
+
+    directory = tempfile.mkdtemp(prefix="bench_event_columns_")
+    try:
+        start = time.perf_counter()
+        store.save(directory)
+        loaded = ColumnarEventStore.load(directory)
+        round_trip_s = time.perf_counter() - start
+        assert loaded.query(actor="Agent7") == store.query(actor="Agent7") and len(loaded) == len(store)
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        print(f"save + load: {round_trip_s * 1000:.0f} ms, {size / 1e6:.1f} MB on disk")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    run()
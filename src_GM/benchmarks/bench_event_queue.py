@@ -0,0 +1,160 @@
+# src_GM/benchmarks/bench_event_queue.py
+"""
+Per-event delivery against the EventQueue (per turn and per step), on the same
+scripted run: every step each agent waits, speaks or moves, and the Director adds an
+ambient event (sometimes announced twice). Agents use ShortLongTMemoryIdentityOnly
+with a reflection model that only counts its calls. Reported: memory write calls,
+short-term entries stored, reflections triggered and delivery time. The queued runs
+must leave every agent with the same events as per-event delivery, minus repeats
+(checked without movement notices, leaving out the merged WAIT entries).
+
+Run from src_GM:  python -m benchmarks.bench_event_queue
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+
+config.SIMULATION_MODE = "story"  # no per-call debug output
+
+from agent.agent import Agent  # noqa: E402
+from agent.memory import ShortLongTMemoryIdentityOnly  # noqa: E402
+from event_dispatcher import SubscriptionEventDispatcher  # noqa: E402
+from event_queue import EventQueue  # noqa: E402
+from world import Event, WorldState  # noqa: E402
+from benchmarks.bench_engine_scaling import make_world_data  # noqa: E402
+
+
+class CountingReflections:
+    model_name = "counting"
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        return type("Response", (), {"text": "An insight."})()
+
+
+class CountingMemory(ShortLongTMemoryIdentityOnly):
+    writes = 0
+
+    def add_observation(self, *args, **kwargs):
+        CountingMemory.writes += 1
+        super().add_observation(*args, **kwargs)
+
+    def add_observations(self, *args, **kwargs):
+        CountingMemory.writes += 1
+        super().add_observations(*args, **kwargs)
+
+
+def make_script(num_agents: int, num_locations: int, steps: int, rng: random.Random):
+    """Per step: (agent, action, location after the action) turns and the Director's events."""
+    connectivity = {name: data["exits_to"] for name, data in make_world_data(num_locations, 0).items()}
+    locations = {f"Agent{i}": f"Loc {i % num_locations}" for i in range(num_agents)}
+    script = []
+    for _ in range(steps):
+        turns = []
+        for agent_name in rng.sample(list(locations), num_agents):
+            roll = rng.random()
+            if roll < 0.35:
+                turns.append((agent_name, "WAIT", locations[agent_name]))
+            elif roll < 0.65:
+                locations[agent_name] = rng.choice(connectivity[locations[agent_name]])
+                turns.append((agent_name, "MOVE", locations[agent_name]))
+            else:
+                turns.append((agent_name, "SPEAK", locations[agent_name]))
+        ambient = f"Loc {rng.randrange(num_locations)}"
+        script.append((turns, [ambient] * (2 if rng.random() < 0.3 else 1)))
+    return script
+
+
+def run_script(script, num_agents: int, num_locations: int, mode: str, movements: bool = True):
+    """mode: "immediate", "turn" or "step". Returns (writes, entries, reflections, delivery seconds, agents)."""
+    world = WorldState(known_locations_data=make_world_data(num_locations, 0))
+    dispatcher = SubscriptionEventDispatcher()
+    dispatcher.attach(world)
+    reflections = CountingReflections()
+    agents = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(num_agents):
+            agent = Agent(f"Agent{i}", "", "", "A synthetic agent.", "", None, None)
+            agent.memory = CountingMemory(agent, reflections, reflection_threshold=5)
+            world.add_agent_to_location(agent.name, f"Loc {i % num_locations}", triggered_by="Setup")
+            world.register_agent(agent)
+            agents[agent.name] = agent
+    queue = None
+    if mode != "immediate":
+        queue = EventQueue(dispatcher, movements=movements)
+        queue.attach(world)
+    CountingMemory.writes = 0
+    delivery_s = 0.0
+
+    def deliver(event, kind):
+        if queue:
+            queue.put(event, kind)
+        else:
+            dispatcher.dispatch_event(event, world.registered_agents, world.agent_locations)
+
+    with contextlib.redirect_stdout(io.StringIO()):  # reflections print their prompts
+        for turns, ambient_locations in script:
+            world.advance_step()
+            for agent_name, action, location in turns:
+                if action == "MOVE":
+                    world.add_agent_to_location(agent_name, location, triggered_by=agent_name)
+                    description = f"{agent_name} walks to the {location}."
+                elif action == "WAIT":
+                    description = f"{agent_name} waits."
+                else:
+                    description = f"{agent_name} says hello."
+                start = time.perf_counter()
+                deliver(Event(description, location, "action_outcome", world.current_step, agent_name), action)
+                for ambient in ambient_locations:
+                    deliver(Event("A bell rings.", ambient, "local", world.current_step, None), None)
+                ambient_locations = []  # the Director acts once per step
+                if queue and mode == "turn":
+                    queue.flush()
+                delivery_s += time.perf_counter() - start
+            if queue:
+                start = time.perf_counter()
+                queue.flush()
+                delivery_s += time.perf_counter() - start
+    entries = sum(len(agent.memory.short_term_memory) for agent in agents.values())
+    return CountingMemory.writes, entries, reflections.calls, delivery_s, agents
+
+
+def check_coalescing():
+    """Without movements, a queued run only drops repeats and merges WAITs: every other entry survives."""
+    script = make_script(30, 6, 20, random.Random(1))
+    *_, immediate = run_script(script, 30, 6, "immediate")
+    *_, queued = run_script(script, 30, 6, "step", movements=False)
+    for name, agent in immediate.items():
+        expected = [str(entry) for entry in agent.memory.short_term_memory if "waits." not in str(entry)]
+        got = [str(entry) for entry in queued[name].memory.short_term_memory if "waits." not in str(entry)]
+        assert sorted(set(expected)) == sorted(got), name  # duplicates (double announcements) removed
+
+
+def run(steps: int = 30):
+    check_coalescing()
+    rng = random.Random(0)
+    print(f"{steps} steps; each agent waits (35%), moves (30%) or speaks; one Director event per step")
+    print(f"{'agents':>6} {'locations':>9} {'delivery':>18} {'memory writes':>14} {'entries':>8} "
+          f"{'reflections':>12} {'time (ms)':>10}")
+    for num_agents, num_locations in [(20, 4), (200, 20), (1_000, 100)]:
+        script = make_script(num_agents, num_locations, steps, rng)
+        for label, mode, movements in [("per event", "immediate", False), ("queue per turn", "turn", False),
+                                       ("queue per step", "step", False), ("step + moves", "step", True)]:
+            writes, entries, reflections, delivery_s, _ = run_script(script, num_agents, num_locations,
+                                                                     mode, movements)
+            print(f"{num_agents:>6} {num_locations:>9} {label:>18} {writes:>14} {entries:>8} "
+                  f"{reflections:>12} {delivery_s * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,106 @@
+# src_GM/benchmarks/bench_event_radius.py
+"""
+Loud events with a perception radius: RadiusEventDispatcher (subscribers of the
+cached k-hop neighborhood) against a scan that checks every registered agent's graph
+distance to the event, and against sending the event globally, which is how a loud
+event was delivered before radii. Agents only count what they perceive; deliveries
+are the memory writes each approach causes. The scan and the dispatcher must reach
+the same agents, in the same order, with the same attenuated descriptions.
+
+Run from src_GM:  python -m benchmarks.bench_event_radius
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+
+config.SIMULATION_MODE = "story"  # no per-call debug output
+
+from event_dispatcher import RadiusEventDispatcher  # noqa: E402
+from world import Event, WorldState  # noqa: E402
+from benchmarks.bench_engine_scaling import make_world_data  # noqa: E402
+
+
+class CountingAgent:
+    def __init__(self, name: str):
+        self.name = name
+        self.perceived = 0
+
+    def perceive(self, event):
+        self.perceived += 1
+
+
+def scan_dispatch(world: WorldState, event: Event):
+    """Reference delivery: every registered agent, filtered by graph distance."""
+    recipients = []
+    for agent_name in world.registered_agents:
+        if agent_name == event.triggered_by:
+            continue
+        hops = world.location_graph.distance(event.location, world.agent_locations.get(agent_name))
+        if hops is not None and hops <= event.radius:
+            recipients.append((agent_name, RadiusEventDispatcher.attenuate(event, hops).description
+                               if hops else event.description))
+    return recipients
+
+
+def build(num_agents: int, num_locations: int):
+    world = WorldState(known_locations_data=make_world_data(num_locations, 0))
+    dispatcher = RadiusEventDispatcher()
+    dispatcher.attach(world)
+    for i in range(num_agents):
+        agent = CountingAgent(f"Agent{i}")
+        world.add_agent_to_location(agent.name, f"Loc {i % num_locations}", triggered_by="Setup")
+        world.register_agent(agent)
+    return world, dispatcher
+
+
+def check_delivery():
+    world, dispatcher = build(200, 40)
+    received = {}
+    for agent in world.registered_agents.values():
+        agent.perceive = lambda event, name=agent.name: received.setdefault(name, event.description)
+    event = Event("A gunshot rings out.", "Loc 0", "action_outcome", 0, "Agent0", radius=2)
+    dispatcher.dispatch_event(event, world.registered_agents, world.agent_locations)
+    assert list(received.items()) == scan_dispatch(world, event)
+    assert received["Agent1"] == "(heard from 1 location(s) away) A gunshot rings out."
+    assert "Agent0" not in received and "Agent20" not in received  # the shooter; Loc 20 is out of range
+    # Radius 0 is an ordinary local event
+    received.clear()
+    dispatcher.dispatch_event(event._replace(radius=0), world.registered_agents, world.agent_locations)
+    assert sorted(received) == sorted(name for name, loc in world.agent_locations.items()
+                                      if loc == "Loc 0" and name != "Agent0")
+
+
+def run(num_events: int = 2_000, radius: int = 2):
+    check_delivery()
+    rng = random.Random(0)
+    print(f"{num_events} events with radius {radius}, one move per event")
+    print(f"{'agents':>7} {'locations':>10} {'global deliveries':>18} {'radius deliveries':>18} "
+          f"{'scan (us/event)':>16} {'radius (us/event)':>18} {'speedup':>8}")
+    for num_agents, num_locations in [(100, 20), (1_000, 200), (5_000, 1_000), (20_000, 5_000)]:
+        world, dispatcher = build(num_agents, num_locations)
+        script = [(f"Agent{rng.randrange(num_agents)}", f"Loc {rng.randrange(num_locations)}",
+                   Event(f"Event {i}", f"Loc {rng.randrange(num_locations)}", "action_outcome", i,
+                         f"Agent{rng.randrange(num_agents)}", radius=radius))
+                  for i in range(num_events)]
+        scan_s = radius_s = 0.0
+        for mover, location, event in script:
+            world.add_agent_to_location(mover, location, triggered_by="Setup")
+            start = time.perf_counter()
+            expected = scan_dispatch(world, event)
+            scan_s += time.perf_counter() - start
+            start = time.perf_counter()
+            delivered = dispatcher.dispatch_event(event, world.registered_agents, world.agent_locations)
+            radius_s += time.perf_counter() - start
+            assert delivered == [name for name, _ in expected]
+        print(f"{num_agents:>7} {num_locations:>10} {num_events * (num_agents - 1):>18} {dispatcher.deliveries:>18} "
+              f"{scan_s / num_events * 1e6:>16.1f} {radius_s / num_events * 1e6:>18.1f} {scan_s / radius_s:>7.1f}x")
+    print(world.location_graph.stats())
+
+
+if __name__ == "__main__":
+    run()
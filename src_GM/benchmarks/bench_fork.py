@@ -0,0 +1,101 @@
+# src_GM/benchmarks/bench_fork.py
+"""
+Cost of what-if branches: WorldState.fork (copy-on-write) against a deep copy of
+the world state, in time and memory, the memory a branch holds after changing a few
+locations, and the cost of forking the agents (memory entries are shared, not
+copied). Also checks that branches stay isolated.
+Uses the stub LLM; no network or API key needed.
+
+Run from src_GM:  python -m benchmarks.bench_fork
+"""
+import contextlib
+import copy
+import gc
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+
+from benchmarks.bench_engine_scaling import build, make_world_data  # noqa: E402
+from world import WorldState  # noqa: E402
+
+config.ASYNC_REFLECTIONS = False
+
+
+def deep_copy_world(world):
+    return copy.deepcopy(world.get_state())
+
+
+def fork_agents(agents):
+    return [agent.fork() for agent in agents]
+
+
+def fork_and_change(world, changes: int):
+    branch = world.fork()
+    for i in range(changes):
+        branch.modify_item_state(f"Loc {i}", f"item {i}-0", "changed")
+    return branch
+
+
+def measure(func, *args):
+    """(seconds, bytes still allocated by the result)."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return elapsed, size
+
+
+def check_isolation():
+    data = make_world_data(4)
+    data["Loc 0"]["properties"]["contains"][0]["linked_to"] = {"location": "Loc 1", "object_key": "item 1-0"}
+    world = WorldState(known_locations_data=data)
+    world.add_agent_to_location("A", "Loc 0")
+    branch = world.fork()
+    branch.apply_state_updates([("item_state", "Loc 0", "item 0-0", "broken")], triggered_by="A")
+    branch.add_agent_to_location("A", "Loc 2", triggered_by="A")
+    assert world.get_item("Loc 0", "item 0-0")["state"] == "idle"
+    assert world.get_item("Loc 1", "item 1-0")["state"] == "idle"
+    assert branch.get_item("Loc 1", "item 1-0")["state"] == "broken"
+    assert world.get_agents_at("Loc 0") == ["A"] and branch.get_agents_at("Loc 2") == ["A"]
+    world.modify_item_state("Loc 1", "item 1-0", "oiled")
+    assert branch.get_item("Loc 1", "item 1-0")["state"] == "broken"
+    assert branch.get_item("Loc 3", "item 3-0") is world.get_item("Loc 3", "item 3-0")  # still shared
+
+
+def populate(world, agents, steps: int):
+    for step in range(1, steps + 1):
+        for agent in agents:
+            agent.memory.short_term_memory.append(f"[Step {step}] {agent.name} looks around at step {step}.")
+            world.log_event(f"{agent.name} waits.", "action_outcome", world.agent_locations[agent.name], agent.name)
+
+
+def run():
+    check_isolation()
+    print(f"{'agents':>7} {'locations':>10} | world: {'deep copy':>10} {'fork':>8} {'fork+5 chg':>11} "
+          f"| agents: {'fork':>8} {'entries shared':>15}   (KB; ms in brackets)")
+    for num_agents, num_locations in [(10, 10), (100, 100), (500, 500), (1000, 2000)]:
+        with contextlib.redirect_stdout(io.StringIO()):
+            world, agents, _, _, _ = build(num_agents, num_locations, items_per_location=20)
+            populate(world, agents, 30)
+            rows = [measure(deep_copy_world, world), measure(world.fork), measure(fork_and_change, world, 5),
+                    measure(fork_agents, agents)]
+            branch_agents = fork_agents(agents)
+        shared = all(a.memory.short_term_memory[-1] is b.memory.short_term_memory[-1]
+                     for a, b in zip(agents, branch_agents))
+        cells = [f"{size / 1024:.0f} ({seconds * 1000:.1f})" for seconds, size in rows]
+        print(f"{num_agents:>7} {num_locations:>10} | world: {cells[0]:>10} {cells[1]:>8} {cells[2]:>11} "
+              f"| agents: {cells[3]:>8} {str(shared):>15}")
+
+
+if __name__ == "__main__":
+    run()
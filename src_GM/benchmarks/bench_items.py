@@ -0,0 +1,75 @@
+# src_GM/benchmarks/bench_items.py
+"""
+Micro-benchmark for item lookups: the per-location item index (get_item) against
+the previous linear scan of location_properties[loc]["contains"], in rooms with
+hundreds of props. Also times the item_state mutation path (apply_state_updates
+with linked items), which now goes through the index and the link pointers
+resolved at load time.
+
+Run from src_GM:  python -m benchmarks.bench_items
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+
+config.SIMULATION_MODE = "story"  # no per-call debug output
+
+from world import WorldState  # noqa: E402
+from benchmarks.bench_engine_scaling import make_world_data  # noqa: E402
+
+
+def scan_item(world: WorldState, location_name: str, item_name: str):
+    """The pre-index implementation: a scan of the location's "contains" list."""
+    for item_data in world.get_location_property(location_name, "contains") or []:
+        if item_data.get("object") == item_name:
+            return item_data
+    return None
+
+
+def timed(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def run(num_locations: int = 20, items_per_location: int = 500, lookups: int = 20000):
+    data = make_world_data(num_locations, items_per_location)
+    # Link every tenth item to its counterpart in the next location (doors, switches...)
+    for i in range(num_locations):
+        for j in range(0, items_per_location, 10):
+            data[f"Loc {i}"]["properties"]["contains"][j]["linked_to"] = {
+                "location": f"Loc {(i + 1) % num_locations}", "object_key": f"item {(i + 1) % num_locations}-{j}"}
+    world = WorldState(known_locations_data=data)
+
+    rng = random.Random(0)
+    queries = []
+    for _ in range(lookups):
+        i = rng.randrange(num_locations)
+        queries.append((f"Loc {i}", f"item {i}-{rng.randrange(items_per_location)}"))
+
+    for location, item in queries[:200]:
+        assert world.get_item(location, item) is scan_item(world, location, item)
+
+    scan = timed(lambda: [scan_item(world, loc, item) for loc, item in queries], 1)
+    indexed = timed(lambda: [world.get_item(loc, item) for loc, item in queries], 1)
+
+    updates = [("item_state", loc, item, f"state {n}") for n, (loc, item) in enumerate(queries)]
+    start = time.perf_counter()
+    world.apply_state_updates(updates, triggered_by="Benchmark")
+    apply_s = time.perf_counter() - start
+
+    print(f"{num_locations} locations x {items_per_location} items, {lookups} lookups "
+          f"({len(world.item_links)} linked items)")
+    print(f"{'operation':<32} {'scan (ms)':>10} {'index (ms)':>11} {'speedup':>8}")
+    print(f"{'item lookup, all queries':<32} {scan * 1000:>10.2f} {indexed * 1000:>11.2f} {scan / indexed:>7.1f}x")
+    print(f"apply_state_updates ({len(updates)} item_state updates): {apply_s * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,105 @@
+# src_GM/benchmarks/bench_location_graph.py
+"""
+Path finding on the compiled location graph for worlds of thousands of locations:
+compile time, shortest paths from cold and cached searches, k-hop neighborhoods, and
+a breadth-first search over the plain exit lists by name for comparison.
+Also walks a multi-hop MOVE through the world and the resolver's follow_route.
+
+Run from src_GM:  python -m benchmarks.bench_location_graph
+"""
+import os
+import random
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+
+config.SIMULATION_MODE = "story"  # no per-call debug output
+
+from action_resolver import LLMActionResolver  # noqa: E402
+from location_graph import LocationGraph  # noqa: E402
+from scenario import compile_scenario  # noqa: E402
+from world import WorldState  # noqa: E402
+from benchmarks.bench_engine_scaling import make_world_data  # noqa: E402
+
+
+def dict_path(connectivity, start: str, goal: str):
+    """BFS over the exit lists by name, as a caller without the graph would do it."""
+    parents = {start: None}
+    queue = deque([start])
+    while queue:
+        node = queue.popleft()
+        if node == goal:
+            path = [node]
+            while parents[path[-1]] is not None:
+                path.append(parents[path[-1]])
+            return path[::-1]
+        for neighbour in connectivity.get(node, []):
+            if neighbour not in parents:
+                parents[neighbour] = node
+                queue.append(neighbour)
+    return None
+
+
+def check_route_walk():
+    world = WorldState(known_locations_data=make_world_data(50, 0))
+    world.add_agent_to_location("A", "Loc 0")
+    path = world.find_path("Loc 0", "Loc 20")
+    resolver = LLMActionResolver(None)
+    world.apply_state_updates(resolver._route_updates("A", path), triggered_by="A")
+    hops = 1
+    while True:
+        result = resolver.follow_route("A", world.agent_locations["A"], world)
+        if result is None:
+            break
+        world.apply_state_updates(result["world_state_updates"], triggered_by="A")
+        hops += 1
+    assert world.agent_locations["A"] == "Loc 20" and hops == len(path) - 1 and not world.get_agent_route("A")
+
+
+def run(queries: int = 2000):
+    check_route_walk()
+    rng = random.Random(0)
+    print(f"{'locations':>9} {'compile (ms)':>13} {'dict BFS (us)':>14} {'cold path (us)':>15} "
+          f"{'cached path (us)':>17} {'3-hop (us)':>11}")
+    for num_locations in [100, 1_000, 5_000, 20_000]:
+        world_data = make_world_data(num_locations, 0)
+        connectivity = {name: data["exits_to"] for name, data in world_data.items()}
+        scenario = compile_scenario(world_data)
+        names = list(connectivity)
+        pairs = [(rng.choice(names), rng.choice(names)) for _ in range(queries)]
+        sources = names[:20]
+
+        start = time.perf_counter()
+        graph = LocationGraph(scenario, cache_size=len(sources))
+        compile_s = time.perf_counter() - start
+
+        sample = pairs[:200]
+        start = time.perf_counter()
+        expected = [dict_path(connectivity, a, b) for a, b in sample]
+        dict_s = (time.perf_counter() - start) / len(sample)
+        start = time.perf_counter()
+        found = [graph.shortest_path(a, b) for a, b in sample]
+        cold_s = (time.perf_counter() - start) / len(sample)
+        assert [len(p) for p in found] == [len(p) for p in expected]
+
+        warm = [(sources[i % len(sources)], b) for i, (_, b) in enumerate(pairs)]
+        for source in sources:
+            graph.shortest_path(source, source)
+        start = time.perf_counter()
+        for a, b in warm:
+            graph.shortest_path(a, b)
+        cached_s = (time.perf_counter() - start) / len(warm)
+        start = time.perf_counter()
+        for a, _ in pairs:
+            graph.within_hops(a, 3)
+        hops_s = (time.perf_counter() - start) / len(pairs)
+        print(f"{num_locations:>9} {compile_s * 1000:>13.1f} {dict_s * 1e6:>14.1f} {cold_s * 1e6:>15.1f} "
+              f"{cached_s * 1e6:>17.1f} {hops_s * 1e6:>11.1f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,83 @@
+# src_GM/benchmarks/bench_scenario.py
+"""
+The scenario load step: time to validate and compile KNOWN_LOCATIONS_DATA-style
+data, memory held by the world's locations and items (slotted Item records against
+the previous item dicts), and the item field reads the context renderer does.
+Also checks that schema errors are reported.
+
+Run from src_GM:  python -m benchmarks.bench_scenario
+"""
+import copy
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+
+config.SIMULATION_MODE = "story"  # no per-call debug output
+
+from scenario import compile_scenario  # noqa: E402
+from benchmarks.bench_engine_scaling import make_world_data  # noqa: E402
+
+
+def held_bytes(func):
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def check_validation():
+    data = make_world_data(3)
+    data["Loc 0"]["properties"]["contains"].append({"object": "lamp"})
+    data["Loc 1"]["properties"]["contains"][0]["linked_to"] = {"location": "Loc 2", "object_key": "missing"}
+    data["Loc 2"]["exits_to"].append("Nowhere")
+    try:
+        compile_scenario(data)
+    except ValueError as e:
+        assert "'lamp' has no 'state'" in str(e) and "linked to 'missing'" in str(e), e
+    else:
+        raise AssertionError("invalid scenario accepted")
+    del data["Loc 0"]["properties"]["contains"][-1]
+    del data["Loc 1"]["properties"]["contains"][0]["linked_to"]
+    assert compile_scenario(data).warnings == ["'Loc 2' has an exit to 'Nowhere', which is not a defined location."]
+
+
+def run():
+    check_validation()
+    print(f"{'locations':>9} {'items':>7} {'compile (ms)':>13} {'dicts (KB)':>11} {'records (KB)':>13} "
+          f"{'dict reads (ms)':>16} {'record reads (ms)':>18}")
+    for num_locations, items_per_location in [(100, 10), (1_000, 10), (5_000, 20)]:
+        data = make_world_data(num_locations, items_per_location)
+        start = time.perf_counter()
+        scenario = compile_scenario(data)
+        compile_s = time.perf_counter() - start
+
+        # What a world held before: a private copy of the config's location dicts
+        dict_props, dict_bytes = held_bytes(lambda: {name: copy.deepcopy(loc["properties"]) for name, loc in data.items()})
+        record_props, record_bytes = held_bytes(scenario.new_properties)
+
+        start = time.perf_counter()
+        for props in dict_props.values():
+            for item in props["contains"]:
+                if isinstance(item, dict):
+                    (item.get("object"), item.get("state"), item.get("optional_description"))
+        dict_reads_s = time.perf_counter() - start
+        start = time.perf_counter()
+        for props in record_props.values():
+            for item in props["contains"]:
+                (item.object, item.state, item.optional_description)
+        record_reads_s = time.perf_counter() - start
+        print(f"{num_locations:>9} {num_locations * items_per_location:>7} {compile_s * 1000:>13.1f} "
+              f"{dict_bytes / 1024:>11.0f} {record_bytes / 1024:>13.0f} "
+              f"{dict_reads_s * 1000:>16.2f} {record_reads_s * 1000:>18.2f}")
+
+
+if __name__ == "__main__":
+    run()
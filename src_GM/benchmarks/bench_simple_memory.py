@@ -0,0 +1,119 @@
+# src_GM/benchmarks/bench_simple_memory.py
+"""
+SimpleMemory's deque of lines against the plain string buffer it replaces, which
+rebuilt the whole string on every observation (append, then slice off the front
+once full). Both add 100k observations at several buffer sizes, reading the memory
+context never, every 10 observations (an agent that acts now and then) or after
+every observation; times are the best of 3 runs. The buffers and contexts must be
+identical whenever read (now and then, after each write, or after a long unread
+run), including entries with internal newlines and entries longer than the buffer.
+
+Run from src_GM:  python -m benchmarks.bench_simple_memory
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+
+config.SIMULATION_MODE = "story"  # no per-call debug output
+
+from agent.memory import SimpleMemory  # noqa: E402
+
+
+class StringMemory:
+    """Reference: SimpleMemory as a single string, rebuilt on every write."""
+
+    def __init__(self, max_length: int):
+        self.memory_buffer = ""
+        self.max_length = max_length
+
+    def add_observation(self, observation_text, step=None, type="Generic"):
+        prefix = f"[T:{type}" + (f" S:{step}" if step is not None else "") + "] "
+        new_entry = prefix + str(observation_text).strip()
+        if self.memory_buffer:
+            self.memory_buffer = f"{self.memory_buffer}\n{new_entry}"
+        else:
+            self.memory_buffer = new_entry
+        if len(self.memory_buffer) > self.max_length:
+            excess = len(self.memory_buffer) - self.max_length
+            first_newline = self.memory_buffer.find('\n', excess)
+            if first_newline != -1:
+                self.memory_buffer = self.memory_buffer[first_newline+1:]
+            else:
+                self.memory_buffer = self.memory_buffer[excess:]
+
+    def get_memory_context(self, **kwargs):
+        if not self.memory_buffer:
+            return "No specific memories recalled."
+        return f"Recollections (most recent last):\n{self.memory_buffer}"
+
+
+def make_observations(count: int, rng: random.Random, max_words: int = 30):
+    words = ["the", "old", "cart", "rolls", "past", "a", "quiet", "well", "and", "someone", "laughs"]
+    observations = []
+    for _ in range(count):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(1, max_words)))
+        if rng.random() < 0.1:
+            text = text.replace(" and ", "\nand ")  # multi-line entry
+        observations.append(text)
+    return observations
+
+
+def check_same_output():
+    rng = random.Random(1)
+    for max_length in [0, 1, 10, 50, 200, 5_000, 20_000]:
+        memory, reference = SimpleMemory(None, max_length), StringMemory(max_length)
+        assert memory.get_memory_context() == reference.get_memory_context()
+        for i, text in enumerate(make_observations(3_000, rng, max_words=80)):
+            memory.add_observation(text, step=i if i % 3 else None, type="Perception")
+            reference.add_observation(text, step=i if i % 3 else None, type="Perception")
+            assert memory._length == len(reference.memory_buffer), (max_length, i)
+            # Reads now and then, after each write for a while, and not at all for a while
+            if i % 7 == 0 and not 300 < i % 1000 < 700 or 100 < i % 1000 < 110:
+                assert memory.get_memory_context() == reference.get_memory_context(), (max_length, i)
+                assert memory.memory_buffer == reference.memory_buffer
+        restored = SimpleMemory(None, max_length)
+        restored.set_state(memory.get_state())
+        restored.add_observation("After the restore.")
+        reference.add_observation("After the restore.")
+        assert restored.get_memory_context() == reference.get_memory_context()
+
+
+def timed(make_memories, observations, read_every: int, repeats: int = 3):
+    """
+    Best-of-`repeats` seconds for each memory maker to add every observation to a new
+    memory, reading the context every read_every (0: never). The makers take turns.
+    """
+    best = [float("inf")] * len(make_memories)
+    for _ in range(repeats):
+        for index, make_memory in enumerate(make_memories):
+            memory = make_memory()
+            start = time.perf_counter()
+            for i, text in enumerate(observations):
+                memory.add_observation(text, step=i, type="Perception")
+                if read_every and i % read_every == 0:
+                    memory.get_memory_context()
+            best[index] = min(best[index], time.perf_counter() - start)
+    return best
+
+
+def run(num_observations: int = 100_000):
+    check_same_output()
+    observations = make_observations(num_observations, random.Random(0))
+    print(f"{num_observations} observations (default MAX_MEMORY_TOKENS is {config.MAX_MEMORY_TOKENS})")
+    print(f"{'max_length':>10} {'context read':>13} {'string (ms)':>12} {'deque (ms)':>11} {'speedup':>8}")
+    for max_length in [1_000, 20_000, 200_000]:
+        for read_every in [0, 10, 1]:
+            string_s, deque_s = timed([lambda: StringMemory(max_length), lambda: SimpleMemory(None, max_length)],
+                                      observations, read_every)
+            label = f"every {read_every}" if read_every else "never"
+            print(f"{max_length:>10} {label:>13} {string_s * 1000:>12.1f} {deque_s * 1000:>11.1f} "
+                  f"{string_s / deque_s:>7.1f}x")
+
+
+if __name__ == "__main__":
+    run()
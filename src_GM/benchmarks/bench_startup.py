@@ -0,0 +1,70 @@
+# src_GM/benchmarks/bench_startup.py
+"""
+Measures simulation startup (building agents, director and resolver) as the
+agent count grows, with and without the shared model pool (LLM_POOL_ENABLED).
+Reports startup time, LLM client objects built and genai.configure() calls.
+
+Real GenerativeModel objects are built (no request is sent), so the
+google-generativeai package is needed; the API key can be a dummy.
+
+Run from src_GM:  python -m benchmarks.bench_startup
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+
+import main  # noqa: E402
+from llm.pool import get_model_pool  # noqa: E402
+from benchmarks.bench_engine_scaling import build  # noqa: E402
+
+# After the imports: bench_engine_scaling switches to the stub backend on import.
+config.LLM_BACKEND = "gemini"
+config.GEMINI_API_KEY = config.GEMINI_API_KEY or "benchmark-dummy-key"
+config.LLM_CACHE_ENABLED = False  # keep the benchmark from touching the on-disk cache
+config.SIMULATION_MODE = "story"
+
+
+def measure(num_agents: int, pooled: bool):
+    config.LLM_POOL_ENABLED = pooled
+    get_model_pool().clear()
+    main._genai_configured = False
+    counts = {"built": 0, "configure": 0}
+
+    original_build, original_configure = main._build_llm_instance, main.genai.configure
+
+    def counting_build(*args, **kwargs):
+        counts["built"] += 1
+        return original_build(*args, **kwargs)
+
+    def counting_configure(*args, **kwargs):
+        counts["configure"] += 1
+        return original_configure(*args, **kwargs)
+
+    main._build_llm_instance, main.genai.configure = counting_build, counting_configure
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            build(num_agents, max(4, num_agents // 2))
+            elapsed = time.perf_counter() - start
+    finally:
+        main._build_llm_instance, main.genai.configure = original_build, original_configure
+    return elapsed, counts
+
+
+def run():
+    print(f"{'agents':>7} {'pool':>5} {'startup_s':>10} {'clients':>8} {'configure':>10}")
+    for num_agents in [2, 10, 100, 500]:
+        for pooled in (False, True):
+            elapsed, counts = measure(num_agents, pooled)
+            print(f"{num_agents:>7} {'on' if pooled else 'off':>5} {elapsed:>10.3f} "
+                  f"{counts['built']:>8} {counts['configure']:>10}")
+
+
+if __name__ == "__main__":
+    run()
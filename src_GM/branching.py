@@ -0,0 +1,126 @@
+# src_GM/branching.py
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import config
+from event_queue import EventQueue
+from event_store import ColumnarEventStore
+from turn import TurnRunner
+from world import WorldState
+
+
+class SimulationBranch:
+    """
+    One line of a what-if run: a world, its agents and Director, plus the resolver and
+    dispatcher (and optional event queue, batch planner and pacing) that drive them.
+    Turns are played by the same TurnRunner as the main loop, without console output
+    or text logs. fork() makes a copy-on-write child branch (see WorldState.fork) that
+    can run alongside its siblings in run_branches().
+    """
+
+    def __init__(self, name: str, world: WorldState, agents: List, director, action_resolver,
+                 event_dispatcher, seed: Optional[int] = None,
+                 apply_command: Optional[Callable[[str, WorldState, Any], bool]] = None,
+                 event_queue: Optional[EventQueue] = None, batch_planner=None, pacing=None,
+                 last_agent=None):
+        self.name = name
+        self.world = world
+        self.agents = agents
+        self.director = director
+        self.action_resolver = action_resolver
+        self.event_dispatcher = event_dispatcher
+        self.event_queue = event_queue
+        self.batch_planner = batch_planner
+        self.pacing = pacing
+        self.turn_runner = TurnRunner(world, director, action_resolver, event_dispatcher, event_queue,
+                                      batch_planner, pacing, narrate=False)
+        # Turn order comes from the branch's own RNG so parallel branches do not share one
+        self.rng = random.Random(seed)
+        self.last_agent = last_agent  # the agent that acted last, never first in the next step
+        self.apply_command = apply_command
+        self.commands: List[str] = []
+        self.steps_run = 0
+        self.wall_time_s = 0.0
+
+    def fork(self, name: str, commands: Optional[List[str]] = None, seed: Optional[int] = None) -> "SimulationBranch":
+        """
+        Returns a child branch sharing this branch's unchanged state. The commands
+        (same syntax as the interactive prompt, e.g. 'w Heavy Rain') are applied to
+        the child right away; they are what makes it a different what-if.
+        """
+        world = self.world.fork(event_columns=ColumnarEventStore())
+        agents = [agent.fork() for agent in self.agents]
+        for agent in agents:
+            world.register_agent(agent)
+        event_dispatcher = self.event_dispatcher.fork(world)
+        event_queue = None
+        if self.event_queue:
+            # The child queues into its own dispatcher; whatever the parent queued stays with it
+            event_queue = EventQueue(event_dispatcher, movements=self.event_queue.movements)
+            event_queue.attach(world)
+        director = self.director.fork(world, event_queue or event_dispatcher)
+        # Resolvers hold only their LLM client and a world reference
+        action_resolver = type(self.action_resolver)(self.action_resolver.llm, world)
+        last_agent = next((agent for agent in agents if self.last_agent and agent.name == self.last_agent.name), None)
+        branch = SimulationBranch(name, world, agents, director, action_resolver, event_dispatcher,
+                                  seed=self.rng.randrange(2**31) if seed is None else seed,
+                                  apply_command=self.apply_command, event_queue=event_queue,
+                                  batch_planner=self.batch_planner, pacing=self.pacing, last_agent=last_agent)
+        for command in commands or []:
+            branch.command(command)
+        return branch
+
+    def command(self, command: str) -> bool:
+        """Applies one user command to this branch. Returns False for a quit command."""
+        if self.apply_command is None:
+            raise ValueError(f"Branch '{self.name}' has no command handler.")
+        self.commands.append(command)
+        return self.apply_command(command.lower().strip(), self.world, self.director)
+
+    def run(self, steps: int) -> Dict[str, Any]:
+        """Runs this branch for a number of steps, without console narration or text logs."""
+        started = time.perf_counter()
+        for _ in range(steps):
+            self.world.advance_step()
+            self.steps_run += 1
+            step_agents = self.turn_runner.turn_order(self.agents, self.rng, self.last_agent)
+            self.last_agent = self.turn_runner.run_turns(step_agents) or self.last_agent
+            self.turn_runner.end_step()
+        self.wall_time_s += time.perf_counter() - started
+        return self.summary()
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "commands": self.commands,
+            "steps_run": self.steps_run,
+            "final_step": self.world.current_step,
+            "turns": self.turn_runner.turns,
+            "outcomes": dict(self.turn_runner.outcome_counts),
+            "final_weather": self.world.global_context.get('weather'),
+            "director_goal": self.director.narrative_goal,
+            "agent_locations": dict(self.world.agent_locations),
+            "events": len(self.world.event_columns) if self.world.event_columns is not None else None,
+            "shared_locations": self.world.shared_location_count(),
+            "wall_time_s": round(self.wall_time_s, 3),
+        }
+
+
+def run_branches(branches: List[SimulationBranch], steps: int,
+                 max_workers: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Runs several branches for the same number of steps in parallel threads (the turns
+    mostly wait on LLM calls). Returns each branch's summary by name.
+    """
+    if len({branch.name for branch in branches}) != len(branches):
+        raise ValueError(f"Branch names must be unique: {[branch.name for branch in branches]}")
+    if not branches:
+        return {}
+    max_workers = max_workers or getattr(config, 'BRANCH_MAX_WORKERS', 4)
+    if config.SIMULATION_MODE == 'debug':
+        print(f"[Branching] Running {len(branches)} branches for {steps} steps "
+              f"({min(max_workers, len(branches))} at a time).")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {branch.name: executor.submit(branch.run, steps) for branch in branches}
+        return {name: future.result() for name, future in futures.items()}
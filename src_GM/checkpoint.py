@@ -0,0 +1,154 @@
+# src_GM/checkpoint.py
+import glob
+import os
+import pickle
+import random
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+import config
+from event_arena import get_event_arena, set_event_arena
+
+CHECKPOINT_FORMAT = 1
+
+
+def snapshot_simulation(world, agents: List, director, step: int, loop_state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Collects everything needed to continue a run after `step`: the world, each
+    agent's goals, intent and memory, the Director's goal and memory, the RNG
+    state and the main loop counters (loop_state). LLM clients, the dispatcher
+    and the resolver hold no run state and are rebuilt from config on resume.
+    The columnar event history is not included (only its row count): it is
+    rebuilt from the on-disk event store (see restore_event_columns).
+    """
+    return {
+        "format": CHECKPOINT_FORMAT,
+        "step": step,
+        "seed": config.RANDOM_SEED,
+        "rng_state": random.getstate(),
+        "world": world.get_state(),
+        "event_columns_rows": len(world.event_columns) if world.event_columns is not None else None,
+        # Shared refs are pickled once and re-registered in this arena on load
+        "event_arena": get_event_arena(),
+        "agents": {agent.name: {"goals": agent.goals, "action_buffer": agent.action_buffer,
+                                "memory": agent.memory.get_state()} for agent in agents},
+        "director": {"narrative_goal": director.narrative_goal, "goals": director.goals,
+                     "memory": director.memory.get_state() if director.memory else None},
+        "loop": loop_state,
+    }
+
+
+def restore_simulation(state: Dict[str, Any], world, agents: List, director) -> Dict[str, Any]:
+    """
+    Applies a snapshot to freshly built simulation objects (same scenario config).
+    Returns the saved main loop counters.
+    """
+    if state.get("format") != CHECKPOINT_FORMAT:
+        raise ValueError(f"Unsupported checkpoint format: {state.get('format')}")
+    saved_agents = state["agents"]
+    if sorted(saved_agents) != sorted(agent.name for agent in agents):
+        raise ValueError(
+            f"Checkpoint agents {sorted(saved_agents)} do not match the configured agents "
+            f"{sorted(agent.name for agent in agents)}.")
+
+    world.set_state(state["world"])
+    if state.get("event_arena") is not None:
+        set_event_arena(state["event_arena"])
+    for agent in agents:
+        saved = saved_agents[agent.name]
+        agent.goals = saved["goals"]
+        agent.action_buffer = saved["action_buffer"]
+        agent.memory.set_state(saved["memory"])
+    director.narrative_goal = state["director"]["narrative_goal"]
+    director.goals = state["director"]["goals"]
+    if director.memory and state["director"]["memory"] is not None:
+        director.memory.set_state(state["director"]["memory"])
+    config.RANDOM_SEED = state["seed"]
+    random.setstate(state["rng_state"])
+    return state["loop"]
+
+
+def restore_event_columns(state: Dict[str, Any], world) -> None:
+    """
+    Fills an empty world.event_columns with the events up to the checkpoint's step,
+    read from world.event_store (call it after truncate_after). Without an event
+    store the columnar history restarts empty.
+    """
+    if world.event_columns is None:
+        return
+    if world.event_store is None:
+        print("[Checkpoint] Warning: no event store to rebuild the columnar event history from; "
+              "it starts empty.")
+        return
+    for event in world.event_store.iter_events(to_step=state["step"]):
+        world.event_columns.append(event)
+    expected_rows = state.get("event_columns_rows")
+    if expected_rows is not None and expected_rows != len(world.event_columns):
+        print(f"[Checkpoint] Warning: rebuilt {len(world.event_columns)} columnar events, "
+              f"the checkpoint had {expected_rows}.")
+
+
+def save_checkpoint(state: Dict[str, Any], path: str) -> int:
+    """Writes a snapshot as zlib-compressed pickle (atomically). Returns the file size in bytes."""
+    data = zlib.compress(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL),
+                         getattr(config, 'CHECKPOINT_COMPRESSION_LEVEL', 1))
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return len(data)
+
+
+def load_checkpoint(path: str) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        return pickle.loads(zlib.decompress(f.read()))
+
+
+def checkpoint_path(step: int) -> str:
+    return os.path.join(config.CHECKPOINT_DIR, f"step-{step:04d}.ckpt")
+
+
+def latest_checkpoint(directory: str) -> Optional[str]:
+    """The checkpoint with the highest step in a directory, or None."""
+    paths = sorted(glob.glob(os.path.join(directory, "step-*.ckpt")))
+    return paths[-1] if paths else None
+
+
+class Checkpointer:
+    """
+    Saves a checkpoint every CHECKPOINT_EVERY_N_STEPS steps (and on request, e.g.
+    when the user quits), keeping the newest CHECKPOINT_KEEP files. With 0 it saves
+    nothing.
+    """
+
+    def __init__(self, every_n_steps: int, keep: int = 3):
+        self.every_n_steps = every_n_steps
+        self.keep = keep
+        self.saved = 0
+        self.total_seconds = 0.0
+        self.last_path: Optional[str] = None
+        self.last_bytes = 0
+
+    def maybe_save(self, world, agents: List, director, step: int, loop_state: Dict[str, Any],
+                   force: bool = False) -> Optional[str]:
+        if self.every_n_steps <= 0 or not force and step % self.every_n_steps:
+            return None
+        started = time.perf_counter()
+        path = checkpoint_path(step)
+        self.last_bytes = save_checkpoint(snapshot_simulation(world, agents, director, step, loop_state), path)
+        self.total_seconds += time.perf_counter() - started
+        self.saved += 1
+        self.last_path = path
+        for old_path in sorted(glob.glob(os.path.join(config.CHECKPOINT_DIR, "step-*.ckpt")))[:-max(1, self.keep)]:
+            os.remove(old_path)
+        if config.SIMULATION_MODE == 'debug':
+            print(f"[Checkpoint] Step {step} saved to {path} ({self.last_bytes} bytes).")
+        return path
+
+    def stats(self) -> Dict[str, Any]:
+        return {"saved": self.saved, "last_path": self.last_path, "last_bytes": self.last_bytes,
+                "total_s": round(self.total_seconds, 4)}
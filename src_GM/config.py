@@ -5,9 +5,8 @@ from dotenv import load_dotenv
 # Load API Key
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise ValueError(
-        "Gemini API Key not found. Make sure it's set in the .env file.")
+# The key is only checked when a live model is created (see main.create_llm_instance),
+# so the "replay" and "stub" backends run without one.
 
 # Model Name
 MODEL_NAME = "gemini-2.0-flash-lite" 
@@ -63,6 +62,142 @@ AGENT_REFLECTION_GEN_CONFIG = {
     "max_output_tokens": 300,  # Enough for a few insights
 }
 
+# --- LLM Backend ---
+# "gemini" (live API), "record" (live API, every call written to the cassette),
+# "replay" (responses served from the cassette, no network) or
+# "stub" (deterministic built-in fake model, for benchmarks and scaling tests).
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+LLM_CASSETTE_PATH = "llm_cassette.jsonl.gz"
+# Seed for the simulation RNG (agent turn order). None picks a fresh one per run;
+# recorded cassettes store the seed so replays follow the same turn order.
+RANDOM_SEED = None
+# Stub backend: synthetic latency per call (seconds, plus uniform jitter) and RNG seed
+STUB_LLM_LATENCY = 0.0
+STUB_LLM_LATENCY_JITTER = 0.0
+STUB_LLM_SEED = 0
+
+# --- LLM Response Cache ---
+# Identical requests (same model, prompt and generation config) are served from disk.
+# Off by default: with it on, reruns replay the same answers even at high temperature.
+# Meant for regression runs (main.py --cache).
+LLM_CACHE_ENABLED = False
+LLM_CACHE_PATH = "llm_cache.sqlite3"
+LLM_CACHE_MAX_ENTRIES = 5000  # LRU eviction above this many stored responses
+# Component kinds that bypass the cache: "planning", "resolver", "director", "reflection", "story"
+LLM_CACHE_EXCLUDED_PURPOSES = []
+
+# --- Rate Limiting ---
+# Shared quota for all live LLM calls (defaults match the gemini-2.0-flash-lite free tier).
+LLM_REQUESTS_PER_MINUTE = 30
+LLM_TOKENS_PER_MINUTE = 1_000_000
+# Transient API errors (429, 5xx, timeouts) are retried with exponential backoff and jitter;
+# a retry delay suggested by the server takes precedence.
+LLM_MAX_RETRIES = 6
+LLM_BACKOFF_BASE_SECONDS = 2.0
+LLM_BACKOFF_MAX_SECONDS = 60.0
+
+# --- Model Pool ---
+# Components asking for the same model, generation config and component kind share one
+# client (e.g. all agents' planning calls), so startup cost does not grow with agent count.
+LLM_POOL_ENABLED = True
+
+# --- Batch Planning ---
+# Plan this many agents per LLM request (1 = one request per agent, the default).
+# Agents in a batch plan from the same snapshot of the world, so later agents in the
+# batch do not see the earlier ones' actions of this step before choosing.
+BATCH_PLANNING_SIZE = 1
+
+# --- Pacing ---
+# How the simulation loop waits between LLM-heavy phases (after each plan and each turn):
+# "none" (never), "fixed" (PACING_FIXED_SECONDS every time) or
+# "quota" (only when the rate limiter is short of quota). --no-pause forces "none".
+PACING_POLICY = "quota"
+PACING_FIXED_SECONDS = 1.0
+
+# --- Prompt Prefix (Context) Caching ---
+# Planning and resolver prompts are sent as [stable prefix, volatile suffix].
+# "provider": prefixes are registered once as Gemini CachedContent (the model must support it),
+# "local": no upload, only counts the input tokens provider caching would save,
+# "off": prompts are sent as-is with no accounting.
+LLM_CONTEXT_CACHE_MODE = "local"
+LLM_CONTEXT_CACHE_TTL_SECONDS = 3600
+
+# --- Async LLM Client ---
+# All LLM calls go through an asyncio client; these bound how many are in flight.
+LLM_MAX_CONCURRENCY = 4
+LLM_PURPOSE_CONCURRENCY = {"reflection": 2, "story": 1}  # per component kind
+ASYNC_REFLECTIONS = True  # reflections run in the background, collected before the next prompt
+# Run the Director's planning call alongside each agent's planning call. The agent then
+# plans without seeing that turn's intervention, which is applied right after.
+OVERLAP_DIRECTOR_PLANNING = False
+
+# --- World Context Cache ---
+# Cache the rendered per-location parts of an agent's static context (location line,
+# exits, agents present, items). Parts are rebuilt only after a mutation touches them
+# (item state changes, arrivals/departures); the weather is always read live.
+WORLD_CONTEXT_CACHE_ENABLED = True
+
+# --- Event Store ---
+# Every world event is also appended to an on-disk store (JSON-lines segments of
+# EVENT_STORE_STEPS_PER_SEGMENT steps plus an index.json), so the full history can be
+# read back with event_store.read_events() while WorldState only keeps the recent events.
+EVENT_STORE_ENABLED = True
+EVENT_STORE_DIR = "event_store"
+EVENT_STORE_STEPS_PER_SEGMENT = 10
+# Columnar copy of the history (event_store.ColumnarEventStore), queryable by step range,
+# location and actor. Saved to EVENT_COLUMNS_DIR at the end of the run; the story
+# generators read it instead of re-parsing simulation_logs.txt when given that directory.
+# Off by default: it holds the whole history in memory. On resume it is rebuilt from the
+# event store.
+EVENT_COLUMNS_ENABLED = False
+EVENT_COLUMNS_DIR = "event_columns"
+
+# --- Checkpoints ---
+# Save a checkpoint (world, memories, Director, RNG and step; zlib-compressed pickle) to
+# CHECKPOINT_DIR every N steps and when the user quits; 0 (the default) disables them.
+# Continue with: python main.py --story --resume checkpoints
+CHECKPOINT_EVERY_N_STEPS = 0
+CHECKPOINT_DIR = "checkpoints"
+CHECKPOINT_KEEP = 3  # newest checkpoint files kept
+CHECKPOINT_COMPRESSION_LEVEL = 1  # zlib level: 1 is fast, 9 is smallest
+
+# --- Location Graph ---
+# The exits are compiled into a graph (location_graph.py) when the world is built. With
+# MULTI_HOP_MOVES a MOVE to a known location that is not a direct exit walks the shortest
+# route, one location per turn, without further planning or resolver LLM calls.
+MULTI_HOP_MOVES = True
+LOCATION_GRAPH_BFS_CACHE_SIZE = 1024  # source locations whose shortest-path search is kept
+LOCATION_GRAPH_NEIGHBORHOOD_CACHE_SIZE = 4096  # (location, radius) neighborhoods kept for event delivery
+
+# --- Event Radius ---
+# Loud actions (a gunshot, an engine starting) carry a radius: the resolver may add
+# "loudness: <n>" to an action's parameters, and Director ambient events accept it too.
+# RadiusEventDispatcher delivers such an event to the agents up to n moves away, who
+# perceive it through DISTANT_EVENT_TEMPLATE; agents further away never see it.
+EVENT_MAX_RADIUS = 3  # larger loudness values are capped
+DISTANT_EVENT_TEMPLATE = "(heard from {hops} location(s) away) {description}"
+
+# --- Event Queue ---
+# Optionally deliver events in bulk instead of one perceive per event and agent (event_queue.py):
+# events are collected per turn or per step, redundant ones coalesced, and each agent gets its
+# share in one memory write (so at most one reflection). With "step", agents only perceive the
+# events of a step once it ends.
+EVENT_QUEUE_ENABLED = False
+EVENT_QUEUE_FLUSH = "step"  # "turn" or "step"
+EVENT_QUEUE_MOVEMENTS = True  # also deliver agent departures/arrivals (coalesced into one "moves" entry)
+
+# --- Event Arena ---
+# Perceived events are kept once in a shared arena (event_arena.py); memories store small
+# references that are formatted only when a prompt is built, instead of one sentence per listener.
+EVENT_ARENA_ENABLED = True
+
+# --- Branching ---
+# What-if runs: after the main run, fork the world and agents (copy-on-write, see
+# WorldState.fork) into branches that each get their own commands and run in parallel.
+# python main.py --story --headless --branch rain="w Heavy Rain" --branch calm="w Clear"
+BRANCH_STEPS = 5  # steps each branch runs (--branch-steps)
+BRANCH_MAX_WORKERS = 4  # branches run at the same time
+
 # Simulation Settings
 MAX_RECENT_EVENTS = 15
 MAX_MEMORY_TOKENS = 1000  # Increased memory capacity
@@ -123,7 +258,11 @@ KNOWN_LOCATIONS_DATA = {
 AGENT_MEMORY_TYPE = "ShortLongTMemoryIdentityOnly"
 AGENT_PLANNING_TYPE = "SimplePlanningIdentityOnly"
 ACTION_RESOLVER_TYPE = "LLMActionResolverWithReason"
-EVENT_PERCEPTION_MODEL = "DirectEventDispatcher"
+# "SubscriptionEventDispatcher" delivers like "DirectEventDispatcher" but only visits the agents
+# in the event's location (per-location subscriptions that follow agent movements).
+# "RadiusEventDispatcher" also delivers loud events to nearby locations (see Event Radius);
+# the other two ignore event radii.
+EVENT_PERCEPTION_MODEL = "RadiusEventDispatcher"
 STORY_GENERATOR_TYPE = "LLMLogStoryGenerator"
 
 # --- Narrative / Scenario ---
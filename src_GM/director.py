@@ -1,15 +1,14 @@
 # File: src_GM/director.py
 
+import copy
 import re
-import time
 import google.generativeai as genai
 import config
 import random
 from agent.memory import BaseMemory  # Assuming BaseMemory is in agent/memory.py
 from logs import append_to_log_file
 from world import Event  # For creating event objects to dispatch
-
-from google.api_core.exceptions import ResourceExhausted, GoogleAPICallError
+from event_arena import perception_entry
 
 
 
@@ -30,11 +29,24 @@ class Director:
         self.identity= f"You are the Director, an unseen force guiding the narrative of this world. Your goal is to subtly influence the story's direction without direct intervention in order to fulfill the following narrative goal: {self.narrative_goal}."
 
         self.is_initial_prompt = False  # For debugging the first prompt
+        # Text log for the Director's interventions (None: not written, e.g. in branch runs)
+        self.log_file = "simulation_logs_with_director_logs.txt"
 
         if config.SIMULATION_MODE == 'debug':
             print(
                 f"Director '{self.name}' initialized with goal: '{self.narrative_goal}', memory: {type(self.memory).__name__}, and dispatcher.")
 
+    def fork(self, world_state_ref, event_dispatcher_ref=None) -> 'Director':
+        """Returns a copy of the Director for a branch run on a forked world (see WorldState.fork)."""
+        clone = copy.copy(self)
+        clone.world = world_state_ref
+        if event_dispatcher_ref is not None:
+            clone.event_dispatcher = event_dispatcher_ref
+        clone.goals = list(self.goals)
+        clone.memory = self.memory.fork(clone) if self.memory else None
+        clone.log_file = None  # the text log belongs to the parent run
+        return clone
+
     def perceive(self, event: Event):
         """
         The Director perceives ALL events logged in the world.
@@ -42,7 +54,8 @@ class Director:
         """
         # The Director's perception is simple: it just stores the event description in its memory.
         # It doesn't need complex filtering like individual agents based on location.
-        perception_text = f"You just perceived in step {event.step} of the simulation the following event at {event.location} by {event.triggered_by}: {event.description}"
+        perception_text = perception_entry(event, Director._perception_text,
+                                           self.memory.RENDERS_EAGERLY)  # rendered when a prompt is built
         self.memory.add_observation(
             perception_text)
         if config.SIMULATION_MODE == 'debug':
@@ -50,6 +63,10 @@ class Director:
             print(
                 f"DEBUG [{self.name} PerceivedEvent]: {event.description[:70]}...")
 
+    @staticmethod
+    def _perception_text(event: Event) -> str:
+        return f"You just perceived in step {event.step} of the simulation the following event at {event.location} by {event.triggered_by}: {event.description}"
+
     def plan_intervention(self): 
         """
         Uses its memory, goals, and an LLM to decide on an environmental intervention.
@@ -77,7 +94,7 @@ Current World State Summary (as of Step {current_step}):
 Your Past Interventions and Reflections (from your memory):
 {director_memory_context}
 
-Based on your narrative goal, the current world state and  your past actions (and their outcomes from memory), what single environmental intervention will you enact next? You can change the weather or add a new object to a location, the objects must be inanimate.
+Based on your narrative goal, the current world state and  your past actions (and their outcomes from memory), what single environmental intervention will you enact next? You can change the weather, add a new object to a location, the objects must be inanimate, or make something happen in a location (a sound, a sight), which can be loud enough to be noticed from nearby locations.
 Your actions are powerful but should be used judiciously to nudge the story and select carefully what action to take cause there is a limit to the amount of actions you can do.
 Choose ONE action from the list below. Be precise with parameters.
 
@@ -85,7 +102,9 @@ Allowed Environmental Actions & Format:
 1.  CHANGE_WEATHER: <new_weather_condition>
 2.  ADD_OBJECT: object: <object_name>(leave details to description field) , state: <initial_state> , description: <text_desc> , location: <object_location_name>(ONLY ONE of the Existing Locations listed above)
 (e.g ADD_OBJECT: object: Ancient Key , state: rusty , description: An old, rusty key with intricate engravings inside under the table. , location: Library) 
-3.  DO_NOTHING: No intervention is needed right now.
+3.  CREATE_AMBIENT_EVENT: description: <what happens> , location: <location_name>(ONLY ONE of the Existing Locations listed above) , loudness: <0-{getattr(config, 'EVENT_MAX_RADIUS', 3)}>(optional, how many locations away it can be heard; 0 or omitted: only there)
+(e.g CREATE_AMBIENT_EVENT: description: The church bell starts ringing on its own. , location: Chapel , loudness: 2)
+4.  DO_NOTHING: No intervention is needed right now.
 
 Output your chosen action in the format: ACTION_TYPE: parameters
 
@@ -124,11 +143,6 @@ Your chosen environmental intervention (single line):"""
 
             return intervention_intent
         
-        except ResourceExhausted as e:
-            print(
-                f"[{self.name} Error]: LLM generation failed: {e}. Waiting 10 seconds and retrying...")
-            time.sleep(10)
-            return self.plan_intervention()
         except Exception as e:
             print(
                 f"[{self.name} Error]: LLM generation for intervention plan failed: {e}")
@@ -144,20 +158,19 @@ Your chosen environmental intervention (single line):"""
         for agent_name in self.world.agent_locations:
             summary += f"  - {agent_name} is in {self.world.agent_locations.get(agent_name,'Unknown')}\n"
         summary += f"Existing Locations:\n"
-        for loc_name in self.world.location_descriptions:
+        for loc_name in self.world.locations:
             summary += f"  - {loc_name}\n"
         summary += "Location Details:\n"
-        for loc_name in self.world.location_descriptions:
+        for loc_name, location in self.world.locations.items():
             summary += f"  - {loc_name}:\n"
-            summary += f"    Description: {self.world.location_descriptions.get(loc_name, 'N/A')}\n"
-            summary += f"    Exits: {self.world.location_connectivity.get(loc_name, [])}\n"
+            summary += f"    Description: {location.description}\n"
+            summary += f"    Exits: {location.exit_names()}\n"
             summary += "Key Items/Objects:\n"
             items_in_loc = self.world.location_properties.get(loc_name, {}).get("contains", [])
             if items_in_loc:
                 summary += f"  In {loc_name}:\n"
                 for item in items_in_loc:
-                    if isinstance(item, dict):
-                        summary += f"    - {(item.get('optional_description') or '')}({item.get('object', 'Unnamed Object')}): {item.get('state', 'unknown state')}\n"
+                    summary += f"    - {(item.optional_description or '')}({item.object}): {item.state}\n"
             else:
                 summary += f"  In {loc_name}: No specific items of note.\n"
             summary += f"    Agents Here: {self.world.get_agents_at(loc_name)}\n"
@@ -214,16 +227,15 @@ Your chosen environmental intervention (single line):"""
             elif action_type == "CREATE_AMBIENT_EVENT":
                 params = self._parse_params(params_str)  # Use the new parser
                 event_description_param = params.get("description")
-                event_location_param = params.get("location")
+                event_location_param = params.get("location") or ""
+                scope = "global" if event_location_param.lower() == "global" else "local"
 
-                if event_location_param.lower() != "global":
-                    scope = "local"
-
-                if event_description_param:
+                if event_description_param and event_location_param:
                     action_succeeded = True
                     event_description = event_description_param
                     event_to_dispatch = Event(
-                        event_description, event_location_param if scope == "local" else "Unknown", scope, current_step, None)
+                        event_description, event_location_param if scope == "local" else "Unknown", scope, current_step, None,
+                        self._parse_loudness(params.get("loudness")))
                     if config.SIMULATION_MODE == 'debug':
                         print(
                             f"  Ambient event prepared: {event_description} at {event_location_param if scope == 'local' else 'Unknown'}."
@@ -272,7 +284,7 @@ Your chosen environmental intervention (single line):"""
                 if event_to_dispatch:
                     # Log the event to the world's central log first
                     if action_type != "ADD_OBJECT":
-                        self.world.log_event(event_to_dispatch.description,event_to_dispatch.scope,event_to_dispatch.location,event_to_dispatch.triggered_by)
+                        self.world.log_event(event_to_dispatch.description,event_to_dispatch.scope,event_to_dispatch.location,event_to_dispatch.triggered_by,event_to_dispatch.radius)
                     # Then dispatch it
                     if config.SIMULATION_MODE == 'debug':
                         print(
@@ -280,8 +292,9 @@ Your chosen environmental intervention (single line):"""
                     if action_type != "ADD_OBJECT":
                         self.event_dispatcher.dispatch_event(
                             event_to_dispatch, self.world.registered_agents, self.world.agent_locations)
-                    append_to_log_file(
-                        "simulation_logs_with_director_logs.txt", f"""Director:\n {event_to_dispatch.description}\n\n""")
+                    if self.log_file:
+                        append_to_log_file(
+                            self.log_file, f"""Director:\n {event_to_dispatch.description}\n\n""")
             elif action_type != "DO_NOTHING":
                 self.memory.add_observation(
                     f"Action Failed: Attempted '{intervention_action_string}', but it could not be applied."
@@ -296,6 +309,14 @@ Your chosen environmental intervention (single line):"""
                 step=current_step, type="InterventionError"
             )
 
+    def _parse_loudness(self, loudness_str) -> int:
+        """Event radius from an optional "loudness: <n>" parameter (0 when missing or invalid), capped at EVENT_MAX_RADIUS."""
+        try:
+            radius = max(0, int(str(loudness_str).strip()))
+        except (TypeError, ValueError):
+            return 0
+        return min(radius, getattr(config, 'EVENT_MAX_RADIUS', 3))
+
     def _parse_params(self, params_str: str) -> dict:
         """
         Parses a comma-separated string of "key: value" pairs into a dictionary.
@@ -0,0 +1,113 @@
+# src_GM/event_arena.py
+import threading
+import weakref
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+import config
+from event_store import Event
+
+# Turns an event into the sentence a memory shows for it (e.g. Agent._perception_text)
+Renderer = Callable[[Event], str]
+
+
+class EventRef:
+    """
+    A memory entry pointing at an event in the arena. It is rendered only when a
+    prompt is built (str(ref)), and one ref is shared by every memory that
+    perceived the same event through the same renderer.
+    """
+    __slots__ = ("event", "render", "__weakref__")
+
+    def __init__(self, event: Event, render: Renderer):
+        self.event = event
+        self.render = render
+
+    def __str__(self) -> str:
+        # Stripped, like the text entries memories store
+        return self.render(self.event).strip()
+
+    def __repr__(self) -> str:
+        return f"EventRef({self.event.step}, {self.render.__qualname__})"
+
+    def __reduce__(self):
+        # Used by pickle (checkpoints): re-registered in the restored arena, so refs stay shared
+        return (_restore_ref, (get_event_arena(), self.event, self.render))
+
+
+class EventArena:
+    """
+    Store of the events agents and the Director perceive. Memories keep EventRefs
+    (the event plus the renderer that formats it) instead of one formatted sentence
+    per listener, so the RAM an event takes does not grow with the number of agents
+    that perceive it. The arena only holds weak references: once no memory keeps a
+    ref (trimmed short-term memory, finished branches) it and its event are freed.
+    """
+
+    def __init__(self):
+        self._refs: 'weakref.WeakValueDictionary[Tuple[Event, Renderer], EventRef]' = weakref.WeakValueDictionary()
+        # Branch runs perceive from several threads
+        self._lock = threading.Lock()
+        self.refs_requested = 0
+
+    def __len__(self) -> int:
+        """Number of distinct events some memory still refers to."""
+        return len({event for event, _ in list(self._refs.keys())})
+
+    def ref(self, event: Event, render: Renderer) -> EventRef:
+        """The shared memory entry for an event as render formats it."""
+        with self._lock:
+            self.refs_requested += 1
+            return self._register(event, render)
+
+    def _register(self, event: Event, render: Renderer) -> EventRef:
+        shared = self._refs.get((event, render))
+        if shared is None:
+            shared = self._refs[(event, render)] = EventRef(event, render)
+        return shared
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The refs are saved by the memories holding them and re-registered on load
+        return {"refs_requested": self.refs_requested}
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__init__()
+        self.__dict__.update(state)
+
+    def stats(self) -> Dict[str, int]:
+        return {"events": len(self), "refs": len(self._refs), "refs_requested": self.refs_requested}
+
+
+def _restore_ref(arena: EventArena, event: Event, render: Renderer) -> EventRef:
+    with arena._lock:
+        return arena._register(event, render)
+
+
+_shared_arena: Optional[EventArena] = None
+_arena_lock = threading.Lock()
+
+
+def get_event_arena() -> EventArena:
+    """Returns the process-wide event arena."""
+    global _shared_arena
+    with _arena_lock:
+        if _shared_arena is None:
+            _shared_arena = EventArena()
+    return _shared_arena
+
+
+def set_event_arena(arena: EventArena):
+    """Makes a restored arena (see checkpoint.restore_simulation) the process-wide one."""
+    global _shared_arena
+    with _arena_lock:
+        _shared_arena = arena
+
+
+def perception_entry(event: Event, render: Renderer, eager: bool = False) -> Union[EventRef, str]:
+    """
+    What a memory stores for a perceived event: an arena ref, or the rendered text
+    with EVENT_ARENA_ENABLED off or for a memory that renders entries as they are
+    added (eager, see BaseMemory.RENDERS_EAGERLY).
+    """
+    if getattr(config, 'EVENT_ARENA_ENABLED', True) and not eager:
+        return get_event_arena().ref(event, render)
+    return render(event)
@@ -1,6 +1,6 @@
 # src_GM/event_dispatcher.py
 from abc import ABC, abstractmethod
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 
 from world import Event  # Import the Event namedtuple
 from agent.agent import Agent  # Import the Agent class
@@ -27,6 +27,34 @@ class BaseEventDispatcher(ABC):
         """
         pass
 
+    def route_event(self, event: Event, registered_agents: Dict[str, Agent], agent_locations: Dict[str, str]) -> List[Tuple[str, Event]]:
+        """
+        The delivery plan of an event without delivering it: (agent name, event as that
+        agent perceives it) pairs in delivery order. Used by EventQueue, which delivers
+        several events per agent at once.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot route events without delivering them.")
+
+    def attach(self, world) -> None:
+        """Lets a dispatcher follow a world's agent movements. Stateless dispatchers ignore it."""
+
+    def fork(self, world) -> 'BaseEventDispatcher':
+        """Returns the dispatcher for a forked world (see WorldState.fork); stateless ones are shared."""
+        return self
+
+    @staticmethod
+    def _deliver(event: Event, agent_name: str, agent_obj: Agent, dispatched_to: List[str]):
+        """Calls an agent's perceive method, reporting (not raising) failures."""
+        try:
+            agent_obj.perceive(event)
+            dispatched_to.append(agent_name)
+        except AttributeError:
+            print(
+                f"[Dispatcher Error]: Agent {agent_name} object lacks 'perceive' method!")
+        except Exception as e:
+            print(
+                f"[Dispatcher Error]: Failed during perceive call for {agent_name}: {e}")
+
 
 class DirectEventDispatcher(BaseEventDispatcher):
     """
@@ -37,51 +65,167 @@ class DirectEventDispatcher(BaseEventDispatcher):
     (Based on the logic previously in WorldState.log_event)
     """
 
+    def route_event(self, event: Event, registered_agents: Dict[str, Agent], agent_locations: Dict[str, str]) -> List[Tuple[str, Event]]:
+        recipients = []
+        for agent_name in registered_agents:
+            # Determine if the agent should perceive based on scope and location
+            if event.scope == 'global':
+                recipients.append((agent_name, event))
+            elif event.location == agent_locations.get(agent_name):  # Check if agent is at the event location
+                if event.triggered_by != agent_name:
+                    recipients.append((agent_name, event))
+        return recipients
+
     def dispatch_event(self, event: Event, registered_agents: Dict[str, Agent], agent_locations: Dict[str, str]) -> List[str]:
         dispatched_to = []
-        # Log processing start
-        # if config.SIMULATION_MODE == 'debug':
-        #     print(
-        #     f"[Dispatcher '{type(self).__name__}']: Processing event: {event.scope} @ {event.location or 'Global'} - '{event.description[:50]}...'")
+        # If perception criteria met, attempt to call agent's perceive method
+        for agent_name, perceived in self.route_event(event, registered_agents, agent_locations):
+            self._deliver(perceived, agent_name, registered_agents[agent_name], dispatched_to)
+        return dispatched_to
 
-        for agent_name, agent_obj in registered_agents.items():
-            agent_current_loc = agent_locations.get(agent_name)
-            should_perceive = False
 
-            # Determine if the agent should perceive based on scope and location
-            if event.scope == 'global':
-                should_perceive = True
-            elif event.location == agent_current_loc:  # Check if agent is at the event location
-                if event.triggered_by != agent_name:
-                   should_perceive = True
-                # if event.triggered_by == agent_name and event.description.split()[1] == "says":
-                #     should_perceive = False  # Current: Dispatch action outcome to all at location
-                #     print(
-                #         f"[Dispatcher]: {agent_name} triggered the event, but it is not perceiving it cause is SPEAK type.")
-                # else:
-                #     should_perceive = True
-                    
-            # print(f"[Dispatcher]: {agent_name} should perceive: {should_perceive}")  # Debug
-
-            # If perception criteria met, attempt to call agent's perceive method
-            if should_perceive:
-                try:
-                    # print(f"[Dispatcher]: Attempting to dispatch to {agent_name}...") # Debug
-                    # Call the agent's perception handler
-                    agent_obj.perceive(event)
-                    dispatched_to.append(agent_name)
-                except AttributeError:
-                    print(
-                        f"[Dispatcher Error]: Agent {agent_name} object lacks 'perceive' method!")
-                except Exception as e:
-                    print(
-                        f"[Dispatcher Error]: Failed during perceive call for {agent_name}: {e}")
-
-        # if dispatched_to:
-        #     if config.SIMULATION_MODE == 'debug':
-        #         print(
-        #         f"[Dispatcher '{type(self).__name__}']: Event dispatched to: {dispatched_to}")
-        # else:
-            # print(f"[Dispatcher '{type(self).__name__}']: Event not dispatched to any agents based on rules.") # Can be verbose
+class SubscriptionEventDispatcher(DirectEventDispatcher):
+    """
+    Same delivery rules as DirectEventDispatcher, without scanning every agent per
+    event: agents are subscribed to the location they are in, and the subscriptions
+    follow the world's movements (WorldState.add_movement_listener). A local event
+    costs O(agents in that location); global events go to the global channel, i.e.
+    every registered agent. Recipients are served in the order agents were first
+    placed, as the direct dispatcher does. Until attach(world) is called it falls
+    back to the direct scan.
+    """
+
+    def __init__(self):
+        self.world = None
+        # location -> names of the agents there; agent -> its location; agent -> first-placement order
+        self.subscribers: Dict[str, Dict[str, None]] = {}
+        self.location_of: Dict[str, str] = {}
+        self._order: Dict[str, int] = {}
+        self.events_dispatched = 0
+        self.deliveries = 0
+
+    def attach(self, world) -> None:
+        """Subscribes the agents already placed in a world and follows their movements from now on."""
+        self.world = world
+        self.subscribers.clear()
+        self.location_of.clear()
+        for agent_name, location in world.agent_locations.items():
+            self._agent_moved(agent_name, None, location)
+        world.add_movement_listener(self._agent_moved)
+
+    def fork(self, world) -> 'SubscriptionEventDispatcher':
+        branch = SubscriptionEventDispatcher()
+        branch.attach(world)
+        return branch
 
+    def _agent_moved(self, agent_name: str, old_location: Optional[str], new_location: Optional[str]):
+        """Movement listener: moves an agent's subscription (new_location None unsubscribes it)."""
+        # The recorded location wins over old_location, so replays after a restore stay consistent
+        previous = self.location_of.pop(agent_name, None)
+        if previous is not None:
+            self.subscribers[previous].pop(agent_name, None)
+        if new_location is not None:
+            self.location_of[agent_name] = new_location
+            self.subscribers.setdefault(new_location, {})[agent_name] = None
+            self._order.setdefault(agent_name, len(self._order))
+
+    def _recipients(self, event: Event, registered_agents: Dict[str, Agent]) -> List[str]:
+        """Names of the agents that perceive an event, in delivery order (attached dispatchers only)."""
+        self.events_dispatched += 1
+        if event.scope == 'global':
+            # Global channel: every registered agent
+            names = list(registered_agents)
+        else:
+            here = self.subscribers.get(event.location)
+            if not here:
+                return []
+            names = [name for name in here if name != event.triggered_by and name in registered_agents]
+            if len(names) > 1:
+                names.sort(key=self._order.__getitem__)
+        self.deliveries += len(names)
+        return names
+
+    def route_event(self, event: Event, registered_agents: Dict[str, Agent], agent_locations: Dict[str, str]) -> List[Tuple[str, Event]]:
+        if self.world is None:
+            return super().route_event(event, registered_agents, agent_locations)
+        return [(agent_name, event) for agent_name in self._recipients(event, registered_agents)]
+
+    def dispatch_event(self, event: Event, registered_agents: Dict[str, Agent], agent_locations: Dict[str, str]) -> List[str]:
+        if self.world is None:
+            return super().dispatch_event(event, registered_agents, agent_locations)
+        dispatched_to = []
+        for agent_name in self._recipients(event, registered_agents):
+            self._deliver(event, agent_name, registered_agents[agent_name], dispatched_to)
         return dispatched_to
+
+    def stats(self) -> Dict[str, int]:
+        return {"events": self.events_dispatched, "deliveries": self.deliveries,
+                "subscribed_agents": len(self.location_of)}
+
+
+class RadiusEventDispatcher(SubscriptionEventDispatcher):
+    """
+    SubscriptionEventDispatcher that also honours an event's radius: a local event
+    with radius k reaches the subscribers of every location at most k moves away
+    (the world's location graph, through its cached neighborhood index). Agents in
+    other locations perceive an attenuated copy (config.DISTANT_EVENT_TEMPLATE),
+    built once per distance; agents beyond the radius are never visited. Radius 0
+    events and global events are delivered exactly as by the parent class.
+    """
+
+    def __init__(self, max_radius: Optional[int] = None):
+        super().__init__()
+        self.max_radius = max_radius if max_radius is not None else getattr(config, 'EVENT_MAX_RADIUS', 3)
+        self.distant_deliveries = 0
+
+    def fork(self, world) -> 'RadiusEventDispatcher':
+        branch = RadiusEventDispatcher(self.max_radius)
+        branch.attach(world)
+        return branch
+
+    @staticmethod
+    def attenuate(event: Event, hops: int) -> Event:
+        """The event as perceived from hops moves away."""
+        template = getattr(config, 'DISTANT_EVENT_TEMPLATE', "(heard from {hops} location(s) away) {description}")
+        return event._replace(description=template.format(hops=hops, description=event.description))
+
+    def route_event(self, event: Event, registered_agents: Dict[str, Agent], agent_locations: Dict[str, str]) -> List[Tuple[str, Event]]:
+        radius = min(event.radius or 0, self.max_radius)
+        if self.world is None or radius <= 0 or event.scope == 'global':
+            return super().route_event(event, registered_agents, agent_locations)
+        self.events_dispatched += 1
+        # Locations outside the graph (e.g. undefined exits) only reach their own subscribers
+        neighborhood = self.world.location_graph.neighborhood(event.location, radius) or ((event.location, 0),)
+        names = []
+        for location, hops in neighborhood:
+            here = self.subscribers.get(location)
+            if here:
+                names.extend((name, hops) for name in here
+                             if name != event.triggered_by and name in registered_agents)
+        if len(names) > 1:
+            order = self._order
+            names.sort(key=lambda recipient: order[recipient[0]])
+        heard_at = {0: event}
+        recipients = []
+        for agent_name, hops in names:
+            heard = heard_at.get(hops)
+            if heard is None:
+                heard = heard_at[hops] = self.attenuate(event, hops)
+            recipients.append((agent_name, heard))
+            if hops:
+                self.distant_deliveries += 1
+        self.deliveries += len(recipients)
+        return recipients
+
+    def dispatch_event(self, event: Event, registered_agents: Dict[str, Agent], agent_locations: Dict[str, str]) -> List[str]:
+        if self.world is None or min(event.radius or 0, self.max_radius) <= 0 or event.scope == 'global':
+            return super().dispatch_event(event, registered_agents, agent_locations)
+        dispatched_to = []
+        for agent_name, perceived in self.route_event(event, registered_agents, agent_locations):
+            self._deliver(perceived, agent_name, registered_agents[agent_name], dispatched_to)
+        return dispatched_to
+
+    def stats(self) -> Dict[str, int]:
+        stats = super().stats()
+        stats["distant_deliveries"] = self.distant_deliveries
+        return stats
@@ -0,0 +1,144 @@
+# src_GM/event_queue.py
+from typing import Dict, List, Optional, Tuple
+
+import config
+from event_dispatcher import BaseEventDispatcher
+from world import Event
+
+# (event as the agent perceives it, kind, agent whose action or move it reports)
+QueuedEvent = Tuple[Event, Optional[str], Optional[str]]
+
+
+class EventQueue(BaseEventDispatcher):
+    """
+    Collects the events of a turn or a step and delivers them in bulk, instead of one
+    perceive -> add_observation (and possibly a reflection) per event and listener.
+    Events are routed by the wrapped dispatcher when they happen, so recipients are
+    the agents that were there; flush() then coalesces each agent's share and hands
+    it over in one perceive_batch call:
+    - an event already queued for the agent (same description, place and actor) is dropped;
+    - WAIT outcomes at the same location are merged into one entry;
+    - with `movements`, agent moves are delivered too (the world only logs them): a
+      departure followed by an arrival becomes one "moves from ... to ..." entry, and
+      an arrival is dropped when the agent also perceives the mover's own action.
+    Takes the dispatcher's place for the main loop and the Director: dispatch_event()
+    only queues. A what-if branch gets its own queue around its dispatcher's fork
+    (see SimulationBranch.fork); fork() itself returns the wrapped dispatcher's fork.
+    """
+
+    def __init__(self, dispatcher: BaseEventDispatcher, movements: bool = True):
+        self.dispatcher = dispatcher
+        self.movements = movements
+        self.world = None
+        self._pending: Dict[str, List[QueuedEvent]] = {}  # agent -> its queued events, in order
+        self.events_queued = 0
+        self.entries_coalesced = 0
+        self.batches_delivered = 0
+        self.entries_delivered = 0
+        self.flushes = 0
+
+    def attach(self, world) -> None:
+        """Starts queuing the world's agent moves (call once agents are placed; the wrapped dispatcher attaches itself)."""
+        self.world = world
+        if self.movements:
+            world.add_movement_listener(self._agent_moved)
+
+    def fork(self, world) -> BaseEventDispatcher:
+        return self.dispatcher.fork(world)
+
+    def dispatch_event(self, event: Event, registered_agents, agent_locations) -> List[str]:
+        """Queues the event (delivered by the next flush); returns the agents it is queued for."""
+        return self.put(event, None, registered_agents, agent_locations)
+
+    def put(self, event: Event, kind: Optional[str] = None, registered_agents=None, agent_locations=None) -> List[str]:
+        """Routes an event now and queues it for its recipients. kind is the action type (e.g. "WAIT"), if any."""
+        if registered_agents is None:
+            registered_agents, agent_locations = self.world.registered_agents, self.world.agent_locations
+        self.events_queued += 1
+        try:
+            recipients = self.dispatcher.route_event(event, registered_agents, agent_locations)
+        except NotImplementedError:
+            # A dispatcher that can only deliver: delivered now, unbatched
+            return self.dispatcher.dispatch_event(event, registered_agents, agent_locations)
+        for agent_name, perceived in recipients:
+            self._pending.setdefault(agent_name, []).append((perceived, kind, event.triggered_by))
+        return [agent_name for agent_name, _ in recipients]
+
+    def _agent_moved(self, agent_name: str, old_location: Optional[str], new_location: Optional[str]):
+        """Movement listener: queues the departure and arrival the world logs for a move."""
+        if old_location is None or new_location is None or old_location == new_location:
+            return  # placements, removals and restores are not moves
+        step = self.world.current_step
+        self.put(Event(f"{agent_name} departs from the {old_location}.", old_location, "local", step, agent_name),
+                 "depart")
+        self.put(Event(f"{agent_name} arrives at the {new_location}.", new_location, "local", step, agent_name),
+                 "arrive")
+
+    @staticmethod
+    def coalesce(entries: List[QueuedEvent]) -> List[Event]:
+        """One agent's queued events with the redundant ones merged or dropped (see the class docstring)."""
+        actors = {actor for _, kind, actor in entries if kind not in ("depart", "arrive")}
+        kept: List[Event] = []
+        seen = set()
+        waits: Dict[str, int] = {}  # location -> index of its merged WAIT entry
+        departures: Dict[str, int] = {}  # mover -> index of its departure entry
+        for event, kind, actor in entries:
+            key = (event.description, event.location, event.scope, event.triggered_by)
+            if key in seen:
+                continue
+            seen.add(key)
+            if kind == "WAIT" and event.location in waits:
+                index = waits[event.location]
+                kept[index] = kept[index]._replace(description=f"{kept[index].description} {event.description}",
+                                                   triggered_by=None)
+                continue
+            if kind == "arrive":
+                if actor in actors:
+                    continue  # the mover's own action already tells the agent
+                if actor in departures:
+                    index = departures.pop(actor)
+                    kept[index] = event._replace(
+                        description=f"{actor} moves from the {kept[index].location} to the {event.location}.")
+                    continue
+            if kind == "WAIT":
+                waits[event.location] = len(kept)
+            elif kind == "depart":
+                departures[actor] = len(kept)
+            kept.append(event)
+        return kept
+
+    def flush(self, registered_agents=None) -> int:
+        """Delivers everything queued, one perceive_batch call per agent. Returns the entries delivered."""
+        if registered_agents is None:
+            registered_agents = self.world.registered_agents
+        pending, self._pending = self._pending, {}
+        self.flushes += 1
+        delivered = coalesced = 0
+        for agent_name, entries in pending.items():
+            agent_obj = registered_agents.get(agent_name)
+            if agent_obj is None:
+                continue  # unregistered since the events were queued
+            events = self.coalesce(entries)
+            coalesced += len(entries) - len(events)
+            try:
+                if hasattr(agent_obj, "perceive_batch"):
+                    agent_obj.perceive_batch(events)
+                else:
+                    for event in events:
+                        agent_obj.perceive(event)
+            except Exception as e:
+                print(f"[EventQueue Error]: Failed to deliver {len(events)} events to {agent_name}: {e}")
+                continue
+            self.batches_delivered += 1
+            delivered += len(events)
+        self.entries_delivered += delivered
+        self.entries_coalesced += coalesced
+        if config.SIMULATION_MODE == 'debug' and pending:
+            print(f"[EventQueue]: Delivered {delivered} events to {len(pending)} agents ({coalesced} coalesced).")
+        return delivered
+
+    def stats(self) -> Dict[str, object]:
+        return {"events_queued": self.events_queued, "flushes": self.flushes,
+                "batches_delivered": self.batches_delivered, "entries_delivered": self.entries_delivered,
+                "entries_coalesced": self.entries_coalesced,
+                "dispatcher": self.dispatcher.stats() if hasattr(self.dispatcher, "stats") else None}
@@ -0,0 +1,418 @@
+# src_GM/event_store.py
+import bisect
+import csv
+import glob
+import json
+import os
+from array import array
+from collections import namedtuple
+from typing import Any, Dict, Iterator, List, Optional
+
+# Define a structure for events for clarity (re-exported by world)
+# radius: how many moves away a local event can be perceived (0 = only its location)
+Event = namedtuple(
+    "Event", ["description", "location", "scope", "step", "triggered_by", "radius"], defaults=(0,)
+)
+
+INDEX_FILE = "index.json"
+
+
+class EventStore:
+    """
+    Append-only on-disk history of every world event, so the in-memory event log
+    can stay a small ring buffer.
+
+    Events are written as JSON lines to segment files covering `steps_per_segment`
+    steps each (events-000000.jsonl, events-000010.jsonl, ...). index.json lists
+    the segments with their step range, event count, indexed size and the byte offset
+    where each step starts, so readers can seek to a step without scanning earlier
+    ones. Writes are flushed whenever the step changes; the index is rewritten by
+    flush()/close(). Readers scan segments the index does not list yet, and the part
+    of a listed segment past its indexed size (written after the last flush).
+    """
+
+    def __init__(self, directory: str, steps_per_segment: int = 10, reset: bool = True):
+        self.directory = directory
+        self.steps_per_segment = max(1, steps_per_segment)
+        os.makedirs(directory, exist_ok=True)
+        if reset:
+            # A new run starts a new history (like the text logs, which are cleared on first write)
+            for path in glob.glob(os.path.join(directory, "events-*.jsonl")) + [os.path.join(directory, INDEX_FILE)]:
+                if os.path.exists(path):
+                    os.remove(path)
+        self.segments: List[Dict[str, Any]] = _load_index(directory)
+        self._file = None
+        self._offset = 0
+        self._last_step: Optional[int] = None
+        self.events_written = sum(segment["events"] for segment in self.segments)
+        self.bytes_written = 0
+
+    def _segment_for(self, step: int) -> Dict[str, Any]:
+        current = self.segments[-1] if self.segments else None
+        if current is not None and step < current["first_step"] + self.steps_per_segment:
+            if self._file is None:  # reopened store: continue the last segment
+                path = os.path.join(self.directory, current["file"])
+                self._file = open(path, "ab")
+                self._offset = os.path.getsize(path)
+            return current
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        first_step = step - step % self.steps_per_segment
+        segment = {"file": f"events-{first_step:06d}.jsonl", "first_step": first_step,
+                   "last_step": step, "events": 0, "bytes": 0, "steps": {}}
+        self.segments.append(segment)
+        self._file = open(os.path.join(self.directory, segment["file"]), "ab")
+        self._offset = 0
+        return segment
+
+    def append(self, event) -> None:
+        """Appends one Event."""
+        if self._last_step is not None and event.step != self._last_step and self._file is not None:
+            self._file.flush()
+        segment = self._segment_for(event.step)
+        data = (json.dumps(event._asdict(), ensure_ascii=False) + "\n").encode("utf-8")
+        segment["steps"].setdefault(str(event.step), self._offset)
+        segment["last_step"] = max(segment["last_step"], event.step)
+        segment["events"] += 1
+        self._file.write(data)
+        self._offset += len(data)
+        segment["bytes"] = self._offset
+        self.bytes_written += len(data)
+        self.events_written += 1
+        self._last_step = event.step
+
+    def flush(self) -> None:
+        """Flushes pending writes and rewrites the index."""
+        if self._file is not None:
+            self._file.flush()
+        tmp_path = os.path.join(self.directory, INDEX_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"steps_per_segment": self.steps_per_segment, "segments": self.segments}, f)
+        os.replace(tmp_path, os.path.join(self.directory, INDEX_FILE))
+
+    def close(self) -> None:
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def truncate_after(self, step: int) -> int:
+        """
+        Drops every stored event after `step` and rebuilds the index from the segment
+        files. Used when resuming from a checkpoint, so the steps replayed after an
+        interruption are not stored twice. Returns the number of events dropped.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        segments, dropped = [], 0
+        for path in sorted(glob.glob(os.path.join(self.directory, "events-*.jsonl"))):
+            segment = {"file": os.path.basename(path), "first_step": None, "last_step": None,
+                       "events": 0, "bytes": 0, "steps": {}}
+            keep_bytes = 0
+            with open(path, "rb") as f:
+                for line in f:
+                    event_step = json.loads(line)["step"]
+                    if event_step > step:
+                        dropped += 1
+                        continue
+                    segment["steps"].setdefault(str(event_step), keep_bytes)
+                    segment["first_step"] = event_step - event_step % self.steps_per_segment \
+                        if segment["first_step"] is None else segment["first_step"]
+                    segment["last_step"] = event_step
+                    segment["events"] += 1
+                    keep_bytes += len(line)
+                    segment["bytes"] = keep_bytes
+            if segment["events"]:
+                with open(path, "r+b") as f:
+                    f.truncate(keep_bytes)
+                segments.append(segment)
+            else:
+                os.remove(path)
+        self.segments = segments
+        self.events_written = sum(segment["events"] for segment in segments)
+        self._last_step = None
+        self.flush()
+        return dropped
+
+    def iter_events(self, from_step: Optional[int] = None, to_step: Optional[int] = None) -> Iterator[Any]:
+        """Yields stored events with from_step <= step <= to_step (pending writes are flushed first)."""
+        self.flush()
+        return read_events(self.directory, from_step, to_step)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"directory": self.directory, "segments": len(self.segments),
+                "events": self.events_written, "bytes_written": self.bytes_written}
+
+
+def _load_index(directory: str) -> List[Dict[str, Any]]:
+    path = os.path.join(directory, INDEX_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["segments"]
+
+
+def read_events(directory: str, from_step: Optional[int] = None, to_step: Optional[int] = None) -> Iterator[Any]:
+    """
+    Yields Events from an event store directory in logged order, limited to
+    from_step <= step <= to_step. Only segments overlapping the range are opened,
+    and reading starts at the first requested step's offset. Segments missing from
+    the index, and events written to a listed segment after the index was (a run
+    that is still going or was interrupted), are scanned in full.
+    """
+    segments = _load_index(directory)
+    indexed_files = {segment["file"] for segment in segments}
+    for segment in segments:
+        if to_step is not None and segment["first_step"] > to_step:
+            return
+        path = os.path.join(directory, segment["file"])
+        # Events past the indexed size may be later than last_step
+        unindexed_tail = os.path.getsize(path) > segment["bytes"]
+        if from_step is not None and segment["last_step"] < from_step and not unindexed_tail:
+            continue
+        start_offset = 0
+        if from_step is not None:
+            later_steps = [offset for step, offset in segment["steps"].items() if int(step) >= from_step]
+            # No indexed step is late enough: start at the unindexed tail
+            start_offset = min(later_steps) if later_steps else segment["bytes"]
+        yield from _read_segment(path, start_offset, from_step, to_step)
+    for path in sorted(glob.glob(os.path.join(directory, "events-*.jsonl"))):
+        if os.path.basename(path) not in indexed_files:
+            yield from _read_segment(path, 0, from_step, to_step)
+
+
+def _read_segment(path: str, start_offset: int, from_step: Optional[int], to_step: Optional[int]) -> Iterator[Any]:
+    with open(path, "rb") as f:
+        f.seek(start_offset)
+        for line in f:
+            record = json.loads(line)
+            if from_step is not None and record["step"] < from_step:
+                continue
+            if to_step is not None and record["step"] > to_step:
+                return
+            yield Event(**record)
+
+
+class ColumnarEventStore:
+    """
+    In-memory columnar copy of the event history, for queries and analysis.
+
+    Each event is one row across array-backed columns: step, location id, actor
+    (triggered_by) id, scope id and radius, with ids from small symbol tables, and the
+    description stored in a UTF-8 string heap addressed by offsets. Secondary
+    indexes map each location and actor to its row ids, and rows are appended in
+    step order, so query() bisects instead of scanning every event.
+
+    save()/load() keep the columns on disk; export() writes Arrow/Parquet (with
+    pyarrow installed) or CSV.
+    """
+
+    COLUMNS = ("step", "location", "actor", "scope", "radius", "description")
+
+    def __init__(self):
+        self.steps = array("q")
+        self.location_ids = array("i")
+        self.actor_ids = array("i")
+        self.scope_ids = array("i")
+        self.radii = array("i")
+        self.description_offsets = array("Q", [0])  # row i spans heap[offsets[i]:offsets[i + 1]]
+        self.heap = bytearray()
+        # Symbol tables: value -> id and id -> value (None is stored as id -1)
+        self.symbols: Dict[str, Dict[str, int]] = {"location": {}, "actor": {}, "scope": {}}
+        self.values: Dict[str, List[str]] = {"location": [], "actor": [], "scope": []}
+        # Secondary indexes: symbol id -> row ids (ascending)
+        self.rows_by_location: Dict[int, array] = {}
+        self.rows_by_actor: Dict[int, array] = {}
+
+    @classmethod
+    def from_events(cls, events) -> "ColumnarEventStore":
+        store = cls()
+        for event in events:
+            store.append(event)
+        return store
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def _intern(self, column: str, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        symbol_id = self.symbols[column].get(value)
+        if symbol_id is None:
+            symbol_id = self.symbols[column][value] = len(self.values[column])
+            self.values[column].append(value)
+        return symbol_id
+
+    def _lookup(self, column: str, value: Optional[str]) -> Optional[int]:
+        """Symbol id of a value, or None if it never occurs (None values are id -1)."""
+        return -1 if value is None else self.symbols[column].get(value)
+
+    def _value(self, column: str, symbol_id: int) -> Optional[str]:
+        return None if symbol_id < 0 else self.values[column][symbol_id]
+
+    def append(self, event) -> None:
+        """Appends one Event. Steps must not go backwards (rows stay sorted by step)."""
+        if self.steps and event.step < self.steps[-1]:
+            raise ValueError(f"Event step {event.step} is before the last stored step {self.steps[-1]}.")
+        row = len(self.steps)
+        location_id = self._intern("location", event.location)
+        actor_id = self._intern("actor", event.triggered_by)
+        self.steps.append(event.step)
+        self.location_ids.append(location_id)
+        self.actor_ids.append(actor_id)
+        self.scope_ids.append(self._intern("scope", event.scope))
+        self.radii.append(event.radius)
+        self.heap += event.description.encode("utf-8")
+        self.description_offsets.append(len(self.heap))
+        self.rows_by_location.setdefault(location_id, array("I")).append(row)
+        self.rows_by_actor.setdefault(actor_id, array("I")).append(row)
+
+    def description(self, row: int) -> str:
+        return self.heap[self.description_offsets[row]:self.description_offsets[row + 1]].decode("utf-8")
+
+    def row(self, row: int):
+        return Event(description=self.description(row),
+                     location=self._value("location", self.location_ids[row]),
+                     scope=self._value("scope", self.scope_ids[row]),
+                     step=self.steps[row],
+                     triggered_by=self._value("actor", self.actor_ids[row]),
+                     radius=self.radii[row])
+
+    def query_rows(self, location: Optional[str] = "*", actor: Optional[str] = "*", scope: Optional[str] = "*",
+                   from_step: Optional[int] = None, to_step: Optional[int] = None) -> List[int]:
+        """
+        Row ids matching every given filter ("*" = any; None matches events without
+        a location/actor). Candidates come from the step range and the smallest
+        matching location/actor posting list; the remaining filters check columns.
+        """
+        lo = 0 if from_step is None else bisect.bisect_left(self.steps, from_step)
+        hi = len(self.steps) if to_step is None else bisect.bisect_right(self.steps, to_step)
+        postings = []
+        for column, value, index in (("location", location, self.rows_by_location),
+                                     ("actor", actor, self.rows_by_actor)):
+            if value == "*":
+                continue
+            symbol_id = self._lookup(column, value)
+            if symbol_id is None or symbol_id not in index:
+                return []
+            postings.append((column, symbol_id, index[symbol_id]))
+
+        scope_id = None
+        if scope != "*":
+            scope_id = self._lookup("scope", scope)
+            if scope_id is None:
+                return []
+
+        if postings:
+            postings.sort(key=lambda posting: len(posting[2]))
+            rows = postings[0][2]
+            candidates = rows[bisect.bisect_left(rows, lo):bisect.bisect_left(rows, hi)]
+            checks = postings[1:]
+        else:
+            candidates = range(lo, hi)
+            checks = []
+        columns = {"location": self.location_ids, "actor": self.actor_ids}
+        return [row for row in candidates
+                if all(columns[column][row] == symbol_id for column, symbol_id, _ in checks)
+                and (scope_id is None or self.scope_ids[row] == scope_id)]
+
+    def query(self, location: Optional[str] = "*", actor: Optional[str] = "*", scope: Optional[str] = "*",
+              from_step: Optional[int] = None, to_step: Optional[int] = None) -> List[Any]:
+        """Events matching the filters, e.g. query(location="Library", actor="Thomas", from_step=10, to_step=20)."""
+        return [self.row(row) for row in self.query_rows(location, actor, scope, from_step, to_step)]
+
+    def story_entries(self, include_world_events: bool = False) -> List[str]:
+        """
+        Events formatted as the entries parsed from simulation_logs.txt
+        ("<agent>'s turn in <location>:" and the outcome on the next line).
+        World events (Director, weather, items) are added as "World (<location>):"
+        entries if requested.
+        """
+        entries = []
+        action_scope = self._lookup("scope", "action_outcome")
+        for row in range(len(self.steps)):
+            location = self._value("location", self.location_ids[row])
+            if self.scope_ids[row] == action_scope:
+                entries.append(f"{self._value('actor', self.actor_ids[row])}'s turn in {location}:\n{self.description(row)}")
+            elif include_world_events:
+                entries.append(f"World ({location or 'Global'}):\n{self.description(row)}")
+        return entries
+
+    def save(self, directory: str) -> None:
+        """Writes the columns, heap and symbol tables to a directory (see load())."""
+        os.makedirs(directory, exist_ok=True)
+        for name, column in (("steps", self.steps), ("location_ids", self.location_ids),
+                             ("actor_ids", self.actor_ids), ("scope_ids", self.scope_ids),
+                             ("radii", self.radii), ("description_offsets", self.description_offsets)):
+            with open(os.path.join(directory, f"{name}.bin"), "wb") as f:
+                column.tofile(f)
+        with open(os.path.join(directory, "descriptions.heap"), "wb") as f:
+            f.write(self.heap)
+        with open(os.path.join(directory, "symbols.json"), "w", encoding="utf-8") as f:
+            json.dump({"rows": len(self), "values": self.values}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory: str) -> "ColumnarEventStore":
+        store = cls()
+        with open(os.path.join(directory, "symbols.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        rows = meta["rows"]
+        for name, count in (("steps", rows), ("location_ids", rows), ("actor_ids", rows),
+                            ("scope_ids", rows), ("radii", rows), ("description_offsets", rows + 1)):
+            column = array(getattr(store, name).typecode)
+            with open(os.path.join(directory, f"{name}.bin"), "rb") as f:
+                column.fromfile(f, count)
+            setattr(store, name, column)
+        with open(os.path.join(directory, "descriptions.heap"), "rb") as f:
+            store.heap = bytearray(f.read())
+        store.values = meta["values"]
+        store.symbols = {column: {value: i for i, value in enumerate(values)}
+                         for column, values in store.values.items()}
+        for row in range(rows):
+            store.rows_by_location.setdefault(store.location_ids[row], array("I")).append(row)
+            store.rows_by_actor.setdefault(store.actor_ids[row], array("I")).append(row)
+        return store
+
+    def export(self, path: str) -> None:
+        """
+        Writes the events as a table for offline analysis: .parquet or .arrow
+        (Arrow IPC) with pyarrow installed, .csv otherwise. Location, actor and
+        scope are dictionary-encoded in the Arrow formats.
+        """
+        if path.endswith((".parquet", ".arrow")):
+            try:
+                import pyarrow as pa
+            except ImportError:
+                raise ImportError(f"pyarrow is needed to export '{path}'; use a .csv path instead.")
+            def dictionary(column: str, ids: array):
+                indices = pa.array([i if i >= 0 else None for i in ids], type=pa.int32())
+                return pa.DictionaryArray.from_arrays(indices, pa.array(self.values[column], type=pa.string()))
+
+            table = pa.table({
+                "step": pa.array(self.steps, type=pa.int64()),
+                "location": dictionary("location", self.location_ids),
+                "actor": dictionary("actor", self.actor_ids),
+                "scope": dictionary("scope", self.scope_ids),
+                "radius": pa.array(self.radii, type=pa.int32()),
+                "description": pa.array([self.description(row) for row in range(len(self))], type=pa.string()),
+            })
+            if path.endswith(".parquet"):
+                import pyarrow.parquet as pq
+                pq.write_table(table, path)
+            else:
+                import pyarrow.feather as feather
+                feather.write_feather(table, path)
+            return
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.COLUMNS)
+            for row in range(len(self)):
+                event = self.row(row)
+                writer.writerow([event.step, event.location, event.triggered_by, event.scope, event.radius,
+                                 event.description])
+
+    def stats(self) -> Dict[str, Any]:
+        return {"events": len(self), "locations": len(self.values["location"]),
+                "actors": len(self.values["actor"]), "heap_bytes": len(self.heap)}
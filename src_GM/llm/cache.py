@@ -0,0 +1,150 @@
+# src_GM/llm/cache.py
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+
+import config
+from llm.common import TextResponse, request_key
+
+
+class LLMResponseCache:
+    """
+    On-disk (SQLite) store of LLM responses with a size cap and LRU eviction.
+    Keys are produced by llm.common.request_key (model name, prompt hash and
+    generation config), so a cached answer is only reused for an identical request.
+    """
+
+    def __init__(self, path: str, max_entries: int = 5000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " response TEXT NOT NULL,"
+            " last_used INTEGER NOT NULL)")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used)")
+        self._conn.commit()
+        # Monotonic use counter; survives restarts so LRU order is kept across runs.
+        row = self._conn.execute(
+            "SELECT COALESCE(MAX(last_used), 0) FROM responses").fetchone()
+        self._clock = row[0]
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached response text for key (and marks it recently used), or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._clock += 1
+            self._conn.execute(
+                "UPDATE responses SET last_used = ? WHERE key = ?", (self._clock, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, model_name: str, response_text: str):
+        """Stores a response, evicting the least recently used entries above the cap."""
+        with self._lock:
+            self._clock += 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, last_used) VALUES (?, ?, ?, ?)",
+                (key, model_name, response_text, self._clock))
+            count = self._conn.execute(
+                "SELECT COUNT(*) FROM responses").fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    " SELECT key FROM responses ORDER BY last_used ASC LIMIT ?)", (overflow,))
+                self.evictions += overflow
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+class CachedLLM:
+    """
+    Wraps a model object (anything with generate_content(...).text) and serves
+    repeated identical requests from an LLMResponseCache instead of the network.
+    All other attributes are delegated to the wrapped model.
+    """
+
+    def __init__(self, model, cache: LLMResponseCache, model_name: str, generation_config: Optional[dict] = None, purpose: str = "general"):
+        self._model = model
+        self._cache = cache
+        self._model_name = model_name
+        self._generation_config = generation_config
+        self.purpose = purpose
+        self.hits = 0
+        self.misses = 0
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        # A per-call config overrides the one the model was created with.
+        effective_config = generation_config if generation_config is not None else self._generation_config
+        key = request_key(self._model_name, prompt, effective_config)
+
+        cached_text = self._cache.get(key)
+        if cached_text is not None:
+            self.hits += 1
+            if config.SIMULATION_MODE == 'debug':
+                print(f"[LLM Cache] Hit for {self.purpose} ({key[:10]}).")
+            return TextResponse(cached_text)
+
+        self.misses += 1
+        if generation_config is not None:
+            kwargs["generation_config"] = generation_config
+        response = self._model.generate_content(prompt, **kwargs)
+        # Reading .text raises for blocked/empty candidates; those are not cached.
+        self._cache.put(key, self._model_name, response.text)
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+
+_shared_cache: Optional[LLMResponseCache] = None
+
+
+def get_response_cache() -> LLMResponseCache:
+    """Returns the process-wide response cache, opening it on first use."""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = LLMResponseCache(
+            getattr(config, 'LLM_CACHE_PATH', "llm_cache.sqlite3"),
+            max_entries=getattr(config, 'LLM_CACHE_MAX_ENTRIES', 5000))
+    return _shared_cache
+
+
+def is_cache_enabled_for(purpose_kind_name: str) -> bool:
+    """True if caching is on globally and the component kind has not opted out."""
+    if not getattr(config, 'LLM_CACHE_ENABLED', False):
+        return False
+    excluded = [p.lower() for p in getattr(config, 'LLM_CACHE_EXCLUDED_PURPOSES', [])]
+    return purpose_kind_name not in excluded
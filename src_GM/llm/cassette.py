@@ -0,0 +1,184 @@
+# src_GM/llm/cassette.py
+import difflib
+import gzip
+import json
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import config
+from llm.common import TextResponse, config_fingerprint, prompt_digest, prompt_text, purpose_kind
+
+
+class CassetteMismatchError(Exception):
+    """Raised in replay mode when a request is not present in the cassette."""
+    pass
+
+
+class Cassette:
+    """
+    A recording of (purpose, prompt, generation config) -> response pairs.
+
+    Stored as gzip-compressed JSON lines: one header line (format version and
+    the random seed of the recorded run) followed by one line per LLM call.
+    Identical requests made several times are replayed in the recorded order.
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, path: str):
+        self.path = path
+        self.seed: Optional[int] = None
+        self._lock = threading.Lock()
+        # (purpose, prompt digest, config fingerprint) -> queued responses
+        self._responses: Dict[Tuple[str, str, str], Deque[str]] = {}
+        self._last_response: Dict[Tuple[str, str, str], str] = {}
+        # purpose -> recorded prompt texts, used to explain replay mismatches
+        self._prompts_by_purpose: Dict[str, List[str]] = {}
+        self._writer = None
+        self.recorded = 0
+        self.replayed = 0
+        self.mismatches: List[str] = []
+
+    # --- Recording ---
+
+    def start_recording(self, seed: Optional[int]):
+        """Truncates the cassette file and writes its header."""
+        self.seed = seed
+        self._writer = gzip.open(self.path, "wt", encoding="utf-8")
+        self._write_line({"type": "header", "version": self.FORMAT_VERSION, "seed": seed})
+
+    def record(self, purpose: str, prompt: Any, generation_config: Optional[Any], response_text: str):
+        if self._writer is None:
+            raise RuntimeError("Cassette is not open for recording.")
+        self._write_line({
+            "type": "call",
+            "purpose": purpose,
+            "config": config_fingerprint(generation_config),
+            "prompt": prompt_text(prompt),
+            "response": response_text,
+        })
+        self.recorded += 1
+
+    def _write_line(self, record: dict):
+        with self._lock:
+            self._writer.write(json.dumps(record, ensure_ascii=False) + "\n")
+            # Flush per call so an interrupted run still leaves a usable cassette.
+            self._writer.flush()
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    # --- Replay ---
+
+    def load(self):
+        """Reads the cassette file into memory for replay."""
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record.get("type") == "header":
+                    self.seed = record.get("seed")
+                    continue
+                key = (record["purpose"], prompt_digest(record["prompt"]), record["config"])
+                self._responses.setdefault(key, deque()).append(record["response"])
+                self._prompts_by_purpose.setdefault(
+                    record["purpose"], []).append(record["prompt"])
+        if config.SIMULATION_MODE == 'debug':
+            total = sum(len(q) for q in self._responses.values())
+            print(f"[Cassette] Loaded {total} recorded calls from {self.path} (seed: {self.seed}).")
+
+    def lookup(self, purpose: str, prompt: Any, generation_config: Optional[Any]) -> str:
+        key = (purpose, prompt_digest(prompt), config_fingerprint(generation_config))
+        with self._lock:
+            queue = self._responses.get(key)
+            if queue:
+                response_text = queue.popleft()
+                self._last_response[key] = response_text
+                self.replayed += 1
+                return response_text
+            if key in self._last_response:
+                # Asked more often than recorded: repeat the last recorded answer.
+                self.replayed += 1
+                return self._last_response[key]
+        report = self._mismatch_report(purpose, prompt_text(prompt))
+        self.mismatches.append(report)
+        raise CassetteMismatchError(report)
+
+    def _mismatch_report(self, purpose: str, prompt: str, max_diff_lines: int = 40) -> str:
+        candidates = self._prompts_by_purpose.get(purpose, [])
+        if not candidates:
+            return f"No recorded '{purpose}' calls in cassette {self.path}."
+
+        # Cheap upper-bound filter first, exact ratio only on the best few.
+        def quick(candidate):
+            return difflib.SequenceMatcher(None, candidate, prompt).quick_ratio()
+        shortlist = sorted(set(candidates), key=quick, reverse=True)[:5]
+        nearest = max(shortlist, key=lambda c: difflib.SequenceMatcher(
+            None, c, prompt).ratio())
+
+        diff = list(difflib.unified_diff(
+            nearest.splitlines(), prompt.splitlines(),
+            fromfile="recorded", tofile="requested", lineterm="", n=1))
+        if len(diff) > max_diff_lines:
+            diff = diff[:max_diff_lines] + [f"... ({len(diff) - max_diff_lines} more diff lines)"]
+        return (f"'{purpose}' prompt not found in cassette {self.path}. "
+                f"Diff against nearest recorded prompt:\n" + "\n".join(diff))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"recorded": self.recorded, "replayed": self.replayed,
+                "mismatches": len(self.mismatches)}
+
+
+class RecordingLLM:
+    """Passes calls through to a live model and appends every response to a Cassette."""
+
+    def __init__(self, model, cassette: Cassette, generation_config: Optional[dict] = None, purpose: str = "general"):
+        self._model = model
+        self._cassette = cassette
+        self._generation_config = generation_config
+        self.purpose = purpose
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        if generation_config is not None:
+            kwargs["generation_config"] = generation_config
+        response = self._model.generate_content(prompt, **kwargs)
+        effective_config = generation_config if generation_config is not None else self._generation_config
+        self._cassette.record(purpose_kind(self.purpose), prompt,
+                              effective_config, response.text)
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+
+class ReplayLLM:
+    """Serves responses from a Cassette; never touches the network."""
+
+    def __init__(self, cassette: Cassette, model_name: str, generation_config: Optional[dict] = None, purpose: str = "general"):
+        self._cassette = cassette
+        self.model_name = model_name
+        self._generation_config = generation_config
+        self.purpose = purpose
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        effective_config = generation_config if generation_config is not None else self._generation_config
+        return TextResponse(self._cassette.lookup(purpose_kind(self.purpose), prompt, effective_config))
+
+
+_shared_cassette: Optional[Cassette] = None
+
+
+def get_cassette() -> Cassette:
+    """Returns the process-wide cassette for the configured record/replay backend."""
+    global _shared_cassette
+    if _shared_cassette is None:
+        _shared_cassette = Cassette(getattr(config, 'LLM_CASSETTE_PATH', "llm_cassette.jsonl.gz"))
+        if config.LLM_BACKEND == "replay":
+            _shared_cassette.load()
+        elif config.LLM_BACKEND == "record":
+            _shared_cassette.start_recording(getattr(config, 'RANDOM_SEED', None))
+    return _shared_cassette
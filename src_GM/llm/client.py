@@ -0,0 +1,136 @@
+# src_GM/llm/client.py
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import config
+from llm.common import purpose_kind
+
+
+class _LoopThread:
+    """A daemon thread running the asyncio event loop shared by all LLM clients."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self.loop.run_forever, name="llm-client-loop", daemon=True)
+        self._thread.start()
+
+    def submit(self, coro) -> concurrent.futures.Future:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+
+class ConcurrencyLimits:
+    """
+    A global semaphore plus optional per-purpose semaphores bounding how many
+    LLM requests are in flight. Semaphores are created lazily on the event loop.
+    """
+
+    def __init__(self, max_concurrency: int, per_purpose: Dict[str, int]):
+        self.max_concurrency = max_concurrency
+        self.per_purpose = dict(per_purpose)
+        self._global: Optional[asyncio.Semaphore] = None
+        self._purpose: Dict[str, asyncio.Semaphore] = {}
+        # Metrics
+        self.in_flight: Dict[str, int] = {}
+        self.peak_in_flight: Dict[str, int] = {}
+        self.completed: Dict[str, int] = {}
+
+    def _semaphores(self, kind: str) -> List[asyncio.Semaphore]:
+        if self._global is None:
+            self._global = asyncio.Semaphore(self.max_concurrency)
+        semaphores = []
+        if kind in self.per_purpose:
+            if kind not in self._purpose:
+                self._purpose[kind] = asyncio.Semaphore(self.per_purpose[kind])
+            semaphores.append(self._purpose[kind])
+        # Purpose slot first, so a saturated purpose does not hold global slots.
+        semaphores.append(self._global)
+        return semaphores
+
+    async def run(self, kind: str, func: Callable, *args, **kwargs):
+        """Runs a blocking call in a worker thread once all applicable slots are free."""
+        semaphores = self._semaphores(kind)
+        for semaphore in semaphores:
+            await semaphore.acquire()
+        self.in_flight[kind] = self.in_flight.get(kind, 0) + 1
+        self.peak_in_flight[kind] = max(
+            self.peak_in_flight.get(kind, 0), self.in_flight[kind])
+        try:
+            return await asyncio.to_thread(func, *args, **kwargs)
+        finally:
+            self.in_flight[kind] -= 1
+            self.completed[kind] = self.completed.get(kind, 0) + 1
+            for semaphore in reversed(semaphores):
+                semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"max_concurrency": self.max_concurrency, "per_purpose": self.per_purpose,
+                "peak_in_flight": dict(self.peak_in_flight), "completed": dict(self.completed)}
+
+
+_loop_thread: Optional[_LoopThread] = None
+_limits: Optional[ConcurrencyLimits] = None
+_init_lock = threading.Lock()
+
+
+def _runtime():
+    global _loop_thread, _limits
+    with _init_lock:
+        if _loop_thread is None:
+            _loop_thread = _LoopThread()
+            _limits = ConcurrencyLimits(
+                getattr(config, 'LLM_MAX_CONCURRENCY', 4),
+                getattr(config, 'LLM_PURPOSE_CONCURRENCY', {}))
+    return _loop_thread, _limits
+
+
+def get_concurrency_stats() -> Dict[str, Any]:
+    return _runtime()[1].stats()
+
+
+class AsyncLLMClient:
+    """
+    asyncio front end for a model object (anything with generate_content).
+
+    - `await client.generate_content_async(...)` for async callers,
+    - `client.submit(...)` returns a concurrent.futures.Future for sync code
+      that wants to overlap a call with other work,
+    - `client.generate_content(...)` is the blocking shim used by the existing
+      components, so their APIs are unchanged.
+
+    Every path goes through the shared ConcurrencyLimits.
+    """
+
+    def __init__(self, model, purpose: str = "general"):
+        self._model = model
+        self.purpose = purpose
+        self._kind = purpose_kind(purpose)
+
+    async def generate_content_async(self, prompt, generation_config=None, **kwargs):
+        _, limits = _runtime()
+        if generation_config is not None:
+            kwargs["generation_config"] = generation_config
+        # Always go through the wrapped model's sync generate_content so the
+        # cache/cassette layers underneath see the call.
+        return await limits.run(self._kind, self._model.generate_content, prompt, **kwargs)
+
+    def submit(self, prompt, generation_config=None, **kwargs) -> concurrent.futures.Future:
+        loop_thread, _ = _runtime()
+        return loop_thread.submit(self.generate_content_async(prompt, generation_config, **kwargs))
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        return self.submit(prompt, generation_config, **kwargs).result()
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+
+_background_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=4, thread_name_prefix="sim-background")
+
+
+def run_in_background(func: Callable, *args, **kwargs) -> concurrent.futures.Future:
+    """Runs a synchronous component call (e.g. Director.plan_intervention) in a worker thread."""
+    return _background_executor.submit(func, *args, **kwargs)
@@ -0,0 +1,72 @@
+# src_GM/llm/common.py
+import hashlib
+import json
+from typing import Any, Optional
+
+
+def purpose_kind(purpose: str) -> str:
+    """
+    Maps a free-form purpose string (as passed to create_llm_instance, e.g.
+    "Agent Mateo Reflection" or "Action Resolver with Reasoning") to the
+    component kind it belongs to. Used to key per-component settings.
+    """
+    purpose_lower = (purpose or "").lower()
+    if "reflection" in purpose_lower:
+        return "reflection"
+    if "planning" in purpose_lower:
+        return "planning"
+    if "resolver" in purpose_lower:
+        return "resolver"
+    if "director" in purpose_lower:
+        return "director"
+    if "story" in purpose_lower:
+        return "story"
+    return "general"
+
+
+def prompt_text(prompt: Any) -> str:
+    """Flattens the prompt argument of generate_content into a single string."""
+    if isinstance(prompt, str):
+        return prompt
+    if isinstance(prompt, (list, tuple)):
+        return "\n".join(prompt_text(part) for part in prompt)
+    return str(prompt)
+
+
+def estimate_tokens(prompt: Any) -> int:
+    """Rough token count of a prompt (~4 characters per token), for quotas and metrics."""
+    return len(prompt_text(prompt)) // 4
+
+
+def config_fingerprint(generation_config: Optional[Any]) -> str:
+    """Stable string form of a generation config (dict or GenerationConfig)."""
+    if generation_config is None:
+        return "{}"
+    if not isinstance(generation_config, dict):
+        generation_config = getattr(
+            generation_config, "__dict__", {"repr": repr(generation_config)})
+    return json.dumps(generation_config, sort_keys=True, default=str)
+
+
+def prompt_digest(prompt: Any) -> str:
+    """SHA-256 of the prompt text."""
+    return hashlib.sha256(prompt_text(prompt).encode("utf-8")).hexdigest()
+
+
+def request_key(model_name: str, prompt: Any, generation_config: Optional[Any]) -> str:
+    """Key identifying a request: model name + prompt hash + generation config."""
+    raw = f"{model_name}\x1f{prompt_digest(prompt)}\x1f{config_fingerprint(generation_config)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TextResponse:
+    """
+    Minimal stand-in for a Gemini response object, for responses that did not
+    come from the network. Exposes the `.text` and `.prompt_feedback` surface
+    the simulation components read.
+    """
+    __slots__ = ("text", "prompt_feedback")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.prompt_feedback = None
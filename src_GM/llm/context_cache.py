@@ -0,0 +1,140 @@
+# src_GM/llm/context_cache.py
+import datetime
+import hashlib
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import config
+from llm.common import config_fingerprint, estimate_tokens, purpose_kind
+
+
+def split_prompt(prompt: Any) -> Optional[Tuple[str, str]]:
+    """
+    Returns (stable prefix, volatile suffix) for prompts built as a two-part
+    [prefix, suffix] list, or None for ordinary prompts. The two-part form is
+    also a valid generate_content argument, so layers that do not know about
+    prefixes (cache, cassette, stub) simply see the joined text.
+    """
+    if isinstance(prompt, (list, tuple)) and len(prompt) == 2 and all(isinstance(p, str) for p in prompt):
+        return prompt[0], prompt[1]
+    return None
+
+
+class ContextCache:
+    """
+    Registry of stable prompt prefixes.
+
+    - "provider": each prefix is uploaded once as Gemini CachedContent and later
+      calls send only the suffix against it. Prefixes the provider refuses
+      (e.g. below its minimum cacheable size) are sent in full.
+    - "local": nothing is uploaded; the first call with a prefix counts as the
+      cache write and later calls count the prefix tokens as cached, i.e. what
+      provider caching would save.
+
+    Tracks prompt and cached input tokens per component kind.
+    """
+
+    def __init__(self, mode: str = "local", ttl_seconds: int = 3600):
+        self.mode = mode
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[str, Any] = {}  # prefix key -> provider model, True (local) or None (uncachable)
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def entry_for(self, prefix: str, model_name: str, generation_config: Optional[dict]) -> Tuple[Any, bool]:
+        """Returns (entry, newly_registered) for a prefix, registering it on first use."""
+        key = hashlib.sha256(
+            f"{model_name}\x1f{config_fingerprint(generation_config)}\x1f{prefix}".encode("utf-8")).hexdigest()
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key], False
+            entry = self._create_provider_entry(prefix, model_name, generation_config) \
+                if self.mode == "provider" else True
+            self._entries[key] = entry
+            return entry, True
+
+    def _create_provider_entry(self, prefix: str, model_name: str, generation_config: Optional[dict]):
+        try:
+            import google.generativeai as genai
+            from google.generativeai import caching
+            cached_content = caching.CachedContent.create(
+                model=model_name, contents=[prefix],
+                ttl=datetime.timedelta(seconds=self.ttl_seconds))
+            return genai.GenerativeModel.from_cached_content(
+                cached_content=cached_content, generation_config=generation_config)
+        except Exception as e:
+            print(f"[Context Cache] Prefix not cached by the provider ({type(e).__name__}: {e}). Sending it in full.")
+            return None
+
+    def record(self, kind: str, prompt_tokens: int, cached_tokens: int):
+        with self._lock:
+            stats = self._stats.setdefault(kind, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0})
+            stats["calls"] += 1
+            stats["prompt_tokens"] += prompt_tokens
+            stats["cached_tokens"] += cached_tokens
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            components = {}
+            for kind, stats in self._stats.items():
+                ratio = stats["cached_tokens"] / stats["prompt_tokens"] if stats["prompt_tokens"] else 0.0
+                components[kind] = {**stats, "cached_ratio": round(ratio, 3)}
+            return {"mode": self.mode, "prefixes": len(self._entries), "components": components}
+
+
+class ContextCachedLLM:
+    """
+    Wraps a model so [prefix, suffix] prompts use the ContextCache. Ordinary
+    prompts pass through unchanged (and are counted as fully uncached).
+    """
+
+    def __init__(self, model, context_cache: ContextCache, model_name: str,
+                 generation_config: Optional[dict] = None, purpose: str = "general"):
+        self._model = model
+        self._context_cache = context_cache
+        self._model_name = model_name
+        self._generation_config = generation_config
+        self.purpose = purpose
+        self._kind = purpose_kind(purpose)
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        if generation_config is not None:
+            kwargs["generation_config"] = generation_config
+        parts = split_prompt(prompt)
+        if parts is None:
+            self._context_cache.record(self._kind, estimate_tokens(prompt), 0)
+            return self._model.generate_content(prompt, **kwargs)
+
+        prefix, suffix = parts
+        effective_config = generation_config if generation_config is not None else self._generation_config
+        entry, newly_registered = self._context_cache.entry_for(prefix, self._model_name, effective_config)
+        prompt_tokens = estimate_tokens(prompt)
+        if entry is None or entry is True:
+            # Local stand-in (or prefix refused by the provider): send the whole prompt.
+            response = self._model.generate_content(prompt, **kwargs)
+            cached_tokens = estimate_tokens(prefix) if entry is True and not newly_registered else 0
+        else:
+            response = entry.generate_content(suffix, **kwargs)
+            usage = getattr(response, "usage_metadata", None)
+            prompt_tokens = getattr(usage, "prompt_token_count", None) or prompt_tokens
+            cached_tokens = getattr(usage, "cached_content_token_count", None) or 0
+        self._context_cache.record(self._kind, prompt_tokens, cached_tokens)
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+
+_shared_context_cache: Optional[ContextCache] = None
+_context_cache_lock = threading.Lock()
+
+
+def get_context_cache() -> ContextCache:
+    """Returns the process-wide prefix registry configured from config."""
+    global _shared_context_cache
+    with _context_cache_lock:
+        if _shared_context_cache is None:
+            _shared_context_cache = ContextCache(
+                getattr(config, 'LLM_CONTEXT_CACHE_MODE', 'local'),
+                getattr(config, 'LLM_CONTEXT_CACHE_TTL_SECONDS', 3600))
+    return _shared_context_cache
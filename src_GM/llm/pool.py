@@ -0,0 +1,63 @@
+# src_GM/llm/pool.py
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from llm.common import config_fingerprint, purpose_kind
+
+
+class ModelPool:
+    """
+    Registry of shared LLM clients keyed by (backend, model name, generation config,
+    component kind). Components asking for an equivalent model get the same client
+    object, so startup cost no longer grows with the number of agents.
+
+    The kind is part of the key because the wrapping layers differ per component
+    (cache exclusions, per-purpose concurrency limits, cassette tags).
+    Clients are safe to share: calls carry no per-agent state.
+    """
+
+    def __init__(self):
+        self._clients: Dict[Tuple[str, str, str, str], Any] = {}
+        self._lock = threading.Lock()
+        # Metrics
+        self.requests = 0
+        self.build_seconds = 0.0
+
+    def get(self, backend: str, model_name: str, generation_config: Optional[dict], purpose: str,
+            build: Callable[[str, Optional[dict], str], Any]):
+        """Returns the shared client for this request, building it with build(...) on first use."""
+        kind = purpose_kind(purpose)
+        key = (backend, model_name, config_fingerprint(generation_config), kind)
+        with self._lock:
+            self.requests += 1
+            client = self._clients.get(key)
+            if client is None:
+                started = time.perf_counter()
+                # Built under the lock so concurrent callers never create duplicates.
+                client = build(model_name, generation_config, kind)
+                self.build_seconds += time.perf_counter() - started
+                self._clients[key] = client
+            return client
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"requests": self.requests, "clients": len(self._clients),
+                    "build_s": round(self.build_seconds, 4)}
+
+
+_shared_pool: Optional[ModelPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_model_pool() -> ModelPool:
+    """Returns the process-wide model pool."""
+    global _shared_pool
+    with _pool_lock:
+        if _shared_pool is None:
+            _shared_pool = ModelPool()
+    return _shared_pool
@@ -0,0 +1,226 @@
+# src_GM/llm/rate_limiter.py
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import config
+from llm.common import estimate_tokens, purpose_kind
+try:
+    from google.api_core.exceptions import (ResourceExhausted, ServiceUnavailable,
+                                            InternalServerError, DeadlineExceeded)
+except ImportError:
+    # Provide fallback or raise an error if the necessary library is not installed
+    print("Warning: google-api-core not installed. API error handling may not work correctly.")
+
+    class ResourceExhausted(Exception):
+        pass  # Define a dummy exception if import fails
+
+    class ServiceUnavailable(Exception):
+        pass
+
+    class InternalServerError(Exception):
+        pass
+
+    class DeadlineExceeded(Exception):
+        pass
+
+# Errors worth retrying after a pause; only ResourceExhausted (429) slows down every caller.
+TRANSIENT_ERRORS = (ResourceExhausted, ServiceUnavailable,
+                    InternalServerError, DeadlineExceeded)
+
+
+class TokenBucket:
+    """Classic token bucket: holds up to `capacity`, refills at `refill_per_second`."""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self._last = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens +
+                          (now - self._last) * self.refill_per_second)
+        self._last = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if they already are)."""
+        amount = min(amount, self.capacity)  # oversized requests wait for a full bucket
+        missing = amount - self.tokens
+        return max(0.0, missing / self.refill_per_second)
+
+    def consume(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """
+    Shared quota gate for every LLM call: a requests/min bucket and a tokens/min
+    bucket. Callers block in acquire() until both have room. A 429 from the
+    server pauses all callers for the backoff delay (or the server's retry hint).
+    Exposes queue depth and wait-time metrics through stats().
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float,
+                 backoff_base: float = 2.0, backoff_max: float = 60.0):
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._blocked_until = 0.0
+        self._condition = threading.Condition()
+        self._rng = random.Random()
+        # Metrics
+        self.queue_depth = 0
+        self.peak_queue_depth = 0
+        self.acquired = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.retries = 0
+        self.wait_by_purpose: Dict[str, float] = {}
+
+    def acquire(self, estimated_tokens: int, purpose: str = "general") -> float:
+        """Blocks until one request and `estimated_tokens` fit the quotas. Returns seconds waited."""
+        start = time.monotonic()
+        with self._condition:
+            self.queue_depth += 1
+            self.peak_queue_depth = max(self.peak_queue_depth, self.queue_depth)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self.requests.refill(now)
+                    self.tokens.refill(now)
+                    wait = max(self._blocked_until - now,
+                               self.requests.time_until(1),
+                               self.tokens.time_until(estimated_tokens))
+                    if wait <= 0:
+                        self.requests.consume(1)
+                        self.tokens.consume(estimated_tokens)
+                        break
+                    self._condition.wait(wait)
+            finally:
+                self.queue_depth -= 1
+
+            waited = time.monotonic() - start
+            self.acquired += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            self.wait_by_purpose[purpose] = self.wait_by_purpose.get(purpose, 0.0) + waited
+        return waited
+
+    def projected_wait(self, requests: int = 1, estimated_tokens: int = 0) -> float:
+        """Seconds a caller would wait right now for `requests` calls (nothing is consumed)."""
+        with self._condition:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            return max(0.0, self._blocked_until - now,
+                       self.requests.time_until(requests),
+                       self.tokens.time_until(estimated_tokens))
+
+    def backoff_delay(self, attempt: int, retry_hint: Optional[float] = None) -> float:
+        """Exponential backoff with jitter; a server retry hint takes precedence."""
+        if retry_hint is not None:
+            return retry_hint
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        # "Equal jitter": at least half the ceiling, so retries still back off.
+        return ceiling / 2 + self._rng.uniform(0, ceiling / 2)
+
+    def pause_all(self, seconds: float):
+        """Holds every caller back for `seconds` (after a 429, the quota is shared)."""
+        with self._condition:
+            self.retries += 1
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._condition.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "acquired": self.acquired,
+                "queue_depth": self.queue_depth,
+                "peak_queue_depth": self.peak_queue_depth,
+                "total_wait_s": round(self.total_wait, 3),
+                "max_wait_s": round(self.max_wait, 3),
+                "avg_wait_s": round(self.total_wait / self.acquired, 3) if self.acquired else 0.0,
+                "retries": self.retries,
+                "wait_by_purpose_s": {k: round(v, 3) for k, v in self.wait_by_purpose.items()},
+            }
+
+
+def retry_hint_seconds(error: Exception) -> Optional[float]:
+    """Extracts the server's suggested retry delay from a 429 error, if present."""
+    for detail in getattr(error, "details", None) or []:
+        retry_delay = getattr(detail, "retry_delay", None)
+        if retry_delay is not None and getattr(retry_delay, "seconds", None) is not None:
+            return float(retry_delay.seconds) + getattr(retry_delay, "nanos", 0) / 1e9
+    match = re.search(r"retry_delay\s*\{\s*seconds:\s*(\d+)", str(error))
+    if match:
+        return float(match.group(1))
+    match = re.search(r"retry in ([\d.]+)\s*s", str(error), re.IGNORECASE)
+    if match:
+        return float(match.group(1))
+    return None
+
+
+class RateLimitedLLM:
+    """
+    Wraps a model so every call first acquires from the shared RateLimiter, and
+    transient failures are retried with backoff instead of fixed sleeps.
+    """
+
+    def __init__(self, model, limiter: RateLimiter, generation_config: Optional[dict] = None,
+                 purpose: str = "general", max_retries: int = 6):
+        self._model = model
+        self._limiter = limiter
+        self._generation_config = generation_config or {}
+        self.purpose = purpose
+        self._kind = purpose_kind(purpose)
+        self.max_retries = max_retries
+
+    def _estimate_tokens(self, prompt, generation_config) -> int:
+        # ~4 characters per token for the prompt, plus the output budget.
+        effective_config = generation_config if isinstance(generation_config, dict) else self._generation_config
+        return estimate_tokens(prompt) + int(effective_config.get("max_output_tokens", 0))
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        estimated_tokens = self._estimate_tokens(prompt, generation_config)
+        if generation_config is not None:
+            kwargs["generation_config"] = generation_config
+        attempt = 0
+        while True:
+            self._limiter.acquire(estimated_tokens, self._kind)
+            try:
+                return self._model.generate_content(prompt, **kwargs)
+            except TRANSIENT_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._limiter.backoff_delay(attempt, retry_hint_seconds(e))
+                print(f"[Rate Limiter] {self.purpose}: {type(e).__name__} (attempt {attempt + 1}/{self.max_retries}). "
+                      f"Retrying in {delay:.1f}s.")
+                if isinstance(e, ResourceExhausted):
+                    self._limiter.pause_all(delay)
+                else:
+                    time.sleep(delay)
+                attempt += 1
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+
+_shared_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Returns the process-wide rate limiter configured from config."""
+    global _shared_limiter
+    with _limiter_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter(
+                getattr(config, 'LLM_REQUESTS_PER_MINUTE', 30),
+                getattr(config, 'LLM_TOKENS_PER_MINUTE', 1_000_000),
+                backoff_base=getattr(config, 'LLM_BACKOFF_BASE_SECONDS', 2.0),
+                backoff_max=getattr(config, 'LLM_BACKOFF_MAX_SECONDS', 60.0))
+    return _shared_limiter
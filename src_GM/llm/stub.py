@@ -0,0 +1,187 @@
+# src_GM/llm/stub.py
+import json
+import random
+import re
+import time
+from typing import List, Optional
+
+from llm.common import TextResponse, prompt_text, purpose_kind
+
+
+class StubLLM:
+    """
+    Deterministic, offline stand-in for a Gemini model.
+
+    Implements the generate_content(...).text surface and answers every
+    component with output in the format that component parses: planning
+    intents, the "SUCCESS | MOVE | ... | ..." resolver line, director commands
+    (CHANGE_WEATHER / ADD_OBJECT / CREATE_AMBIENT_EVENT / DO_NOTHING), reflections and story prose.
+    Choices come from a seeded RNG and from names found in the prompt itself
+    (exits, agents, items, locations), so runs are reproducible and valid.
+    """
+
+    WEATHERS = ["Light Rain", "Overcast", "Clear Skies", "Strong Wind", "Thick Fog"]
+
+    def __init__(self, model_name: str = "stub", generation_config: Optional[dict] = None, purpose: str = "general",
+                 seed: int = 0, latency: float = 0.0, latency_jitter: float = 0.0):
+        self.model_name = model_name
+        self.purpose = purpose
+        self._kind = purpose_kind(purpose)
+        self._generation_config = generation_config
+        # Seeded per purpose so adding a component does not shift the others' choices.
+        self._rng = random.Random(f"{seed}:{purpose}")
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.calls = 0
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        text = prompt_text(prompt)
+        self.calls += 1
+        if self.latency or self.latency_jitter:
+            time.sleep(self.latency + self._rng.uniform(0, self.latency_jitter))
+
+        kind = self._kind if self._kind != "general" else self._sniff_kind(text)
+        if kind == "planning":
+            if text.startswith("BATCH PLANNING"):
+                return TextResponse(self._plan_batch(text))
+            return TextResponse(self._plan(text))
+        if kind == "resolver":
+            return TextResponse(self._resolve(text))
+        if kind == "director":
+            return TextResponse(self._direct(text))
+        if kind == "reflection":
+            return TextResponse(self._reflect(text))
+        if kind == "story":
+            return TextResponse(self._story(text))
+        return TextResponse("Stub response.")
+
+    # --- Prompt inspection helpers ---
+
+    @staticmethod
+    def _sniff_kind(text: str) -> str:
+        if "Action Resolver" in text:
+            return "resolver"
+        if "Director of this simulated world" in text:
+            return "director"
+        if "high-level insights" in text:
+            return "reflection"
+        if "storyteller" in text:
+            return "story"
+        if "a character in a simulated world" in text:
+            return "planning"
+        return "general"
+
+    @staticmethod
+    def _csv_after(text: str, marker: str) -> List[str]:
+        """Comma-separated names following marker up to the end of the line (trailing '.' dropped)."""
+        match = re.search(re.escape(marker) + r"(.*)", text)
+        if not match:
+            return []
+        line = match.group(1).strip().rstrip(".")
+        if not line or line == "None apparent":
+            return []
+        return [part.strip() for part in line.split(",") if part.strip()]
+
+    @staticmethod
+    def _items(text: str) -> List[str]:
+        """Item names from the '- description (name) - currently state' lines of an agent context."""
+        return re.findall(r"^- (?:.*\()?([^()\n]+?)\)? - currently ", text, re.MULTILINE)
+
+    # --- Per-purpose generators ---
+
+    def _plan_batch(self, text: str) -> str:
+        """Answers a batch planning prompt with a JSON list, planning each agent block separately."""
+        blocks = re.split(r"^=== AGENT: (.+) ===$", text.split("=== OUTPUT ===", 1)[0], flags=re.MULTILINE)
+        entries = [{"agent": name, "intent": self._plan(block)}
+                   for name, block in zip(blocks[1::2], blocks[2::2])]
+        return json.dumps(entries)
+
+    def _plan(self, text: str) -> str:
+        exits = self._csv_after(text, "Visible Exits: ")
+        others = self._csv_after(text, "Agents in range for interaction")
+        # The agents line reads "...(X cannot interact ...): A, B." - keep what follows "):".
+        others = [o.split("):")[-1].strip() for o in others]
+        items = self._items(text)
+
+        options = ["wait"]
+        if exits:
+            options.append("move")
+        if others:
+            options += ["speak", "speak"]
+        if items:
+            options.append("interact")
+        choice = self._rng.choice(options)
+
+        if choice == "move":
+            return f"Walk to the {self._rng.choice(exits)}."
+        if choice == "speak":
+            target = self._rng.choice(others)
+            return f'Ask {target}, "What do you make of all this?"'
+        if choice == "interact":
+            return f"Carefully examine the {self._rng.choice(items)}."
+        return "Wait silently and observe the surroundings."
+
+    def _resolve(self, text: str) -> str:
+        agent_match = re.search(r"Agent '([^']+)'", text)
+        agent_name = agent_match.group(1) if agent_match else "The agent"
+        intent_match = re.search(r'intends to: "(.*)"', text)
+        intent = intent_match.group(1) if intent_match else ""
+        exits = self._csv_after(text, "Visible Exits: ")
+        with_reason = "OUTCOME_REASON" in text
+
+        move = re.match(r"Walk to the (.+?)\.?$", intent)
+        speak = re.match(r'Ask ([^,]+), "(.*)"', intent)
+        examine = re.match(r"Carefully examine the (.+?)\.?$", intent)
+
+        if move and move.group(1) in exits:
+            destination = move.group(1)
+            parts = ["SUCCESS", "MOVE", f"destination: {destination}",
+                     f"{agent_name} walks to the {destination}.",
+                     f"{agent_name} wants a change of scene."]
+        elif move:
+            parts = ["FAILURE", "MOVE", f"destination: {move.group(1)}",
+                     f"{agent_name} looks for a way to the {move.group(1)} but finds none.",
+                     f"{agent_name} cannot reach it from here."]
+        elif speak:
+            parts = ["SUCCESS", "SPEAK", f"target: {speak.group(1)}, message: \"{speak.group(2)}\"",
+                     f"{agent_name} speaks to {speak.group(1)}.",
+                     f"{agent_name} wants to hear {speak.group(1)}'s opinion."]
+        elif examine:
+            parts = ["SUCCESS", "INTERACT", f"object: {examine.group(1)}, state: examined",
+                     f"{agent_name} examines the {examine.group(1)}.",
+                     f"{agent_name} is curious about it."]
+        else:
+            parts = ["SUCCESS", "WAIT", "duration: a moment",
+                     f"{agent_name} waits.", f"{agent_name} is biding their time."]
+
+        if not with_reason:
+            parts = parts[:4]
+        return " | ".join(parts)
+
+    def _direct(self, text: str) -> str:
+        locations = re.findall(
+            r"^  - (.+)$", text.split("Existing Locations:", 1)[-1].split("Location Details:", 1)[0], re.MULTILINE)
+        roll = self._rng.random()
+        if roll < 0.6 or not locations:
+            return "DO_NOTHING: No intervention is needed right now."
+        if roll < 0.8:
+            return f"CHANGE_WEATHER: {self._rng.choice(self.WEATHERS)}"
+        location = self._rng.choice(locations)
+        number = self._rng.randrange(1000)
+        if roll < 0.9:
+            return (f"ADD_OBJECT: object: stub object {number} , state: untouched , "
+                    f"description: A plain object placed by the stub director. , location: {location}")
+        return (f"CREATE_AMBIENT_EVENT: description: A loud stub noise number {number} echoes around. , "
+                f"location: {location} , loudness: {number % 3}")
+
+    def _reflect(self, text: str) -> str:
+        name_match = re.search(r"Agent Name: (.+)", text)
+        name = name_match.group(1).strip() if name_match else "The agent"
+        return f"- {name} senses the situation is shifting and should stay alert to the others' intentions."
+
+    def _story(self, text: str) -> str:
+        prose = "The day unfolded quietly, each character moving through the world with their own purpose."
+        # Refinement prompts ask for a leading completion tag.
+        if "[STORY_COMPLETE]" in text:
+            return f"[STORY_COMPLETE]{prose}"
+        return prose
@@ -0,0 +1,149 @@
+# src_GM/location_graph.py
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
+
+import config
+from scenario import Scenario
+
+
+class LocationGraph:
+    """
+    The exits between locations compiled once into integer node ids and adjacency
+    tuples, for reachability, shortest paths and k-hop neighborhoods without an LLM
+    call. Exits are one-way, as in the scenario's "exits_to". Breadth-first search
+    results are cached per source location (least recently used ones are dropped),
+    so memory stays O(cache size x locations) instead of all-pairs. Built from a
+    compiled Scenario, the node ids are its location ids.
+    """
+
+    def __init__(self, connectivity: Union[Dict[str, List[str]], Scenario], cache_size: Optional[int] = None):
+        # Exits to locations that are not defined are skipped (the prompts still list them)
+        if isinstance(connectivity, Scenario):
+            self.names: List[str] = [location.name for location in connectivity.locations]
+            self.ids: Dict[str, int] = {location.name: location.id for location in connectivity.locations}
+            self.adjacency: List[Tuple[int, ...]] = [
+                tuple(exit_.target_id for exit_ in location.exits if exit_.target_id >= 0)
+                for location in connectivity.locations]
+        else:
+            self.names = list(connectivity)
+            self.ids = {name: node for node, name in enumerate(self.names)}
+            self.adjacency = [
+                tuple(self.ids[exit_name] for exit_name in connectivity[name] if exit_name in self.ids)
+                for name in self.names]
+        self.cache_size = cache_size if cache_size is not None else getattr(
+            config, 'LOCATION_GRAPH_BFS_CACHE_SIZE', 1024)
+        self.neighborhood_cache_size = getattr(config, 'LOCATION_GRAPH_NEIGHBORHOOD_CACHE_SIZE', 4096)
+        # source node -> (distance per node, -1 if unreachable; BFS parent per node)
+        self._searches: "OrderedDict[int, Tuple[array, array]]" = OrderedDict()
+        # (location, max_hops) -> ((location, hops), ...), nearest first
+        self._neighborhoods: "OrderedDict[Tuple[str, int], Tuple[Tuple[str, int], ...]]" = OrderedDict()
+        # Branch runs share a graph across threads; the cache is the only mutable part
+        self._lock = threading.Lock()
+        self.searches_run = 0
+        self.cache_hits = 0
+        self.neighborhood_hits = 0
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _search(self, source: int) -> Tuple[array, array]:
+        """Distances and parents of a full BFS from a node, cached."""
+        with self._lock:
+            cached = self._searches.get(source)
+            if cached is not None:
+                self._searches.move_to_end(source)
+                self.cache_hits += 1
+                return cached
+        # Level by level over plain lists (faster to index), stored as compact arrays
+        distance_list = [-1] * len(self.names)
+        parent_list = [-1] * len(self.names)
+        distance_list[source] = 0
+        frontier = [source]
+        adjacency = self.adjacency
+        hops = 0
+        while frontier:
+            hops += 1
+            next_frontier = []
+            for node in frontier:
+                for neighbour in adjacency[node]:
+                    if distance_list[neighbour] < 0:
+                        distance_list[neighbour] = hops
+                        parent_list[neighbour] = node
+                        next_frontier.append(neighbour)
+            frontier = next_frontier
+        distances, parents = array('i', distance_list), array('i', parent_list)
+        with self._lock:
+            self.searches_run += 1
+            self._searches[source] = (distances, parents)
+            if len(self._searches) > self.cache_size:
+                self._searches.popitem(last=False)
+        return distances, parents
+
+    def distance(self, from_location: str, to_location: str) -> Optional[int]:
+        """Number of moves from one location to another, or None if it cannot be reached."""
+        source, target = self.ids.get(from_location), self.ids.get(to_location)
+        if source is None or target is None:
+            return None
+        hops = self._search(source)[0][target]
+        return hops if hops >= 0 else None
+
+    def is_reachable(self, from_location: str, to_location: str) -> bool:
+        return self.distance(from_location, to_location) is not None
+
+    def shortest_path(self, from_location: str, to_location: str) -> Optional[List[str]]:
+        """Locations on a shortest route, both ends included, or None if there is none."""
+        source, target = self.ids.get(from_location), self.ids.get(to_location)
+        if source is None or target is None:
+            return None
+        distances, parents = self._search(source)
+        if distances[target] < 0:
+            return None
+        path = [target]
+        while path[-1] != source:
+            path.append(parents[path[-1]])
+        return [self.names[node] for node in reversed(path)]
+
+    def within_hops(self, from_location: str, max_hops: int) -> Dict[str, int]:
+        """Locations at most max_hops moves away (the start included) -> their distance."""
+        source = self.ids.get(from_location)
+        if source is None:
+            return {}
+        # A bounded search only visits the neighborhood, unlike the cached full BFS
+        distances = {source: 0}
+        frontier = [source]
+        for hops in range(1, max_hops + 1):
+            next_frontier = []
+            for node in frontier:
+                for neighbour in self.adjacency[node]:
+                    if neighbour not in distances:
+                        distances[neighbour] = hops
+                        next_frontier.append(neighbour)
+            if not next_frontier:
+                break
+            frontier = next_frontier
+        return {self.names[node]: hops for node, hops in distances.items()}
+
+    def neighborhood(self, from_location: str, max_hops: int) -> Tuple[Tuple[str, int], ...]:
+        """within_hops as (location, hops) pairs, nearest first, cached for repeated lookups (event radii)."""
+        key = (from_location, max_hops)
+        with self._lock:
+            cached = self._neighborhoods.get(key)
+            if cached is not None:
+                self._neighborhoods.move_to_end(key)
+                self.neighborhood_hits += 1
+                return cached
+        # within_hops fills its dict level by level, so the pairs are already nearest first
+        neighborhood = tuple(self.within_hops(from_location, max_hops).items())
+        with self._lock:
+            self._neighborhoods[key] = neighborhood
+            if len(self._neighborhoods) > self.neighborhood_cache_size:
+                self._neighborhoods.popitem(last=False)
+        return neighborhood
+
+    def stats(self) -> Dict[str, int]:
+        return {"locations": len(self.names), "exits": sum(len(exits) for exits in self.adjacency),
+                "searches_run": self.searches_run, "cache_hits": self.cache_hits,
+                "cached_sources": len(self._searches), "cached_neighborhoods": len(self._neighborhoods),
+                "neighborhood_hits": self.neighborhood_hits}
@@ -1,9 +1,10 @@
 # --- Imports ---
-from collections import namedtuple  # For creating simple Event objects
+import json  # For the machine-readable run summary
+import os
 import random
-import time  # For pausing execution (e.g., between agent actions)
+import time  # For measuring run wall time
 # For type hinting lists (e.g., list of Agents)
-from typing import List, Optional
+from typing import Dict, List, Optional
 import google.generativeai as genai  # Google's Generative AI library
 import argparse  # For parsing command-line arguments
 
@@ -14,30 +15,78 @@ from world import WorldState
 from agent.agent import Agent
 from director import Director
 from logs import append_to_log_file  # For logging events
-
-# --- Data Structures ---
-
-# Define a simple structure to represent events within the simulation
-Event = namedtuple(
-    "Event", ["description", "location", "scope", "step", "triggered_by"])
+from llm.common import purpose_kind
+from llm.cache import CachedLLM, get_response_cache, is_cache_enabled_for
+from llm.cassette import RecordingLLM, ReplayLLM, get_cassette
+from llm.stub import StubLLM
+from llm.client import AsyncLLMClient, get_concurrency_stats
+from llm.rate_limiter import RateLimitedLLM, get_rate_limiter
+from llm.pool import get_model_pool
+from llm.context_cache import ContextCachedLLM, get_context_cache
+from checkpoint import Checkpointer, latest_checkpoint, load_checkpoint, restore_event_columns, restore_simulation
+from branching import SimulationBranch, run_branches
+from turn import TurnRunner
 
 # --- LLM Creation Helper ---
 
 
 def create_llm_instance(model_name: str, generation_config: dict, purpose: str = "general"):
     """
-    Helper function to create a configured Gemini model instance.
-    Ensures API key is configured before each model creation.
+    Helper function to get a configured model instance.
+    With LLM_POOL_ENABLED, equivalent requests (same backend, model, generation config and
+    component kind) share one client from the model pool instead of building a new one.
     """
-    try:
-        # It's good practice to ensure the API key is configured before creating a model.
-        # genai.configure() can be called multiple times; it's idempotent.
+    if getattr(config, 'LLM_POOL_ENABLED', False):
+        return get_model_pool().get(config.LLM_BACKEND, model_name, generation_config, purpose,
+                                    _build_llm_instance)
+    return _build_llm_instance(model_name, generation_config, purpose)
+
+
+def _configure_genai():
+    """Configures the Gemini client library once per process."""
+    global _genai_configured
+    if not _genai_configured:
         genai.configure(api_key=config.GEMINI_API_KEY)
+        _genai_configured = True
 
-        model = genai.GenerativeModel(
-            model_name=model_name,
-            generation_config=generation_config,
-        )
+
+_genai_configured = False
+
+
+def _build_llm_instance(model_name: str, generation_config: dict, purpose: str = "general"):
+    """
+    Helper function to create a configured Gemini model instance.
+    Ensures API key is configured before the first model creation.
+    """
+    try:
+        if config.LLM_BACKEND == "replay":
+            # Offline: every response comes from the recorded cassette.
+            model = ReplayLLM(get_cassette(), model_name,
+                              generation_config, purpose=purpose)
+        elif config.LLM_BACKEND == "stub":
+            # Offline: deterministic fake model, never cached or recorded.
+            model = StubLLM(model_name, generation_config, purpose=purpose,
+                            seed=config.STUB_LLM_SEED,
+                            latency=config.STUB_LLM_LATENCY,
+                            latency_jitter=config.STUB_LLM_LATENCY_JITTER)
+            if config.LLM_CONTEXT_CACHE_MODE == "local":
+                # Only accounting, so offline runs still report the cached-token ratio.
+                model = ContextCachedLLM(model, get_context_cache(), model_name,
+                                         generation_config, purpose=purpose)
+        else:
+            if not config.GEMINI_API_KEY:
+                raise ValueError(
+                    "Gemini API Key not found. Make sure it's set in the .env file.")
+            # It's good practice to ensure the API key is configured before creating a model.
+            _configure_genai()
+
+            model = genai.GenerativeModel(
+                model_name=model_name,
+                generation_config=generation_config,
+            )
+            model = _wrap_llm(model, model_name, generation_config, purpose)
+        # Outermost layer: bounded-concurrency async client with a blocking generate_content shim.
+        model = AsyncLLMClient(model, purpose=purpose)
         if config.SIMULATION_MODE == 'debug':
             print(
                 f"LLM instance created for {purpose}: {model_name} with config: {generation_config}")
@@ -50,6 +99,26 @@ def create_llm_instance(model_name: str, generation_config: dict, purpose: str =
         raise  # Re-raise the exception to halt simulation if a critical LLM cannot be created
 
 
+def _wrap_llm(model, model_name: str, generation_config: dict, purpose: str):
+    """Layers the optional LLM services (rate limiter, response cache, ...) around a raw model instance."""
+    kind = purpose_kind(purpose)
+    if config.LLM_CONTEXT_CACHE_MODE != "off":
+        # Directly on the raw model: in provider mode it swaps in the cached-content model.
+        model = ContextCachedLLM(model, get_context_cache(), model_name,
+                                 generation_config, purpose=purpose)
+    # Rate limiter next, so response cache hits never spend quota.
+    model = RateLimitedLLM(model, get_rate_limiter(), generation_config, purpose=purpose,
+                           max_retries=getattr(config, 'LLM_MAX_RETRIES', 6))
+    if is_cache_enabled_for(kind):
+        model = CachedLLM(model, get_response_cache(),
+                          model_name, generation_config, purpose=purpose)
+    if config.LLM_BACKEND == "record":
+        # Outermost, so cache hits are recorded as well and the cassette is complete.
+        model = RecordingLLM(model, get_cassette(),
+                             generation_config, purpose=purpose)
+    return model
+
+
 # --- Factory Functions for Components ---
 # These functions allow creating different implementations of simulation components
 # based on configuration strings, promoting modularity.
@@ -59,7 +128,7 @@ def get_memory_module(agent, memory_type):
     """Factory function to create an agent's memory module."""
     if memory_type == "SimpleMemory":
         from agent.memory import SimpleMemory
-        return SimpleMemory()
+        return SimpleMemory(agent)
     if memory_type == "ShortLongTMemory":
         from agent.memory import ShortLongTMemory
         reflection_llm = None
@@ -116,6 +185,19 @@ def get_planning_module(planning_type):  # Removed 'model' argument
         raise ValueError(f"Unknown thinker type: {planning_type}")
 
 
+def get_batch_planner(batch_size: int):
+    """Factory function for the optional multi-agent batch planner (None when batching is off)."""
+    if batch_size <= 1:
+        return None
+    from agent.planning import BatchPlanningIdentityOnly
+    planning_llm = create_llm_instance(
+        config.MODEL_NAME,
+        config.AGENT_PLANNING_GEN_CONFIG,
+        purpose="Agent Batch Planning"
+    )
+    return BatchPlanningIdentityOnly(planning_llm, config.AGENT_PLANNING_GEN_CONFIG)
+
+
 def get_action_resolver(resolver_type, world_ref=None):  # Removed 'model' argument
     """Factory function to create the action resolver."""
     if resolver_type == "LLMActionResolver":
@@ -140,16 +222,63 @@ def get_action_resolver(resolver_type, world_ref=None):  # Removed 'model' argum
         raise ValueError(f"Unknown action resolver type: {resolver_type}")
 
 
+def get_event_store(reset: bool = True):
+    """Factory function for the on-disk event store (None when disabled). reset=False continues it."""
+    if not getattr(config, 'EVENT_STORE_ENABLED', False):
+        return None
+    from event_store import EventStore
+    return EventStore(config.EVENT_STORE_DIR, getattr(config, 'EVENT_STORE_STEPS_PER_SEGMENT', 10), reset=reset)
+
+
+def get_event_columns():
+    """Factory function for the in-memory columnar event store (None when disabled)."""
+    if not getattr(config, 'EVENT_COLUMNS_ENABLED', False):
+        return None
+    from event_store import ColumnarEventStore
+    return ColumnarEventStore()
+
+
+def get_event_queue(event_dispatcher):
+    """Factory function for the optional event queue (None when disabled); attach(world) once agents are placed."""
+    if not getattr(config, 'EVENT_QUEUE_ENABLED', False):
+        return None
+    from event_queue import EventQueue
+    return EventQueue(event_dispatcher, movements=getattr(config, 'EVENT_QUEUE_MOVEMENTS', True))
+
+
 def get_event_dispatcher(dispatcher_type: str):
     """Factory function to create the event dispatcher."""
     if dispatcher_type == "DirectEventDispatcher":
         from event_dispatcher import DirectEventDispatcher
         return DirectEventDispatcher()
+    if dispatcher_type == "SubscriptionEventDispatcher":
+        from event_dispatcher import SubscriptionEventDispatcher
+        return SubscriptionEventDispatcher()  # attach(world) once the world exists
+    if dispatcher_type == "RadiusEventDispatcher":
+        from event_dispatcher import RadiusEventDispatcher
+        return RadiusEventDispatcher()  # attach(world) once the world exists
     else:
         # Handle unknown dispatcher types specified in config
         raise ValueError(f"Unknown event dispatcher type: {dispatcher_type}")
 
 
+def get_pacing_policy(policy_type: str):
+    """Factory function to create the pacing policy of the simulation loop."""
+    if config.LLM_BACKEND in ("replay", "stub"):
+        policy_type = "none"  # Offline backends have no quota to respect
+    if policy_type == "none":
+        from pacing import NoPacing
+        return NoPacing()
+    if policy_type == "fixed":
+        from pacing import FixedPacing
+        return FixedPacing(config.PACING_FIXED_SECONDS)
+    if policy_type == "quota":
+        from pacing import QuotaPacing
+        return QuotaPacing(get_rate_limiter())
+    else:
+        raise ValueError(f"Unknown pacing policy: {policy_type}")
+
+
 def get_story_generator(generator_type: str):  # Removed 'model' argument
     """Factory function to create the story generator."""
     if generator_type == "LLMLogStoryGenerator":
@@ -168,16 +297,102 @@ def get_story_generator(generator_type: str):  # Removed 'model' argument
 # --- Main Simulation Function ---
 
 
-def run_simulation():
+def load_command_script(path: str) -> Dict[int, List[str]]:
+    """
+    Reads a headless command file: one '<step> <command>' per line, where <command> is
+    anything accepted at the interactive prompt ('goal <x>', 'w <weather>', 'q').
+    Commands run at the end of their step. Blank lines and '#' comments are ignored.
+    """
+    commands: Dict[int, List[str]] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            step_text, _, command = line.partition(" ")
+            if not step_text.isdigit() or not command.strip():
+                raise ValueError(
+                    f"{path}:{line_number}: expected '<step> <command>', got '{line}'")
+            commands.setdefault(int(step_text), []).append(command.strip())
+    return commands
+
+
+def _apply_user_command(user_input: str, world: WorldState, director: Director) -> bool:
+    """Applies one interactive/scripted command. Returns False if the simulation should stop."""
+    if user_input == 'q':
+        # Quit the simulation loop
+        print("Quitting simulation by user request.")
+        return False
+    elif user_input.startswith('goal '):
+        # Change the director's narrative goal dynamically
+        new_goal = user_input[len('goal '):].strip()
+        if new_goal:
+            print(f"Updating Director goal to: '{new_goal}'")
+            director.narrative_goal = new_goal
+            # Log this user command as a world event
+            world.log_event(
+                f"COMMAND: Director narrative goal updated to '{new_goal}'.",
+                scope="global", location="world", triggered_by="User"
+            )
+        else:
+            print("Invalid command. Use 'goal <description>'.")
+    elif user_input.startswith('w '):
+        # Manually override the weather
+        # Capitalize words
+        new_weather = user_input[len('w '):].strip().title()
+        if new_weather:
+            print(f"Manual weather override to: {new_weather}")
+            # Update world state and log event
+            world.set_weather(new_weather, triggered_by="User")
+        else:
+            print("Invalid command. Use 'w <condition>'.")
+    # Handle empty input (just press Enter) or unknown commands
+    elif user_input:
+        print(
+            f"Unknown command: '{user_input}'. Press Enter to continue.")
+    # Otherwise, pressing Enter just proceeds to the next step
+    return True
+
+
+def run_simulation(headless: bool = False, max_steps: Optional[int] = None,
+                   commands: Optional[Dict[int, List[str]]] = None,
+                   resume_from: Optional[str] = None,
+                   branches: Optional[Dict[str, List[str]]] = None,
+                   branch_steps: Optional[int] = None) -> dict:
     """
     Sets up and runs the agent simulation loop.
     Initializes the world, agents, director, and other components based on the 'config' module.
     Manages the main simulation steps, including agent thinking, action resolution,
     world updates, event dispatching, and user interaction.
     Output verbosity depends on the config.SIMULATION_MODE ('debug' or 'story').
+
+    In headless mode there is no prompt between steps: the commands scheduled for a step
+    (see load_command_script) are applied at its end instead.
+    With resume_from (a checkpoint file, or a directory to take the latest one from) the
+    run continues from the saved step; the scenario config must be the same.
+    With branches (name -> commands), the final state is forked once per branch, the
+    branch's commands are applied and all branches run branch_steps further steps in parallel.
+    Returns a JSON-serializable summary of the run.
     """
+    run_started = time.perf_counter()
+    max_steps = max_steps or config.SIMULATION_MAX_STEPS
+    commands = commands or {}
+    resume_state = None
+    if resume_from:
+        if os.path.isdir(resume_from):
+            resume_from = latest_checkpoint(resume_from)
+            if resume_from is None:
+                raise ValueError("No checkpoint found to resume from.")
+        resume_state = load_checkpoint(resume_from)
 
     # --- Initialization Phase ---
+    # Seed the simulation RNG (turn order, ...) so that recorded runs replay identically.
+    if config.LLM_BACKEND == "replay" and get_cassette().seed is not None:
+        config.RANDOM_SEED = get_cassette().seed
+    elif config.RANDOM_SEED is None:
+        config.RANDOM_SEED = random.randrange(2**31)
+    random.seed(config.RANDOM_SEED)
+
     # Configure logging based on the simulation mode set in config
     if config.SIMULATION_MODE == 'debug':
         print("--- Starting Agent Simulation with Director (DEBUG MODE) ---")
@@ -195,8 +410,16 @@ def run_simulation():
 
     # 2. Initialize World State and Event Dispatcher
     event_dispatcher = get_event_dispatcher(config.EVENT_PERCEPTION_MODEL)
-    world = WorldState(known_locations_data=config.KNOWN_LOCATIONS_DATA)
+    pacing = get_pacing_policy(config.PACING_POLICY)
+    # When resuming, the on-disk event store is attached after the restore, so the
+    # setup events below are not appended to the saved history.
+    world = WorldState(known_locations_data=config.KNOWN_LOCATIONS_DATA,
+                       event_store=None if resume_state else get_event_store(),
+                       event_columns=get_event_columns())
     world.global_context['weather'] = config.WEATHER
+    event_dispatcher.attach(world)  # a subscription dispatcher follows agent movements
+    # Optional queue for bulk, coalesced delivery; it takes the dispatcher's place in the loop
+    event_queue = get_event_queue(event_dispatcher)
     if config.SIMULATION_MODE == 'debug':
         print("World state and event dispatcher initialized.")
 
@@ -245,33 +468,66 @@ def run_simulation():
         purpose="Director"
     )
     director = Director(world, director_llm, config.NARRATIVE_GOAL if hasattr(
-        config, 'NARRATIVE_GOAL') else "An emergent story.", None, event_dispatcher)
+        config, 'NARRATIVE_GOAL') else "An emergent story.", None, event_queue or event_dispatcher)
     director.memory = get_memory_module(director, config.AGENT_MEMORY_TYPE)
     if config.SIMULATION_MODE == 'debug':
         print(
             f"Director initialized with its own LLM and goal: '{director.narrative_goal}'")
 
+    # 4b. Optional batch planner (several agents planned per LLM request)
+    batch_planner = get_batch_planner(getattr(config, 'BATCH_PLANNING_SIZE', 1))
+
     # 5. Initialize Action Resolver
     action_resolver = get_action_resolver(  # LLM for resolver created here
         config.ACTION_RESOLVER_TYPE, world_ref=world)
     if config.SIMULATION_MODE == 'debug':
         print("Action resolver initialized with its own LLM.")
 
+    startup_seconds = time.perf_counter() - run_started
+    if config.SIMULATION_MODE == 'debug':
+        print(f"Startup took {startup_seconds:.3f}s. LLM pool: {get_model_pool().stats()}")
+
     # ---------------------------------------- Simulation Steps ----------------------------------------
     step = 0  # Initialize step counter
+    # Runs each step's agent turns (shared with the what-if branches, see branching.py)
+    turn_runner = TurnRunner(world, director, action_resolver, event_dispatcher, event_queue,
+                             batch_planner, pacing)
+    quit_by_command = False
     # Main simulation loop, continues until max steps are reached
 
     # Tracks agent from PREVIOUS step
     last_agent_acted_in_previous_step: Optional[Agent] = None
 
-    while step < config.SIMULATION_MAX_STEPS:
+    # 6. Checkpoints: restore a saved run, then save every CHECKPOINT_EVERY_N_STEPS steps
+    checkpointer = Checkpointer(getattr(config, 'CHECKPOINT_EVERY_N_STEPS', 0),
+                                getattr(config, 'CHECKPOINT_KEEP', 3))
+    if resume_state:
+        restore_started = time.perf_counter()
+        loop_state = restore_simulation(resume_state, world, agents, director)
+        step, turn_runner.turns = resume_state["step"], loop_state["turns"]
+        turn_runner.outcome_counts = loop_state["outcome_counts"]
+        last_agent_acted_in_previous_step = next(
+            (a for a in agents if a.name == loop_state["last_agent"]), None)
+        world.event_store = get_event_store(reset=False)
+        if world.event_store:
+            world.event_store.truncate_after(step)  # drop steps logged after the checkpoint
+        world.event_columns = get_event_columns()  # drop the placements logged during setup
+        restore_event_columns(resume_state, world)
+        append_to_log_file._first_call_done = True  # continue the text logs instead of clearing them
+        print(f"Resumed from {resume_from} at step {step} "
+              f"(restore took {(time.perf_counter() - restore_started) * 1000:.1f} ms).")
+
+    if event_queue:
+        event_queue.attach(world)  # after setup and restore, so placements are not queued as moves
+
+    while step < max_steps:
         step += 1  # Increment step counter
         world.advance_step()  # Advance the world's internal clock/step counter
 
         # Print step header based on simulation mode
         if config.SIMULATION_MODE == 'debug':
             print(f"\n\n")  # Add an extra blank line for better separation
-            header_text = f" SIMULATION STEP {step}/{config.SIMULATION_MAX_STEPS} "
+            header_text = f" SIMULATION STEP {step}/{max_steps} "
             print(header_text.center(70, '='))  # Centered header with '=' fill
             print("\n--- WORLD STATE (Start of Step) ---")
             print(world.get_full_state_string())
@@ -281,27 +537,8 @@ def run_simulation():
             print(f"\n\n--- TIME STEP {step} ---\n")
 
         # --- Determine Agent Turn Order for this Step ---
-        current_step_agents_list: List[Agent] = []  # Temp list for clarity
-        if not agents:
-            pass  # No agents to process, current_step_agents_list remains empty
-        elif len(agents) == 1:
-            # Only one agent, order is fixed
-            current_step_agents_list = list(agents)
-        else:
-            # Randomize order from the main 'agents' list
-            # Use list(agents) if 'agents' might not be a list
-            shuffled_agents = random.sample(list(agents), len(agents))
-
-            # Ensure the last agent from the previous round isn't first in this one
-            if last_agent_acted_in_previous_step and \
-               shuffled_agents[0].name == last_agent_acted_in_previous_step.name:  # Compare by a unique ID like name
-                # Simple fix: swap the first agent with the second agent.
-                # This assumes len(shuffled_agents) > 1, which is true due to len(agents) > 1 check
-                shuffled_agents[0], shuffled_agents[1] = shuffled_agents[1], shuffled_agents[0]
-            current_step_agents_list = shuffled_agents
-
-        # This is the list your loop will use
-        current_step_agents = current_step_agents_list
+        # Random, but the last agent from the previous round isn't first in this one
+        current_step_agents = turn_runner.turn_order(agents, random, last_agent_acted_in_previous_step)
 
         if config.SIMULATION_MODE == 'debug' and current_step_agents:
             agent_order_names = [a.name for a in current_step_agents]
@@ -310,155 +547,9 @@ def run_simulation():
                 print(
                     f"(Last agent in step {step-1} was: {last_agent_acted_in_previous_step.name})")
 
-        # This variable will track the actual last agent who took a turn in THIS step
-        agent_who_took_last_turn_this_step: Optional[Agent] = None
-
         # --- Sequential Agent Action, Resolution, and Perception Loop ---
-        for agent in current_step_agents:
-
-            director.director_step()
-
-            if config.SIMULATION_MODE == 'debug':
-                # More prominent agent turn header
-                turn_header = f" AGENT: {agent.name}'s Turn "
-                # Centered with hyphens
-                print(f"\n{turn_header.center(60, '-')}")
-                print(
-                    f"Location: {world.agent_locations.get(agent.name, 'Unknown')}")
-
-            current_loc = world.agent_locations.get(agent.name, None)
-            if not current_loc:
-                if config.SIMULATION_MODE == 'debug':
-                    print(
-                        f"  [Sim Warning]: Agent {agent.name} has no location! Skipping turn.")
-                print("-" * 60)  # End agent turn block
-                continue
-
-            # 1. AGENT THINKING (Plan action)
-            if config.SIMULATION_MODE == 'debug':
-                print(f"  [Phase 1] {agent.name} Thinking...")
-            # Agent plans based on current world state
-            intended_output = agent.plan(world)
-
-            # Optional pause
-            time.sleep(1)
-
-            # 2. ACTION RESOLUTION
-            if config.SIMULATION_MODE == 'debug':
-                print(f"  [Phase 2] Action Resolution for {agent.name}...")
-
-            if not action_resolver:
-                if config.SIMULATION_MODE == 'debug':
-                    print(
-                        f"    [Sim Error]: Action resolver not available for {agent.name}. Skipping resolution.")
-                print("-" * 60)  # End agent turn block
-                continue
-
-            result = action_resolver.resolve(
-                agent.name, current_loc, intended_output, world
-            )
-
-            # 3. PROCESS RESULT, UPDATE WORLD, DISPATCH EVENT (IMMEDIATELY)
-            outcome_desc_for_event = ""
-            outcome_reason_for_event = ""
-
-            if result and result.get("success"):
-                outcome_desc = result.get(
-                    'outcome_description', f"{agent.name} acted.")
-                outcome_reason = result.get('outcome_reason', '')
-
-                outcome_desc_for_event = outcome_desc  # Use this for the event
-                outcome_reason_for_event = outcome_reason  # Use this for the event
-
-                if config.SIMULATION_MODE == 'debug':
-                    print(
-                        f"    [RESOLVER_SUCCESS] Action: {result.get('action_type', 'Unknown')}")
-                    print(
-                        f"      Outcome: {outcome_desc} \n Reason: {outcome_reason}")
-                if config.SIMULATION_MODE == 'story':
-                    # Slightly more spacing for story mode
-                    print(f"\n{outcome_desc}\n{outcome_reason}\n\n")
-
-                if result.get("world_state_updates"):
-                    if config.SIMULATION_MODE == 'debug':
-                        print(
-                            f"Applying world state updates for {agent.name}'s action...")
-                    world.apply_state_updates(
-                        result["world_state_updates"], triggered_by=agent.name)
-                    if config.SIMULATION_MODE == 'debug':
-                        print(f"        Updates applied.")
-                    if any(len(upd) >= 2 and upd[0] == 'agent_location' and upd[1] == agent.name for upd in result["world_state_updates"]):
-                        current_loc = world.agent_locations.get(
-                            agent.name, current_loc)
-
-            elif result:  # Failed Action
-                reason = result.get('reasoning', 'Unknown reason')
-                outcome_desc = result.get(
-                    'outcome_description', 'Action failed.')
-                outcome_desc_for_event = f"{agent.name} attempt to {intended_output} failed: {outcome_desc}"
-
-                if config.SIMULATION_MODE == 'debug':
-                    print(f"    [RESOLVER_FAILURE] Reason: {reason}")
-                    print(f"      Outcome: {outcome_desc_for_event}")
-                if config.SIMULATION_MODE == 'story':
-                    # Add a newline before for better separation
-                    print(
-                        f"\n{agent.name} tried to act, but {outcome_desc.lower()}")
-
-            else:  # Resolver Error
-                error_msg = f"System error resolving {agent.name}'s action for intent: {intended_output}."
-                outcome_desc_for_event = error_msg
-                if config.SIMULATION_MODE == 'debug':
-                    print(
-                        f"    [RESOLVER_ERROR] Critical failure for {agent.name}.")
-                    print(f"      Details: {error_msg}")
-                if config.SIMULATION_MODE == 'story':
-                    # Add a newline before for better separation
-                    print(
-                        f"\n[System Note] Issue resolving {agent.name}'s action.")
-
-            # 3b. CREATE, LOG, AND DISPATCH EVENT (for success, failure, or error)
-            if outcome_desc_for_event:
-                event_scope = result.get(
-                    'event_scope', 'action_outcome') if result else 'system_error'
-
-                if outcome_reason_for_event:
-                    outcome_desc_for_event += f" Because {outcome_reason_for_event}"
-
-                
-                world.log_event(outcome_desc_for_event, event_scope,
-                                current_loc, agent.name if result else 'System')
-                append_to_log_file(
-                    "simulation_logs.txt", f"""{agent.name}'s turn in {current_loc}:\n {outcome_desc_for_event}\n\n""")
-                append_to_log_file(
-                    "simulation_logs_with_director_logs.txt", f"""{agent.name}'s turn in {current_loc}:\n {outcome_desc_for_event}\n\n""")
-                
-                #check if second word of outcome_desc_for_event is "tries"
-                desc_splited = outcome_desc_for_event.split()
-                if len(desc_splited) > 1 and desc_splited[1] == "tries" and desc_splited[2] == "to" and desc_splited[3] == "speak" and desc_splited[4] == "to":
-                    outcome_desc_for_event+=" You must move to a different location in order to speak to that person."
-                    
-                new_event = Event(
-                    description=outcome_desc_for_event,
-                    location=current_loc,
-                    scope=event_scope,
-                    step=world.current_step,
-                    triggered_by=agent.name if result else 'System'
-                )
-                # if config.SIMULATION_MODE == 'debug':
-                #     # Truncate long descriptions
-                #     print(
-                #         f"    [Event Dispatch] For: {new_event.triggered_by}, Desc: \"{new_event.description[:50]}...\"")
-                event_dispatcher.dispatch_event(
-                    new_event, world.registered_agents, world.agent_locations
-                )
-                director.perceive(new_event)  # Director perceives the event
-
-            if config.SIMULATION_MODE == 'debug':
-                print("-" * 60)  # End agent turn block
-
-            agent_who_took_last_turn_this_step = agent
-            time.sleep(1)
+        # Returns the actual last agent who took a turn in THIS step
+        agent_who_took_last_turn_this_step = turn_runner.run_turns(current_step_agents)
 
          # Update the tracker for the *next* step's calculation
         if agent_who_took_last_turn_this_step:
@@ -469,6 +560,7 @@ def run_simulation():
         # last_agent_acted_in_previous_step retains its value, which is correct.
 
         # ---------------------------------------- End Step ----------------------------------------
+        turn_runner.end_step()  # flushes the event queue, if any
         if config.SIMULATION_MODE == 'debug':
             print(f"\n")  # Add a blank line
             footer_text = f" END OF STEP {step} "
@@ -479,46 +571,83 @@ def run_simulation():
 
         # ---------------------------------------- User Input ----------------------------------------
         # Allows pausing the simulation, quitting, or changing parameters mid-run.
-        user_input = input(
-            "Enter for next step, 'goal <new goal>' to change director goal, 'w <weather>' for weather, 'q' to quit: "
-        ).lower().strip()
-
-        if user_input == 'q':
-            # Quit the simulation loop
-            print("Quitting simulation by user request.")
+        # Headless runs take the commands scheduled for this step from the command file.
+        if headless:
+            step_commands = commands.get(step, [])
+        else:
+            step_commands = [input(
+                "Enter for next step, 'goal <new goal>' to change director goal, 'w <weather>' for weather, 'q' to quit: "
+            )]
+        quit_by_command = not all(_apply_user_command(command.lower().strip(), world, director)
+                                  for command in step_commands)
+        # A checkpoint on quit too, so a stopped run can be resumed with --resume
+        checkpointer.maybe_save(world, agents, director, step, {
+            "turns": turn_runner.turns, "outcome_counts": turn_runner.outcome_counts,
+            "last_agent": last_agent_acted_in_previous_step.name if last_agent_acted_in_previous_step else None,
+        }, force=quit_by_command)
+        if quit_by_command:
             break
-        elif user_input.startswith('goal '):
-            # Change the director's narrative goal dynamically
-            new_goal = user_input[len('goal '):].strip()
-            if new_goal:
-                print(f"Updating Director goal to: '{new_goal}'")
-                director.narrative_goal = new_goal
-                # Log this user command as a world event
-                world.log_event(
-                    f"COMMAND: Director narrative goal updated to '{new_goal}'.",
-                    scope="global", location="world", triggered_by="User"
-                )
-            else:
-                print("Invalid command. Use 'goal <description>'.")
-        elif user_input.startswith('w '):
-            # Manually override the weather
-            # Capitalize words
-            new_weather = user_input[len('w '):].strip().title()
-            if new_weather:
-                print(f"Manual weather override to: {new_weather}")
-                # Update world state and log event
-                world.set_weather(new_weather, triggered_by="User")
-            else:
-                print("Invalid command. Use 'w <condition>'.")
-        # Handle empty input (just press Enter) or unknown commands
-        elif user_input:
-            if user_input:  # Only print error if it wasn't just Enter
-                print(
-                    f"Unknown command: '{user_input}'. Press Enter to continue.")
-            # Otherwise, pressing Enter just proceeds to the next step
 
     # ---------------------------------------- Simulation End ----------------------------------------
     print(f"\n--- Simulation Ended after {step} steps ---")
+    if getattr(config, 'LLM_CACHE_ENABLED', False):
+        print(f"LLM cache stats: {get_response_cache().stats()}")
+    if config.SIMULATION_MODE == 'debug':
+        print(f"LLM concurrency stats: {get_concurrency_stats()}")
+        print(f"Pacing ({type(pacing).__name__}): {pacing.total_paused:.1f}s paused")
+        print(f"LLM context cache stats: {get_context_cache().stats()}")
+        print(f"World context cache stats: {world.context_cache_stats()}")
+    if config.LLM_BACKEND in ("gemini", "record"):
+        print(f"LLM rate limiter stats: {get_rate_limiter().stats()}")
+    summary = {
+        "steps_completed": step,
+        "max_steps": max_steps,
+        "quit_by_command": quit_by_command,
+        "seed": config.RANDOM_SEED,
+        "backend": config.LLM_BACKEND,
+        "model": config.MODEL_NAME,
+        "turns": turn_runner.turns,
+        "outcomes": turn_runner.outcome_counts,
+        "final_weather": world.global_context.get('weather'),
+        "director_goal": director.narrative_goal,
+        "agent_locations": dict(world.agent_locations),
+        "startup_s": round(startup_seconds, 3),
+        "wall_time_s": round(time.perf_counter() - run_started, 3),
+        "paused_s": round(pacing.total_paused, 3),
+        "llm": {"concurrency": get_concurrency_stats(), "pool": get_model_pool().stats(),
+                "context_cache": get_context_cache().stats()},
+        "batch_planning": batch_planner.stats() if batch_planner else None,
+        "world_context_cache": world.context_cache_stats(),
+        "location_graph": world.location_graph.stats(),
+        "event_dispatcher": event_dispatcher.stats() if hasattr(event_dispatcher, "stats") else None,
+        "event_queue": event_queue.stats() if event_queue else None,
+        "event_store": world.event_store.stats() if world.event_store else None,
+        "resumed_from": resume_from,
+        "checkpoints": checkpointer.stats(),
+    }
+    if branches:
+        base = SimulationBranch("main", world, agents, director, action_resolver, event_dispatcher,
+                                seed=config.RANDOM_SEED, apply_command=_apply_user_command,
+                                event_queue=event_queue, batch_planner=batch_planner, pacing=pacing,
+                                last_agent=last_agent_acted_in_previous_step)
+        branch_started = time.perf_counter()
+        summary["branches"] = run_branches(
+            [base.fork(name, branch_commands) for name, branch_commands in branches.items()],
+            branch_steps or getattr(config, 'BRANCH_STEPS', 5))
+        print(f"Ran {len(branches)} branches in {time.perf_counter() - branch_started:.2f}s.")
+    if world.event_store:
+        world.event_store.close()
+    if world.event_columns is not None:
+        world.event_columns.save(config.EVENT_COLUMNS_DIR)
+        summary["event_columns"] = world.event_columns.stats()
+    if getattr(config, 'LLM_CACHE_ENABLED', False):
+        summary["llm"]["cache"] = get_response_cache().stats()
+    if config.LLM_BACKEND in ("gemini", "record"):
+        summary["llm"]["rate_limiter"] = get_rate_limiter().stats()
+    if config.LLM_BACKEND in ("record", "replay"):
+        print(f"Cassette stats ({config.LLM_BACKEND}): {get_cassette().stats()}")
+        summary["llm"]["cassette"] = get_cassette().stats()
+        get_cassette().close()
 
     # # --- Story Generation (if configured) ---
     # if story_generator:
@@ -532,6 +661,7 @@ def run_simulation():
     #             config, 'NARRATIVE_GOAL') else "An undescribed adventure.",
     #         tone=config.TONE 
     #     )
+    return summary
 
 
 # --- Main Execution Block ---
@@ -545,12 +675,68 @@ if __name__ == "__main__":
     group.add_argument('--story', action='store_true',
                        help='Enable narrative story logging.')
 
+    # Optional record/replay of every LLM call (see llm/cassette.py)
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument('--record', metavar='CASSETTE',
+                                help='Record all LLM calls of this run to a cassette file.')
+    cassette_group.add_argument('--replay', metavar='CASSETTE',
+                                help='Replay LLM calls from a cassette file (no network).')
+    cassette_group.add_argument('--stub', action='store_true',
+                                help='Use the built-in deterministic stub model (no network, no API key).')
+    parser.add_argument('--no-pause', action='store_true',
+                        help='Disable pacing between turns (same as PACING_POLICY = "none").')
+    parser.add_argument('--cache', action='store_true',
+                        help='Serve repeated LLM requests from the on-disk response cache (for regression runs).')
+
+    # Unattended runs: no prompt between steps, scripted commands, JSON summary at the end
+    parser.add_argument('--headless', action='store_true',
+                        help='Run without the per-step prompt (for scripted/overnight runs).')
+    parser.add_argument('--steps', type=int, metavar='N',
+                        help='Number of steps to run (default: SIMULATION_MAX_STEPS).')
+    parser.add_argument('--commands', metavar='FILE',
+                        help="Headless command file with '<step> <command>' lines, e.g. '5 w Heavy Rain'.")
+    parser.add_argument('--summary', metavar='OUT',
+                        help='Write the JSON run summary to this file (headless default: stdout).')
+    parser.add_argument('--resume', metavar='CHECKPOINT',
+                        help='Continue a run from a checkpoint file (or the latest one in a directory).')
+    parser.add_argument('--branch', action='append', metavar='NAME=COMMANDS', default=[],
+                        help="After the run, fork a what-if branch with these ';'-separated commands "
+                             "(repeatable), e.g. rain='w Heavy Rain'.")
+    parser.add_argument('--branch-steps', type=int, metavar='N',
+                        help='Steps each branch runs (default: BRANCH_STEPS).')
+
     # Parse the command-line arguments provided by the user
     args = parser.parse_args()
+    if args.record or args.replay:
+        config.LLM_BACKEND = 'record' if args.record else 'replay'
+        config.LLM_CASSETTE_PATH = args.record or args.replay
+    elif args.stub:
+        config.LLM_BACKEND = 'stub'
+    if args.no_pause:
+        config.PACING_POLICY = 'none'
+    if args.cache:
+        config.LLM_CACHE_ENABLED = True
 
     # Set the global simulation mode in the config module based on the arguments.
     # This allows other modules imported after this point to easily check the mode.
     config.SIMULATION_MODE = 'debug' if args.debug else 'story'
 
+    if args.commands and not args.headless:
+        parser.error("--commands requires --headless")
+    commands = load_command_script(args.commands) if args.commands else None
+    branches = {}
+    for branch_arg in args.branch:
+        name, separator, branch_commands = branch_arg.partition("=")
+        if not separator or not name.strip() or name.strip() in branches:
+            parser.error(f"--branch expects a unique NAME=COMMANDS, got '{branch_arg}'")
+        branches[name.strip()] = [c.strip() for c in branch_commands.split(";") if c.strip()]
+
     # Call the main simulation function, which will now use the mode set in config
-    run_simulation()
+    summary = run_simulation(headless=args.headless,
+                             max_steps=args.steps, commands=commands, resume_from=args.resume,
+                             branches=branches, branch_steps=args.branch_steps)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    elif args.headless:
+        print(json.dumps(summary))
@@ -0,0 +1,58 @@
+# src_GM/pacing.py
+import time
+from abc import ABC, abstractmethod
+
+
+class BasePacingPolicy(ABC):
+    """
+    Abstract Base Class for how the simulation loop paces itself between LLM-heavy phases.
+    pause() is called after each agent's planning call ("plan") and after each agent turn ("turn").
+    """
+
+    def __init__(self):
+        self.total_paused = 0.0  # Seconds spent idle, reported at the end of a run
+
+    @abstractmethod
+    def delay_for(self, phase: str) -> float:
+        """Returns how many seconds to wait after the given phase."""
+        pass
+
+    def pause(self, phase: str):
+        delay = self.delay_for(phase)
+        if delay > 0:
+            time.sleep(delay)
+            self.total_paused += delay
+
+
+class NoPacing(BasePacingPolicy):
+    """Never waits; turn throughput is bounded only by the LLM calls themselves."""
+
+    def delay_for(self, phase: str) -> float:
+        return 0.0
+
+
+class FixedPacing(BasePacingPolicy):
+    """Waits a fixed number of seconds after every phase (the original behaviour used 1s)."""
+
+    def __init__(self, seconds: float):
+        super().__init__()
+        self.seconds = seconds
+
+    def delay_for(self, phase: str) -> float:
+        return self.seconds
+
+
+class QuotaPacing(BasePacingPolicy):
+    """
+    Waits only when the shared rate limiter is short of quota for the next phase:
+    after planning the resolver call follows, after a turn the next agent plans
+    and resolves. With headroom left it does not wait at all.
+    """
+    CALLS_AFTER = {"plan": 1, "turn": 2}
+
+    def __init__(self, limiter):
+        super().__init__()
+        self.limiter = limiter
+
+    def delay_for(self, phase: str) -> float:
+        return self.limiter.projected_wait(self.CALLS_AFTER.get(phase, 1))
@@ -0,0 +1,247 @@
+# src_GM/scenario.py
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import config
+
+ITEM_FIELDS = ("object", "state", "optional_description", "linked_to")
+
+
+class Item:
+    """
+    One object in a location. Slotted, but reads and writes like the item dicts of
+    the scenario config (item["state"], item.get("object")), so prompts and world
+    updates use it unchanged. Keys other than ITEM_FIELDS are kept in `extra`.
+    """
+    __slots__ = ("object", "state", "optional_description", "linked_to", "extra")
+
+    def __init__(self, object: str, state: Any, optional_description: Optional[str] = None,
+                 linked_to: Optional[Dict[str, str]] = None, extra: Optional[Dict[str, Any]] = None):
+        self.object = sys.intern(object)
+        self.state = state
+        self.optional_description = optional_description
+        self.linked_to = linked_to
+        self.extra = extra
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in ITEM_FIELDS:
+            value = getattr(self, key)
+            return default if value is None and key != "state" else value
+        return self.extra.get(key, default) if self.extra else default
+
+    def __getitem__(self, key: str) -> Any:
+        if key in ITEM_FIELDS:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key in ITEM_FIELDS:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        if key in ITEM_FIELDS:
+            return key == "state" or getattr(self, key) is not None
+        return bool(self.extra) and key in self.extra
+
+    def keys(self) -> Iterator[str]:
+        return (key for key in self.to_dict())
+
+    def items(self):
+        return self.to_dict().items()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The item as a plain dict, in the scenario config's layout."""
+        data = {"object": self.object, "state": self.state}
+        if self.optional_description is not None:
+            data["optional_description"] = self.optional_description
+        if self.linked_to is not None:
+            data["linked_to"] = self.linked_to
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Item):
+            other = other.to_dict()
+        return isinstance(other, dict) and self.to_dict() == other
+
+    __hash__ = None  # mutable, like the dicts it replaces
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+
+    def __reduce__(self):
+        # Used by pickle (checkpoints) and copy.deepcopy
+        return (Item, (self.object, self.state, self.optional_description, self.linked_to, self.extra))
+
+
+class Exit:
+    """A one-way exit. target_id is the target's location id, -1 for an undefined location."""
+    __slots__ = ("target", "target_id")
+
+    def __init__(self, target: str, target_id: int):
+        self.target = target
+        self.target_id = target_id
+
+    def __repr__(self) -> str:
+        return f"Exit({self.target!r}, {self.target_id})"
+
+    def __reduce__(self):
+        return (Exit, (self.target, self.target_id))
+
+
+class Location:
+    """The fixed part of a location: interned name, integer id, description and exits."""
+    __slots__ = ("name", "id", "description", "exits")
+
+    def __init__(self, name: str, id: int, description: str, exits: Tuple[Exit, ...]):
+        self.name = name
+        self.id = id
+        self.description = description
+        self.exits = exits
+
+    def exit_names(self) -> List[str]:
+        return [exit_.target for exit_ in self.exits]
+
+    def __repr__(self) -> str:
+        return f"Location({self.name!r}, id={self.id}, exits={self.exit_names()})"
+
+    def __reduce__(self):
+        return (Location, (self.name, self.id, self.description, self.exits))
+
+
+class Scenario:
+    """
+    KNOWN_LOCATIONS_DATA validated and compiled once: Location records by name and by
+    id, and each location's initial properties with its items as Item records. The
+    config data itself is not modified.
+    """
+
+    def __init__(self, locations: List[Location], properties: Dict[str, Dict[str, Any]],
+                 warnings: List[str]):
+        self.locations = locations
+        self.by_name: Dict[str, Location] = {location.name: location for location in locations}
+        self.initial_properties = properties
+        self.warnings = warnings
+
+    def new_properties(self) -> Dict[str, Dict[str, Any]]:
+        """Fresh mutable copies of the initial properties (items included), for one world."""
+        return {name: copy_properties(props) for name, props in self.initial_properties.items()}
+
+
+def copy_properties(props: Dict[str, Any]) -> Dict[str, Any]:
+    """Copies a location's properties with its own Item records (other values are shared)."""
+    copied = dict(props)
+    copied["contains"] = [Item(item.object, item.state, item.optional_description, item.linked_to,
+                               dict(item.extra) if item.extra else None) for item in props.get("contains", ())]
+    return copied
+
+
+def compile_item(item_data: Any, location: str, errors: List[str]) -> Optional[Item]:
+    """Validates one item entry of a "contains" list and returns it as an Item."""
+    if isinstance(item_data, Item):
+        return item_data
+    if not isinstance(item_data, dict):
+        errors.append(f"'{location}': item {item_data!r} is not a dict.")
+        return None
+    name = item_data.get("object")
+    if not isinstance(name, str) or not name.strip():
+        errors.append(f"'{location}': item {item_data!r} has no 'object' name.")
+        return None
+    if item_data.get("state") is None:
+        errors.append(f"'{location}': item '{name}' has no 'state'.")
+        return None
+    linked_to = item_data.get("linked_to")
+    if linked_to is not None and not (isinstance(linked_to, dict) and isinstance(linked_to.get("location"), str)
+                                      and isinstance(linked_to.get("object_key"), str)):
+        errors.append(f"'{location}': item '{name}' has a 'linked_to' without 'location' and 'object_key'.")
+        return None
+    extra = {key: value for key, value in item_data.items() if key not in ITEM_FIELDS}
+    return Item(name, item_data["state"], item_data.get("optional_description"),
+                dict(linked_to) if linked_to else None, extra or None)
+
+
+def compile_items(items: Any, location: str) -> List[Item]:
+    """Validates and converts a whole "contains" list (e.g. one set at runtime). Raises ValueError."""
+    errors: List[str] = []
+    if not isinstance(items, list):
+        raise ValueError(f"'{location}': 'contains' must be a list, got {type(items).__name__}.")
+    compiled = [compile_item(item_data, location, errors) for item_data in items]
+    if errors:
+        raise ValueError("Invalid items: " + " ".join(errors))
+    return compiled
+
+
+def compile_scenario(known_locations_data: Dict[str, Dict[str, Any]]) -> Scenario:
+    """
+    Validates the scenario schema and compiles it. Problems that would break the
+    simulation (malformed locations or items, links to missing locations or items)
+    are collected and raised together as one ValueError. Exits to undefined
+    locations only produce warnings: they stay visible in prompts, and the
+    resolver lets agents wander there.
+    """
+    errors: List[str] = []
+    warnings: List[str] = []
+    if not isinstance(known_locations_data, dict) or not known_locations_data:
+        raise ValueError("Invalid scenario: KNOWN_LOCATIONS_DATA must be a non-empty dict of locations.")
+    ids = {sys.intern(name): location_id for location_id, name in enumerate(known_locations_data)}
+
+    locations: List[Location] = []
+    properties: Dict[str, Dict[str, Any]] = {}
+    for name, location_id in ids.items():
+        loc_data = known_locations_data[name]
+        if not isinstance(loc_data, dict):
+            errors.append(f"'{name}': location data must be a dict.")
+            continue
+        description = loc_data.get("description", "An undescribed location.")
+        if not isinstance(description, str):
+            errors.append(f"'{name}': 'description' must be a string.")
+        exits_to = loc_data.get("exits_to", [])
+        if not isinstance(exits_to, list) or not all(isinstance(exit_name, str) for exit_name in exits_to):
+            errors.append(f"'{name}': 'exits_to' must be a list of location names.")
+            exits_to = []
+        for exit_name in exits_to:
+            if exit_name not in ids:
+                warnings.append(f"'{name}' has an exit to '{exit_name}', which is not a defined location.")
+        exits = tuple(Exit(sys.intern(exit_name), ids.get(exit_name, -1)) for exit_name in exits_to)
+        locations.append(Location(name, location_id, description, exits))
+
+        props = loc_data.get("properties", {})
+        if not isinstance(props, dict):
+            errors.append(f"'{name}': 'properties' must be a dict.")
+            props = {}
+        items = props.get("contains", [])
+        if not isinstance(items, list):
+            errors.append(f"'{name}': 'contains' must be a list of items.")
+            items = []
+        compiled = dict(props)
+        compiled["contains"] = [item for item in (compile_item(item_data, name, errors) for item_data in items)
+                                if item is not None]
+        properties[name] = compiled
+
+    # Links are checked once all items are known
+    item_names = {name: {item.object.strip().lower() for item in props["contains"]}
+                  for name, props in properties.items()}
+    for name, props in properties.items():
+        for item in props["contains"]:
+            if item.linked_to is None:
+                continue
+            linked_location, object_key = item.linked_to["location"], item.linked_to["object_key"]
+            if linked_location not in item_names:
+                errors.append(f"'{name}': item '{item.object}' is linked to unknown location '{linked_location}'.")
+            elif object_key.strip().lower() not in item_names[linked_location]:
+                errors.append(f"'{name}': item '{item.object}' is linked to '{object_key}', "
+                              f"which is not in '{linked_location}'.")
+
+    if errors:
+        raise ValueError("Invalid scenario (KNOWN_LOCATIONS_DATA):\n  - " + "\n  - ".join(errors))
+    if config.SIMULATION_MODE == 'debug':
+        for warning in warnings:
+            print(f"[Scenario Warning]: {warning}")
+    return Scenario(locations, properties, warnings)
@@ -1,24 +1,25 @@
 # src_GM/story_generator.py
-from google.api_core.exceptions import ResourceExhausted
 from abc import ABC, abstractmethod
+import os
 import time
+from typing import List, Optional
 from world import WorldState  # To access event logs, etc.
+from event_store import ColumnarEventStore  # Structured event history
 import config  # To access agent_configs, narrative_goal for context
-try:
-    # Also catch general API errors
-    from google.api_core.exceptions import ResourceExhausted, GoogleAPICallError
-except ImportError:
-    # Provide fallback or raise an error if the necessary library is not installed
-    print("Warning: google-api-core not installed. API error handling may not work correctly.")
-
-    class ResourceExhausted(Exception):
-        pass  # Define a dummy exception if import fails
+from logs import append_to_log_file  # To log generated stories or errors
 
-    class GoogleAPICallError(Exception):
-        pass  # Define a dummy exception if import fails
-    
 
-from logs import append_to_log_file  # To log generated stories or errors
+def load_story_entries(log_source) -> Optional[List[str]]:
+    """
+    Reads the log entries from a structured source: a ColumnarEventStore or a
+    directory written by ColumnarEventStore.save() (config.EVENT_COLUMNS_DIR).
+    Returns None for a plain text log file, which the generators parse as before.
+    """
+    if isinstance(log_source, ColumnarEventStore):
+        return log_source.story_entries()
+    if isinstance(log_source, str) and os.path.isdir(log_source):
+        return ColumnarEventStore.load(log_source).story_entries()
+    return None
 
 class BaseStoryGenerator(ABC):
     """
@@ -64,10 +65,12 @@ class LLMLogStoryGenerator(BaseStoryGenerator):
         # 2. Read Event Log from File
         formatted_events = []
         try:
-            # Read the content line by line from the log file
-            with open(log_file_path, 'r', encoding='utf-8') as f:
-                # Read all lines, strip whitespace/newlines, and filter out empty lines
-                raw_events = [line.strip() for line in f if line.strip()]
+            raw_events = load_story_entries(log_file_path)
+            if raw_events is None:
+                # Read the content line by line from the log file
+                with open(log_file_path, 'r', encoding='utf-8') as f:
+                    # Read all lines, strip whitespace/newlines, and filter out empty lines
+                    raw_events = [line.strip() for line in f if line.strip()]
 
             # Note: Since the log file saved raw strings without the original
             # location, scope, triggered_by metadata, we can only present
@@ -206,12 +209,6 @@ Your Story:
                 print(f"\n[Error] Could not save story to file: {e}")
             
             return story_text
-        except ResourceExhausted as e:
-            print(
-                f"[{self.name} Error]: LLM generation failed: {e}. Waiting 10 seconds and retrying...")
-            time.sleep(10)
-            return self.generate_story(log_file_path, agent_configs, narrative_goal)
-        
         except Exception as e:
             error_message = f"[StoryGenerator Error]: LLM story generation failed: {e}"
             print(error_message)
@@ -219,7 +216,7 @@ Your Story:
             # from logs import append_to_log_file
             # append_to_log_file("simulation_log.txt", error_message)
 
-            if hasattr(response, 'prompt_feedback') and response.prompt_feedback:
+            if 'response' in locals() and hasattr(response, 'prompt_feedback') and response.prompt_feedback:
                 feedback_message = f" (Safety Feedback: {response.prompt_feedback})"
                 print(feedback_message)
                 # Log safety feedback
@@ -247,13 +244,6 @@ class LLMIterativeStoryGenerator:
             story_text = response.text.strip()
             return story_text
 
-        except ResourceExhausted as e:
-            print(f"[{self.name if hasattr(self, 'name') else 'StoryGenerator'} Error]: LLM generation failed: {e}. Waiting 10 seconds and retrying...")
-            time.sleep(10)
-            # Be careful with infinite retries. Consider adding a retry counter.
-            # Recursive retry or raise
-            return self._call_llm_for_story(prompt, max_tokens)
-
         except Exception as e:
             error_message = f"[StoryGenerator Error]: LLM story generation failed: {e}"
             print(error_message)
@@ -275,8 +265,10 @@ class LLMIterativeStoryGenerator:
 
         formatted_events = []
         try:
-            with open(log_file_path, 'r', encoding='utf-8') as f:
-                raw_events = [line.strip() for line in f if line.strip()]
+            raw_events = load_story_entries(log_file_path)
+            if raw_events is None:
+                with open(log_file_path, 'r', encoding='utf-8') as f:
+                    raw_events = [line.strip() for line in f if line.strip()]
             formatted_events = raw_events
             if not formatted_events:
                 events_summary = "No events were logged during the simulation."
@@ -553,15 +545,6 @@ class LLMChunkedStoryGenerator(BaseStoryGenerator):
             story_text = response.text.strip()
             return story_text
 
-        except ResourceExhausted as e:
-            print(f"[{self.name} Error]: LLM generation failed due to resource exhaustion: {e}. Waiting 10 seconds and retrying...")
-            time.sleep(10)
-            return self._call_llm_for_story(prompt, max_tokens)
-        except GoogleAPICallError as e:
-            print(
-                f"[{self.name} Error]: Google API call failed: {e}. Waiting 10 seconds and retrying...")
-            time.sleep(10)
-            return self._call_llm_for_story(prompt, max_tokens)
         except Exception as e:
             error_message = f"[{self.name} Error]: LLM story generation failed: {e}"
             print(error_message)
@@ -693,31 +676,36 @@ Your Response (starting with either [CONTINUE_WRITING] or [STORY_COMPLETE] ):
         # 2. Read All Events from File
         all_raw_events = []
         try:
-            with open(log_file_path, 'r', encoding='utf-8') as f:
-                current_event_lines = []
-                for line in f:
-                    stripped_line = line.strip()
-
-                    # Skip entirely empty lines
-                    if not stripped_line:
-                        continue
-
-                    # Check if this line signals the start of a new event
-                    # Based on your log format, new events start with a line ending in ':'
-                    if stripped_line.endswith(':'):
-                        # If we've collected lines for a previous event, add it to our list
-                        if current_event_lines:
-                            all_raw_events.append(
-                                "\n".join(current_event_lines))
-                        # Start a new event with this line
-                        current_event_lines = [stripped_line]
-                    else:
-                        # This line is a continuation of the current event
-                        current_event_lines.append(stripped_line)
-
-                # After the loop, add the very last event if there are any pending lines
-                if current_event_lines:
-                    all_raw_events.append("\n".join(current_event_lines))
+            # Structured history: one entry per event, no boundary guessing needed
+            structured_entries = load_story_entries(log_file_path)
+            if structured_entries is not None:
+                all_raw_events = structured_entries
+            else:
+                with open(log_file_path, 'r', encoding='utf-8') as f:
+                    current_event_lines = []
+                    for line in f:
+                        stripped_line = line.strip()
+
+                        # Skip entirely empty lines
+                        if not stripped_line:
+                            continue
+
+                        # Check if this line signals the start of a new event
+                        # Based on your log format, new events start with a line ending in ':'
+                        if stripped_line.endswith(':'):
+                            # If we've collected lines for a previous event, add it to our list
+                            if current_event_lines:
+                                all_raw_events.append(
+                                    "\n".join(current_event_lines))
+                            # Start a new event with this line
+                            current_event_lines = [stripped_line]
+                        else:
+                            # This line is a continuation of the current event
+                            current_event_lines.append(stripped_line)
+
+                    # After the loop, add the very last event if there are any pending lines
+                    if current_event_lines:
+                        all_raw_events.append("\n".join(current_event_lines))
 
             if not all_raw_events:
                 print("No events found in the log file. Cannot generate story.")
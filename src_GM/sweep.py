@@ -0,0 +1,215 @@
+# src_GM/sweep.py
+"""
+Runs a grid of scenario x seed x generation-config simulations in parallel.
+
+Each run executes in its own worker process (fresh interpreter, so the mutable
+`config` module is isolated per run) and in its own output directory, where
+the run's console output, simulation logs, story and summary are written.
+All run summaries are aggregated into <out>/sweep_index.json.
+
+Example (from src_GM):
+    python sweep.py --seeds 1 2 3 --temperature 0.7 --temperature 1.2 --steps 10
+    python sweep.py --scenario "../initial configs/config for Mateo and Elena.txt" --stub
+"""
+import argparse
+import ast
+import concurrent.futures
+import contextlib
+import copy
+import glob
+import itertools
+import json
+import os
+import re
+import sys
+import time
+import traceback
+from typing import Any, Dict, List, Optional
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SCENARIO_DIR = os.path.join(os.path.dirname(SRC_DIR), "initial configs")
+
+# Scenario settings the sweep controls itself (or that must not leak into runs).
+_IGNORED_SCENARIO_KEYS = {"GEMINI_API_KEY", "SIMULATION_MODE"}
+# Component names used by older scenario files, mapped to their current factory names.
+_LEGACY_COMPONENT_NAMES = {"LLMResolver": "LLMActionResolver"}
+# Generation configs affected by --temperature (the story prompt keeps its own).
+_SIMULATION_GEN_CONFIGS = ["AGENT_PLANNING_GEN_CONFIG", "ACTION_RESOLVER_GEN_CONFIG",
+                           "DIRECTOR_GEN_CONFIG", "AGENT_REFLECTION_GEN_CONFIG"]
+
+
+def load_scenario(path: str) -> Dict[str, Any]:
+    """
+    Reads the literal top-level settings of a scenario file (a config.py copy)
+    without executing it. Non-literal assignments such as os.getenv(...) are skipped.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    settings = {}
+    for node in tree.body:
+        if not isinstance(node, ast.Assign):
+            continue
+        for target in node.targets:
+            if not isinstance(target, ast.Name) or target.id in _IGNORED_SCENARIO_KEYS:
+                continue
+            try:
+                settings[target.id] = ast.literal_eval(node.value)
+            except ValueError:
+                pass  # Not a literal (e.g. os.getenv), keep config.py's value
+    for key in ("ACTION_RESOLVER_TYPE", "AGENT_MEMORY_TYPE", "AGENT_PLANNING_TYPE"):
+        if settings.get(key) in _LEGACY_COMPONENT_NAMES:
+            settings[key] = _LEGACY_COMPONENT_NAMES[settings[key]]
+    return settings
+
+
+def scenario_name(path: str) -> str:
+    """'config for Mateo and Elena.txt' -> 'mateo_and_elena'."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    name = re.sub(r"^config for ", "", name, flags=re.IGNORECASE)
+    return re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+
+
+def _apply_gen_overrides(settings: Dict[str, Any], gen_overrides: Dict[str, Dict[str, Any]]):
+    """Merges {"AGENT_PLANNING_GEN_CONFIG": {"temperature": 1.2}, ...} into the settings."""
+    import config
+    for key, override in gen_overrides.items():
+        base = settings.get(key, getattr(config, key, {}))
+        settings[key] = {**base, **override}
+
+
+def _run_one(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Worker entry point: configures this process for one run and executes it."""
+    run_dir = job["run_dir"]
+    os.makedirs(run_dir, exist_ok=True)
+    os.chdir(run_dir)  # Logs and story files are written to the working directory
+    sys.path.insert(0, SRC_DIR)
+    started = time.perf_counter()
+    record = {key: job[key] for key in ("scenario", "seed", "variant", "run_dir")}
+
+    with open("run.log", "w", encoding="utf-8") as log, \
+            contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            import config
+            settings = copy.deepcopy(job["settings"])
+            _apply_gen_overrides(settings, job["gen_overrides"])
+            for key, value in {**settings, **job["run_overrides"]}.items():
+                setattr(config, key, value)
+
+            import main
+            summary = main.run_simulation(headless=True, max_steps=job["steps"])
+            if job["with_story"]:
+                story_generator = main.get_story_generator(config.STORY_GENERATOR_TYPE)
+                if story_generator:
+                    # The saved columnar history when available, else the text log
+                    log_source = config.EVENT_COLUMNS_DIR if getattr(config, 'EVENT_COLUMNS_ENABLED', False) \
+                        else "simulation_logs.txt"
+                    story_generator.generate_story(
+                        log_source, config.agent_configs,
+                        config.NARRATIVE_GOAL, getattr(config, 'TONE', ''))
+            with open("summary.json", "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2)
+            record.update(status="ok", summary=summary)
+        except Exception as e:
+            traceback.print_exc()
+            record.update(status="error", error=f"{type(e).__name__}: {e}")
+    record["wall_time_s"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def build_jobs(scenarios: List[str], seeds: List[int], gen_variants: Dict[str, Dict[str, Dict[str, Any]]],
+               out_dir: str, steps: Optional[int], backend: str, workers: int,
+               with_story: bool) -> List[Dict[str, Any]]:
+    """Expands the scenario x seed x generation-config grid into one job per run."""
+    import config
+    # Every process has its own rate limiter, so each gets a share of the API quota.
+    run_overrides = {
+        "LLM_BACKEND": backend,
+        "SIMULATION_MODE": "story",
+        "PACING_POLICY": "quota",
+        "LLM_REQUESTS_PER_MINUTE": config.LLM_REQUESTS_PER_MINUTE / workers,
+        "LLM_TOKENS_PER_MINUTE": config.LLM_TOKENS_PER_MINUTE / workers,
+    }
+    jobs = []
+    for scenario_path, seed, (variant, gen_overrides) in itertools.product(
+            scenarios, seeds, gen_variants.items()):
+        name = scenario_name(scenario_path)
+        run_dir = os.path.join(out_dir, name, f"seed{seed}_{variant}")
+        jobs.append({
+            "scenario": name, "seed": seed, "variant": variant, "run_dir": run_dir,
+            "settings": load_scenario(scenario_path),
+            "gen_overrides": gen_overrides,
+            "run_overrides": {**run_overrides, "RANDOM_SEED": seed,
+                              # Per-run cache: a shared one would hand every seed the same responses.
+                              "LLM_CACHE_PATH": os.path.join(run_dir, config.LLM_CACHE_PATH),
+                              "LLM_CASSETTE_PATH": os.path.join(run_dir, "llm_cassette.jsonl.gz")},
+            "steps": steps, "with_story": with_story,
+        })
+    return jobs
+
+
+def run_sweep(jobs: List[Dict[str, Any]], out_dir: str, workers: int) -> List[Dict[str, Any]]:
+    """Runs the jobs on a process pool (one fresh process per run) and writes the index."""
+    os.makedirs(out_dir, exist_ok=True)
+    results = []
+    # max_tasks_per_child=1 gives every run a fresh interpreter, i.e. its own config module.
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=1) as pool:
+        futures = {pool.submit(_run_one, job): job for job in jobs}
+        for future in concurrent.futures.as_completed(futures):
+            job = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:  # The worker process itself died
+                record = {key: job[key] for key in ("scenario", "seed", "variant", "run_dir")}
+                record.update(status="error", error=f"{type(e).__name__}: {e}")
+            results.append(record)
+            print(f"[Sweep] {len(results)}/{len(jobs)} {record['scenario']} seed={record['seed']} "
+                  f"{record['variant']}: {record['status']} ({record.get('wall_time_s', '?')}s)")
+
+    results.sort(key=lambda r: (r["scenario"], r["seed"], r["variant"]))
+    with open(os.path.join(out_dir, "sweep_index.json"), "w", encoding="utf-8") as f:
+        json.dump({"runs": results}, f, indent=2)
+    return results
+
+
+def _gen_variants(temperatures: List[float], gen_configs: List[str]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """Named generation-config variants from --temperature and --gen-config arguments."""
+    variants = {}
+    for temperature in temperatures:
+        variants[f"t{temperature:g}"] = {key: {"temperature": temperature}
+                                          for key in _SIMULATION_GEN_CONFIGS}
+    for index, raw in enumerate(gen_configs):
+        variants[f"gen{index}"] = json.loads(raw)
+    return variants or {"default": {}}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a parallel sweep of simulation scenarios")
+    parser.add_argument('--scenario', action='append', dest='scenarios', metavar='FILE',
+                        help="Scenario config file (repeatable). Default: every file in 'initial configs/'.")
+    parser.add_argument('--seeds', type=int, nargs='+', default=[0], help='Simulation seeds.')
+    parser.add_argument('--temperature', type=float, action='append', default=[],
+                        help='Temperature for all simulation components (repeatable, one variant each).')
+    parser.add_argument('--gen-config', action='append', default=[], metavar='JSON',
+                        help='Generation-config variant, e.g. \'{"DIRECTOR_GEN_CONFIG": {"top_k": 20}}\' (repeatable).')
+    parser.add_argument('--steps', type=int, help='Steps per run (default: the scenario\'s SIMULATION_MAX_STEPS).')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Parallel runs.')
+    parser.add_argument('--out', default='sweep_runs', help='Output directory.')
+    parser.add_argument('--no-story', action='store_true', help='Skip story generation after each run.')
+    backend_group = parser.add_mutually_exclusive_group()
+    backend_group.add_argument('--record', action='store_true',
+                               help='Record every run to a cassette in its run directory.')
+    backend_group.add_argument('--stub', action='store_true',
+                               help='Use the deterministic stub model (no network, no API key).')
+    args = parser.parse_args()
+
+    sys.path.insert(0, SRC_DIR)
+    scenarios = args.scenarios or sorted(glob.glob(os.path.join(DEFAULT_SCENARIO_DIR, "*.txt")))
+    backend = "stub" if args.stub else "record" if args.record else "gemini"
+    out_dir = os.path.abspath(args.out)
+    jobs = build_jobs(scenarios, args.seeds, _gen_variants(args.temperature, args.gen_config),
+                      out_dir, args.steps, backend, args.workers, not args.no_story)
+    print(f"[Sweep] {len(jobs)} runs on {args.workers} workers -> {out_dir}")
+    results = run_sweep(jobs, out_dir, args.workers)
+    failed = [r for r in results if r["status"] != "ok"]
+    print(f"[Sweep] Done: {len(results) - len(failed)} ok, {len(failed)} failed. "
+          f"Index: {os.path.join(out_dir, 'sweep_index.json')}")
@@ -0,0 +1,233 @@
+# src_GM/turn.py
+import random
+from typing import Dict, List, Optional
+
+import config
+from llm.client import run_in_background
+from logs import append_to_log_file
+from world import Event
+
+
+class TurnRunner:
+    """
+    Runs the agent turns of a simulation step: the Director's intervention, the agent's
+    plan (or next route hop, or batched intent), the resolution, and the outcome event
+    (logged, queued or dispatched, and perceived by the Director). The main loop and
+    every what-if branch (see branching.py) use it, so they play by the same rules.
+    With narrate=False (branches) nothing is printed and the text logs are not written.
+    """
+
+    def __init__(self, world, director, action_resolver, event_dispatcher, event_queue=None,
+                 batch_planner=None, pacing=None, narrate: bool = True):
+        self.world = world
+        self.director = director
+        self.action_resolver = action_resolver
+        self.event_dispatcher = event_dispatcher
+        self.event_queue = event_queue
+        self.batch_planner = batch_planner
+        self.pacing = pacing
+        self.narrate = narrate
+        self.turns = 0
+        self.outcome_counts = {"success": 0, "failure": 0, "error": 0}
+
+    def _say(self, text: str, mode: str = 'debug'):
+        """Prints text in the given simulation mode, unless the runner is silent (branches)."""
+        if self.narrate and config.SIMULATION_MODE == mode:
+            print(text)
+
+    @staticmethod
+    def turn_order(agents: List, rng=random, last_agent=None) -> List:
+        """A random turn order in which the agent that acted last in the previous step does not go first."""
+        if len(agents) <= 1:
+            return list(agents)
+        shuffled_agents = rng.sample(list(agents), len(agents))
+        if last_agent and shuffled_agents[0].name == last_agent.name:
+            shuffled_agents[0], shuffled_agents[1] = shuffled_agents[1], shuffled_agents[0]
+        return shuffled_agents
+
+    def run_turns(self, step_agents: List):
+        """Runs one turn per agent, in order. Returns the last agent that took its turn (None if none did)."""
+        # Intents planned ahead by the batch planner, consumed on each agent's turn
+        batched_intents: Dict[str, str] = {}
+        last_agent = None
+        for turn_index, agent in enumerate(step_agents):
+            if self.run_turn(agent, step_agents[turn_index:], batched_intents):
+                last_agent = agent
+        return last_agent
+
+    def end_step(self):
+        """Delivers what the event queue holds at the end of a step ("turn") or the whole step ("step")."""
+        if self.event_queue:
+            self.event_queue.flush()
+
+    def run_turn(self, agent, upcoming_agents: Optional[List] = None,
+                 batched_intents: Optional[Dict[str, str]] = None) -> bool:
+        """
+        One agent turn. upcoming_agents (this agent first) are the ones the batch planner
+        may plan together; batched_intents holds their intents across the step's turns.
+        Returns False if the turn was skipped.
+        """
+        world, director, action_resolver = self.world, self.director, self.action_resolver
+        upcoming_agents = upcoming_agents or [agent]
+        batched_intents = {} if batched_intents is None else batched_intents
+
+        # The Director normally plans and acts before the agent thinks. With
+        # OVERLAP_DIRECTOR_PLANNING its LLM call runs alongside the agent's
+        # planning call and its intervention is applied right after.
+        director_plan_future = None
+        if config.OVERLAP_DIRECTOR_PLANNING:
+            director_plan_future = run_in_background(
+                director.plan_intervention)
+        else:
+            director.director_step()
+
+        # More prominent agent turn header, centered with hyphens
+        turn_header = f" AGENT: {agent.name}'s Turn "
+        self._say(f"\n{turn_header.center(60, '-')}")
+        self._say(f"Location: {world.agent_locations.get(agent.name, 'Unknown')}")
+
+        current_loc = world.agent_locations.get(agent.name, None)
+        if not current_loc:
+            self._say(f"  [Sim Warning]: Agent {agent.name} has no location! Skipping turn.")
+            if director_plan_future:
+                director.act(director_plan_future.result())
+            if self.narrate:
+                print("-" * 60)  # End agent turn block
+            return False
+
+        # An agent walking a multi-hop MOVE takes its next hop without planning or an LLM call
+        route_result = action_resolver.follow_route(
+            agent.name, current_loc, world) if action_resolver else None
+
+        # 1. AGENT THINKING (Plan action)
+        self._say(f"  [Phase 1] {agent.name} Thinking...")
+        # Agent plans based on current world state. With batch planning, the next
+        # BATCH_PLANNING_SIZE agents are planned together in one request.
+        if self.batch_planner and not route_result and agent.name not in batched_intents:
+            batch = [other for other in upcoming_agents
+                     if world.agent_locations.get(other.name)
+                     and not world.get_agent_route(other.name)][:config.BATCH_PLANNING_SIZE]
+            batched_intents.update(self.batch_planner.plan_batch(batch, world))
+        if route_result:
+            intended_output = agent.adopt_intent(
+                f"continue to the {route_result['parameters']['route'][-1]}", world)
+            self._say(f"    [Route] {agent.name} follows its route: {route_result['parameters']['route']}")
+        elif agent.name in batched_intents:
+            intended_output = agent.adopt_intent(
+                batched_intents.pop(agent.name), world)
+        else:
+            intended_output = agent.plan(world)
+        if director_plan_future:
+            director.act(director_plan_future.result())
+
+        # Optional pause, as decided by the pacing policy
+        if self.pacing:
+            self.pacing.pause("plan")
+
+        # 2. ACTION RESOLUTION
+        self._say(f"  [Phase 2] Action Resolution for {agent.name}...")
+
+        if not action_resolver:
+            self._say(f"    [Sim Error]: Action resolver not available for {agent.name}. Skipping resolution.")
+            if self.narrate:
+                print("-" * 60)  # End agent turn block
+            return False
+
+        result = route_result or action_resolver.resolve(
+            agent.name, current_loc, intended_output, world
+        )
+
+        # 3. PROCESS RESULT, UPDATE WORLD, DISPATCH EVENT (IMMEDIATELY)
+        outcome_desc_for_event = ""
+        outcome_reason_for_event = ""
+
+        self.turns += 1
+        self.outcome_counts["success" if result and result.get(
+            "success") else "failure" if result else "error"] += 1
+
+        if result and result.get("success"):
+            outcome_desc = result.get(
+                'outcome_description', f"{agent.name} acted.")
+            outcome_reason = result.get('outcome_reason', '')
+
+            outcome_desc_for_event = outcome_desc  # Use this for the event
+            outcome_reason_for_event = outcome_reason  # Use this for the event
+
+            self._say(f"    [RESOLVER_SUCCESS] Action: {result.get('action_type', 'Unknown')}")
+            self._say(f"      Outcome: {outcome_desc} \n Reason: {outcome_reason}")
+            # Slightly more spacing for story mode
+            self._say(f"\n{outcome_desc}\n{outcome_reason}\n\n", 'story')
+
+            if result.get("world_state_updates"):
+                self._say(f"Applying world state updates for {agent.name}'s action...")
+                world.apply_state_updates(
+                    result["world_state_updates"], triggered_by=agent.name)
+                self._say("        Updates applied.")
+                if any(len(upd) >= 2 and upd[0] == 'agent_location' and upd[1] == agent.name for upd in result["world_state_updates"]):
+                    current_loc = world.agent_locations.get(
+                        agent.name, current_loc)
+
+        elif result:  # Failed Action
+            reason = result.get('reasoning', 'Unknown reason')
+            outcome_desc = result.get(
+                'outcome_description', 'Action failed.')
+            outcome_desc_for_event = f"{agent.name} attempt to {intended_output} failed: {outcome_desc}"
+
+            self._say(f"    [RESOLVER_FAILURE] Reason: {reason}")
+            self._say(f"      Outcome: {outcome_desc_for_event}")
+            # Add a newline before for better separation
+            self._say(f"\n{agent.name} tried to act, but {outcome_desc.lower()}", 'story')
+
+        else:  # Resolver Error
+            error_msg = f"System error resolving {agent.name}'s action for intent: {intended_output}."
+            outcome_desc_for_event = error_msg
+            self._say(f"    [RESOLVER_ERROR] Critical failure for {agent.name}.")
+            self._say(f"      Details: {error_msg}")
+            # Add a newline before for better separation
+            self._say(f"\n[System Note] Issue resolving {agent.name}'s action.", 'story')
+
+        # 3b. CREATE, LOG, AND DISPATCH EVENT (for success, failure, or error)
+        if outcome_desc_for_event:
+            event_scope = result.get(
+                'event_scope', 'action_outcome') if result else 'system_error'
+            event_radius = result.get('event_radius', 0) if result else 0
+
+            if outcome_reason_for_event:
+                outcome_desc_for_event += f" Because {outcome_reason_for_event}"
+
+            world.log_event(outcome_desc_for_event, event_scope,
+                            current_loc, agent.name if result else 'System', event_radius)
+            if self.narrate:
+                append_to_log_file(
+                    "simulation_logs.txt", f"""{agent.name}'s turn in {current_loc}:\n {outcome_desc_for_event}\n\n""")
+                append_to_log_file(
+                    "simulation_logs_with_director_logs.txt", f"""{agent.name}'s turn in {current_loc}:\n {outcome_desc_for_event}\n\n""")
+
+            #check if second word of outcome_desc_for_event is "tries"
+            desc_splited = outcome_desc_for_event.split()
+            if len(desc_splited) > 1 and desc_splited[1] == "tries" and desc_splited[2] == "to" and desc_splited[3] == "speak" and desc_splited[4] == "to":
+                outcome_desc_for_event+=" You must move to a different location in order to speak to that person."
+
+            new_event = Event(
+                description=outcome_desc_for_event,
+                location=current_loc,
+                scope=event_scope,
+                step=world.current_step,
+                triggered_by=agent.name if result else 'System',
+                radius=event_radius
+            )
+            if self.event_queue:
+                self.event_queue.put(new_event, result.get('action_type') if result else None)
+            else:
+                self.event_dispatcher.dispatch_event(
+                    new_event, world.registered_agents, world.agent_locations
+                )
+            director.perceive(new_event)  # Director perceives the event
+        if self.event_queue and config.EVENT_QUEUE_FLUSH == "turn":
+            self.event_queue.flush()
+
+        self._say("-" * 60)  # End agent turn block
+
+        if self.pacing:
+            self.pacing.pause("turn")
+        return True
@@ -1,49 +1,86 @@
 # src/world.py
-from typing import Dict, List, Any  # Added List and Any
+from typing import Callable, Deque, Dict, List, Any, Optional, Set, Tuple, Union  # Added List and Any
 import config
-from collections import namedtuple
+from collections import deque
 from agent.agent import Agent
-
-# Define a structure for events for clarity
-Event = namedtuple(
-    "Event", ["description", "location", "scope", "step", "triggered_by"]
-)
+from event_store import ColumnarEventStore, Event, EventStore  # Event is defined with the stores
+from location_graph import LocationGraph
+from scenario import Item, Location, Scenario, compile_items, compile_scenario, copy_properties
 
 
 class WorldState:
     # Modified signature
-    def __init__(self, known_locations_data: Dict[str, Dict[str, Any]]):
+    def __init__(self, known_locations_data: Union[Dict[str, Dict[str, Any]], Scenario],
+                 event_store: Optional[EventStore] = None,
+                 event_columns: Optional[ColumnarEventStore] = None):
         # agent_name -> location_name
         self.agent_locations: Dict[str, str] = {}
-
-        self.location_descriptions: Dict[str, str] = {}
-        self.location_connectivity: Dict[str, List[str]] = {}
-        self.location_properties: Dict[str, Dict[str, Any]] = {}
-
-        for loc_name, loc_data in known_locations_data.items():
-            self.location_descriptions[loc_name] = loc_data.get(
-                "description", "An undescribed location.")
-            self.location_connectivity[loc_name] = loc_data.get("exits_to", [])
-
-            # Initialize properties, ensuring "contains" (for items) exists
-            props = loc_data.get("properties", {})
-            if "contains" not in props:
-                # Ensure 'contains' for items is always a list
-                props["contains"] = []
-            self.location_properties[loc_name] = props
+        # Reverse index: location_name -> agents there, kept in sync by add_agent_to_location
+        # and unregister_agent so get_agents_at does not scan every agent.
+        self.agents_by_location: Dict[str, Dict[str, None]] = {}
+        # agent_name -> order of first placement, so get_agents_at lists agents in that order
+        self._agent_order: Dict[str, int] = {}
+        # Called as listener(agent_name, old_location, new_location) after every placement,
+        # move or removal (new_location None), e.g. by SubscriptionEventDispatcher
+        self.movement_listeners: List[Callable[[str, Optional[str], Optional[str]], None]] = []
+
+        # The scenario is validated and compiled once (scenario.py, raises ValueError); a
+        # compiled Scenario can also be passed in. Location records never change during a run.
+        self.scenario = known_locations_data if isinstance(
+            known_locations_data, Scenario) else compile_scenario(known_locations_data)
+        # location_name -> Location record (description and exits)
+        self.locations: Dict[str, Location] = self.scenario.by_name
+        # Mutable per world: each location's "contains" is a list of scenario.Item records
+        self.location_properties: Dict[str, Dict[str, Any]] = self.scenario.new_properties()
+        # Item index: location_name -> normalized object name -> the Item held in that
+        # location's "contains" list (the list stays the ordered view used for prompts).
+        self.items_by_location: Dict[str, Dict[str, Item]] = {}
+        # (location_name, normalized object name) -> (linked location, linked Item),
+        # resolved from the items' "linked_to" entries when the items are indexed.
+        self.item_links: Dict[Tuple[str, str], Tuple[str, Item]] = {}
+
+        for loc_name in self.locations:
+            self.agents_by_location[loc_name] = {}
+            self._index_items(loc_name)
+        self._resolve_item_links()
+        # Exits compiled for local path finding (multi-hop MOVE, reachability checks)
+        self.location_graph = LocationGraph(self.scenario)
+        # agent_name -> locations still to walk through on a multi-hop MOVE, next hop first
+        self.agent_routes: Dict[str, Tuple[str, ...]] = {}
 
         if config.SIMULATION_MODE == 'debug':
             print(
-                f"[World Init] Locations initialized: {list(self.location_descriptions.keys())}")
-            print(f"[World Init] Connectivity: {self.location_connectivity}")
+                f"[World Init] Locations initialized: {list(self.locations)}")
+            print(f"[World Init] Connectivity: "
+                  f"{ {name: location.exit_names() for name, location in self.locations.items()} }")
             print(f"[World Init] Properties: {self.location_properties}")
 
         self.global_context: Dict[str, Any] = {"weather": "Clear"}
-        self.event_log: List[Event] = []  # Now stores Event tuples
+        # Recent events only: a ring buffer, the oldest event drops off when full.
+        # The full history goes to the optional append-only event_store (event_store.EventStore).
+        self.event_log: Deque[Event] = deque(maxlen=config.MAX_RECENT_EVENTS * 2)
+        self.event_store = event_store
+        # Optional queryable columnar copy of the history (event_store.ColumnarEventStore)
+        self.event_columns = event_columns
         self.current_step: int = 0  # Track simulation step
 
         self.registered_agents: Dict[str, Agent] = {}
 
+        # Rendered context fragments: location_name -> {"location", "exits", "agents", "items"}.
+        # A fragment is dropped by the mutation that changes it and rebuilt on next use.
+        self._context_fragments: Dict[str, Dict[str, Any]] = {}
+        self.context_cache_hits = 0
+        self.context_cache_misses = 0
+        self.context_cache_invalidations = 0
+
+        # Copy-on-write bookkeeping for fork(): locations whose properties/items, and
+        # locations whose agent sets, are still shared with a parent or child world.
+        self._shared_locations: Set[str] = set()
+        self._shared_agent_sets: Set[str] = set()
+
+    def add_movement_listener(self, listener: Callable[[str, Optional[str], Optional[str]], None]):
+        self.movement_listeners.append(listener)
+
     def register_agent(self, agent: Agent):
         """Registers an agent to receive events."""
         if agent.name not in self.registered_agents:
@@ -53,18 +90,189 @@ class WorldState:
                     f"[World Event Update]: Registered {agent.name} for events.")
 
     def unregister_agent(self, agent_name: str):
-        """Unregisters an agent."""
+        """Unregisters an agent and removes it from its location."""
         if agent_name in self.registered_agents:
             del self.registered_agents[agent_name]
             if config.SIMULATION_MODE == 'debug':  # Added debug print
                 print(f"[World Event Update]: Unregistered {agent_name}.")
+        self.agent_routes.pop(agent_name, None)
+        location = self.agent_locations.pop(agent_name, None)
+        if location is not None:
+            self._own_agent_set(location)
+            self.agents_by_location.get(location, {}).pop(agent_name, None)
+            self._invalidate_context(location, "agents")
+            for listener in self.movement_listeners:
+                listener(agent_name, location, None)
 
     def advance_step(self):
         self.current_step += 1
 
+    def get_state(self) -> Dict[str, Any]:
+        """
+        Returns the mutable world state as plain data (for checkpoints). The values are
+        the live objects, not copies: serialize the result before the world changes.
+        Indexes and caches are not included; set_state() rebuilds them. Descriptions
+        and exits come from the scenario and are not included either.
+        """
+        return {
+            "current_step": self.current_step,
+            "agent_locations": self.agent_locations,
+            "agent_order": self._agent_order,
+            "location_properties": self.location_properties,
+            "global_context": self.global_context,
+            "event_log": list(self.event_log),
+            "agent_routes": self.agent_routes,
+        }
+
+    def set_state(self, state: Dict[str, Any]):
+        """Restores a state saved by get_state() and rebuilds the derived indexes."""
+        self.current_step = state["current_step"]
+        self.agent_locations = dict(state["agent_locations"])
+        self._agent_order = dict(state["agent_order"])
+        self.location_properties = state["location_properties"]
+        self.global_context = state["global_context"]
+        self.event_log = deque(state["event_log"], maxlen=self.event_log.maxlen)
+        self.agent_routes = dict(state.get("agent_routes", {}))
+
+        self.agents_by_location = {loc_name: {} for loc_name in self.locations}
+        for agent_name in sorted(self.agent_locations, key=self._agent_order.__getitem__):
+            self.agents_by_location.setdefault(self.agent_locations[agent_name], {})[agent_name] = None
+            for listener in self.movement_listeners:
+                listener(agent_name, None, self.agent_locations[agent_name])
+        self.items_by_location = {}
+        for loc_name in self.location_properties:
+            self._index_items(loc_name)
+        self._resolve_item_links()
+        self._context_fragments = {}
+        self._shared_locations = set()
+        self._shared_agent_sets = set()
+
+    def fork(self, event_columns: Optional[ColumnarEventStore] = None) -> "WorldState":
+        """
+        Returns a copy-on-write branch of this world for what-if runs. Both worlds keep
+        sharing a location's properties, items and agent set until one of them changes
+        it; only then does that side copy that one location. A fork costs one pointer per
+        location and agent, plus a copy of each location the branch (or parent) changes.
+        Registered agents are not carried over: register the branch's own agents.
+        """
+        branch = WorldState.__new__(WorldState)
+        branch.agent_locations = dict(self.agent_locations)
+        branch._agent_order = dict(self._agent_order)
+        branch.agents_by_location = dict(self.agents_by_location)
+        # Location records are never changed after load; shared outright
+        branch.scenario = self.scenario
+        branch.locations = self.locations
+        branch.location_graph = self.location_graph
+        branch.agent_routes = dict(self.agent_routes)
+        branch.location_properties = dict(self.location_properties)
+        branch.items_by_location = dict(self.items_by_location)
+        branch.item_links = dict(self.item_links)
+        branch.global_context = dict(self.global_context)
+        branch.event_log = deque(self.event_log, maxlen=self.event_log.maxlen)
+        # The on-disk history belongs to the parent run; a branch only records its own events
+        branch.event_store = None
+        branch.event_columns = event_columns
+        branch.current_step = self.current_step
+        branch.registered_agents = {}
+        branch.movement_listeners = []  # a branch's dispatcher attaches itself (see BaseEventDispatcher.fork)
+        branch._context_fragments = {}
+        branch.context_cache_hits = 0
+        branch.context_cache_misses = 0
+        branch.context_cache_invalidations = 0
+
+        self._shared_locations.update(self.location_properties)
+        self._shared_agent_sets.update(self.agents_by_location)
+        branch._shared_locations = set(self.location_properties)
+        branch._shared_agent_sets = set(self.agents_by_location)
+        return branch
+
+    def _own_location(self, location: str):
+        """Copies a location's properties and items before this world changes them, if still shared."""
+        if location not in self._shared_locations:
+            return
+        self._shared_locations.discard(location)
+        # Items are copied record by record; other properties are replaced, never changed in place
+        self.location_properties[location] = copy_properties(self.location_properties[location])
+        self._index_items(location)
+        # Links out of and into this location still point at the shared Item records
+        for link in [link for link, (linked_loc_name, _) in self.item_links.items()
+                     if link[0] == location or linked_loc_name == location]:
+            self._link_item(link[0], link[1], self.items_by_location[link[0]][link[1]])
+
+    def _own_agent_set(self, location: str):
+        """Copies a location's agent set before this world changes it, if still shared."""
+        if location in self._shared_agent_sets:
+            self._shared_agent_sets.discard(location)
+            self.agents_by_location[location] = dict(self.agents_by_location[location])
+
+    def shared_location_count(self) -> int:
+        """Number of locations whose properties are still shared with a fork (0 without forks)."""
+        return len(self._shared_locations)
+
     def get_reachable_locations(self, from_location: str) -> List[str]:
         """Returns list of locations directly reachable from the given one."""
-        return self.location_connectivity.get(from_location, [])
+        location = self.locations.get(from_location)
+        return location.exit_names() if location is not None else []
+
+    def find_path(self, from_location: str, to_location: str) -> Optional[List[str]]:
+        """Shortest route between two locations (both included), or None if unreachable."""
+        return self.location_graph.shortest_path(from_location, to_location)
+
+    def get_agent_route(self, agent_name: str) -> Tuple[str, ...]:
+        """Locations an agent still has to walk through on a multi-hop MOVE (empty if none)."""
+        return self.agent_routes.get(agent_name, ())
+
+    def set_agent_route(self, agent_name: str, hops: List[str]):
+        """Sets (or with no hops, clears) the rest of an agent's multi-hop MOVE."""
+        if hops:
+            self.agent_routes[agent_name] = tuple(hops)
+        else:
+            self.agent_routes.pop(agent_name, None)
+
+    @staticmethod
+    def item_key(item_name: Any) -> str:
+        """Normalized object name used as the item index key."""
+        return str(item_name).strip().lower()
+
+    def _index_items(self, location: str):
+        """Rebuilds the item index of a location from its "contains" list."""
+        index: Dict[str, Item] = {}
+        for item_data in self.location_properties.get(location, {}).get("contains", ()):
+            # First entry wins, as the previous linear scans did
+            index.setdefault(self.item_key(item_data.object), item_data)
+        self.items_by_location[location] = index
+
+    def _resolve_item_links(self):
+        """Resolves every item's "linked_to" pointer to the linked Item."""
+        self.item_links = {}
+        for loc_name, index in self.items_by_location.items():
+            for key, item_data in index.items():
+                self._link_item(loc_name, key, item_data)
+
+    def _link_item(self, loc_name: str, key: str, item_data: Item):
+        """Resolves one item's "linked_to" pointer (validated at load) into item_links."""
+        linked_to_info = item_data.linked_to
+        if linked_to_info is None:
+            self.item_links.pop((loc_name, key), None)
+            return
+        linked_loc_name = linked_to_info["location"]
+        linked_item = self.get_item(linked_loc_name, linked_to_info["object_key"])
+        if linked_item is not None:
+            self.item_links[(loc_name, key)] = (linked_loc_name, linked_item)
+        else:
+            self.item_links.pop((loc_name, key), None)
+            if config.SIMULATION_MODE == 'debug':
+                print(
+                    f"[World State Warning]: Linked item '{linked_to_info['object_key']}' in '{linked_loc_name}' "
+                    f"(linked from '{item_data.get('object')}' in '{loc_name}') not found in 'contains' list.")
+
+    def get_item(self, location: str, item_name: str) -> Optional[Item]:
+        """O(1) lookup of an Item by object name (case and surrounding spaces ignored)."""
+        return self.items_by_location.get(location, {}).get(self.item_key(item_name))
+
+    def get_linked_item(self, location: str, item_name: str) -> Optional[Tuple[str, Item]]:
+        """Returns (linked location, linked Item) for an item with a resolved link, else None."""
+        return self.item_links.get((location, self.item_key(item_name)))
 
     def get_location_property(self, location: str, prop_name: str) -> Any:
         """Safely gets a property of a location."""
@@ -89,23 +297,45 @@ class WorldState:
                 f"[World State Info]: Property '{prop_name}' doesn't exist for '{location}'. Adding it."
             )
 
+        if prop_name == "contains":
+            value = compile_items(value, location)  # validated like the scenario's items (ValueError)
         old_value = self.location_properties[location].get(
             prop_name)  # Simpler get
         if old_value != value:
+            self._own_location(location)
             self.location_properties[location][prop_name] = value
+            if prop_name == "contains":
+                # The item list was replaced wholesale: reindex it and re-resolve links into it
+                self._index_items(location)
+                self._resolve_item_links()
+                self._invalidate_context(location, "items")
             if config.SIMULATION_MODE == 'debug':  # Added debug print
                 print(
                     f"[World State Update]: Property '{prop_name}' of '{location}' changed from '{old_value}' to '{value}' (Trigger: {triggered_by})."
                 )
-            
+
             return True
         return False
 
     def add_agent_to_location(self, agent_name: str, location_name: str, triggered_by: str = "Setup"):
         """Adds agent to a location. Agent presence is tracked in self.agent_locations."""
-        if location_name in self.location_descriptions:
+        if location_name in self.locations:
             old_location = self.agent_locations.get(agent_name)
             self.agent_locations[agent_name] = location_name
+            route = self.agent_routes.get(agent_name)
+            if route:
+                # Taking the next hop shortens the route; any other move abandons it
+                self.set_agent_route(agent_name, list(route[1:]) if route[0] == location_name else [])
+            if old_location is not None:
+                self._own_agent_set(old_location)
+                self.agents_by_location[old_location].pop(agent_name, None)
+                self._invalidate_context(old_location, "agents")
+            self._own_agent_set(location_name)
+            self.agents_by_location[location_name][agent_name] = None
+            self._invalidate_context(location_name, "agents")
+            self._agent_order.setdefault(agent_name, len(self._agent_order))
+            for listener in self.movement_listeners:
+                listener(agent_name, old_location, location_name)
 
             if config.SIMULATION_MODE == 'debug':  # Added debug print
                 print(
@@ -145,14 +375,17 @@ class WorldState:
             )
 
     def get_agents_at(self, location_name: str) -> List[str]:
-        if location_name not in self.location_descriptions:
+        if location_name not in self.locations:
             if config.SIMULATION_MODE == 'debug':
                 print(
                     f"[World State Warning]: Tried to get agents at unknown location '{location_name}'")
             return []
-        return [
-            name for name, loc in self.agent_locations.items() if loc == location_name
-        ]
+        # Same order as the agents were first placed in the world
+        return sorted(self.agents_by_location[location_name], key=self._agent_order.__getitem__)
+
+    def is_agent_at(self, agent_name: str, location_name: str) -> bool:
+        """O(1) presence check through the reverse index."""
+        return agent_name in self.agents_by_location.get(location_name, ())
 
     def log_event(
         self,
@@ -160,6 +393,7 @@ class WorldState:
         scope: str = "local",
         location: str = None,
         triggered_by: str = "Simulation",
+        radius: int = 0,
         # dispatch parameter removed, dispatching is handled by main loop calling dispatcher
     ):
         """Logs an event to the world's event log."""
@@ -169,17 +403,19 @@ class WorldState:
             scope=scope,
             step=self.current_step,
             triggered_by=triggered_by,
+            radius=radius,
         )
         self.event_log.append(new_event)
+        if self.event_store is not None:
+            self.event_store.append(new_event)
+        if self.event_columns is not None:
+            self.event_columns.append(new_event)
 
         # Optional detailed logging for debug mode
         if config.SIMULATION_MODE == "debug":
             log_prefix = f"[Event Logged S{self.current_step}][{triggered_by} @ {location or 'Global'}/{scope}]"
             print(f"{log_prefix}: {description}")
 
-        if len(self.event_log) > config.MAX_RECENT_EVENTS * 2:
-            self.event_log.pop(0)
-
     def set_weather(self, new_weather: str, triggered_by: str = "Simulation") -> bool:
         """Changes the weather and logs the event."""
         old_weather = self.global_context.get("weather", "unknown")
@@ -197,6 +433,74 @@ class WorldState:
             return True
         return False
 
+    def _invalidate_context(self, location: str, fragment: str):
+        """Drops one cached context fragment of a location after a mutation that changes it."""
+        fragments = self._context_fragments.get(location)
+        if fragments is not None and fragments.pop(fragment, None) is not None:
+            self.context_cache_invalidations += 1
+
+    def _context_fragment(self, location: str, fragment: str) -> Any:
+        """Returns a rendered context fragment for a location, rebuilding it if it is not cached."""
+        if not getattr(config, 'WORLD_CONTEXT_CACHE_ENABLED', True):
+            return self._render_context_fragment(location, fragment)
+        fragments = self._context_fragments.setdefault(location, {})
+        if fragment in fragments:
+            self.context_cache_hits += 1
+            return fragments[fragment]
+        self.context_cache_misses += 1
+        value = fragments[fragment] = self._render_context_fragment(location, fragment)
+        return value
+
+    def _render_context_fragment(self, location: str, fragment: str) -> Any:
+        if fragment == "location":
+            # The core description comes directly from the location definition
+            location_record = self.locations.get(location)
+            location_description = location_record.description if location_record else 'An unknown place'
+            return f"Current Location: {location} ({location_description}).\n"
+        if fragment == "exits":
+            exits = self.get_reachable_locations(location)
+            return f"Visible Exits: {', '.join(exits) if exits else 'None apparent'}.\n"
+        if fragment == "agents":
+            # Tuple, so a cached fragment cannot be changed by a caller
+            return tuple(self.get_agents_at(location))
+        if fragment == "items":
+            return self._render_items(location)
+        raise ValueError(f"Unknown context fragment '{fragment}'")
+
+    def _render_items(self, location: str) -> str:
+        """Renders the items/objects block of a location (from location_properties["contains"])."""
+        item_descriptions = []
+        # Items are validated Item records (scenario.py): object name and state are always set
+        for item_data in self.location_properties.get(location, {}).get("contains", ()):
+            obj_desc = item_data.optional_description  # Optional
+            # Start with description + name or just name
+            if obj_desc:
+                # e.g., "a sturdy wooden door (Shelter Door)"
+                desc_str = f"{obj_desc} ({item_data.object})"
+            else:
+                # e.g., "chair"
+                desc_str = item_data.object
+            # Add the state clearly
+            # e.g., " - currently locked", " - currently occupied by Alice"
+            item_descriptions.append(f"{desc_str} - currently {item_data.state}")
+
+        if item_descriptions:
+            context = "Items and features you observe:\n"
+            for item_desc in item_descriptions:
+                context += f"- {item_desc}\n"
+            return context
+        # Refined message when no specific items are listed
+        return "There are no specific items demanding attention right now.\n"
+
+    def context_cache_stats(self) -> Dict[str, Any]:
+        lookups = self.context_cache_hits + self.context_cache_misses
+        return {
+            "hits": self.context_cache_hits,
+            "misses": self.context_cache_misses,
+            "hit_ratio": round(self.context_cache_hits / lookups, 3) if lookups else 0.0,
+            "invalidations": self.context_cache_invalidations,
+        }
+
     def get_static_context_for_agent(self, agent_name: str) -> str:
         """Provides minimal, relatively static context for an agent, focusing on items and their states."""
         location = self.agent_locations.get(agent_name)
@@ -204,68 +508,24 @@ class WorldState:
             return f"{agent_name} is lost and disoriented."
 
         # --- Basic Info & Main Description ---
-        # The core description comes directly from the location definition
-        location_description = self.location_descriptions.get(
-            location, 'An unknown place')
-        context = f"Current Location: {location} ({location_description}).\n"
+        context = self._context_fragment(location, "location")
 
         # --- Environmental Context ---
+        # Weather is global and changes rarely; it is read live rather than cached per location.
         context += f"Current Weather: {self.global_context.get('weather', 'Indeterminate')}.\n"
-        exits = self.get_reachable_locations(location)
-        context += f"Visible Exits: {', '.join(exits) if exits else 'None apparent'}.\n"
+        context += self._context_fragment(location, "exits")
 
         # --- Other Agents ---
         other_agents = [
-            name for name in self.get_agents_at(location) if name != agent_name
+            name for name in self._context_fragment(location, "agents") if name != agent_name
         ]
         if other_agents:
             context += f"Agents in range for interaction({agent_name} cannot interact with agents not mentioned here): {', '.join(other_agents)}.\n"
         else:
             context += f"{agent_name} is alone here and cannot interact with any other agent.\n"
 
-        # --- Items/Objects and their State (from location_properties["contains"]) ---
-        location_props = self.location_properties.get(location, {})
-        items_list = location_props.get("contains", [])
-        item_descriptions = []
-
-        if isinstance(items_list, list):  # Ensure it's a list
-            for item_data in items_list:
-                if isinstance(item_data, dict):  # Ensure each item is a dict
-                    obj_name = item_data.get("object")
-                    obj_state = item_data.get("state")
-                    obj_desc = item_data.get(
-                        "optional_description")  # Optional
-
-                    if obj_name and obj_state is not None:  # Require object name and state
-                        desc_str = ""
-                        # Start with description + name or just name
-                        if obj_desc:
-                            # e.g., "a sturdy wooden door (Shelter Door)"
-                            desc_str += f"{obj_desc} ({obj_name})"
-                        else:
-                            # e.g., "chair"
-                            desc_str += f"{obj_name}"
-
-                        # Add the state clearly
-                        # e.g., " - currently locked", " - currently occupied by Alice"
-                        desc_str += f" - currently {obj_state}"
-                        item_descriptions.append(desc_str)
-                    else:
-                        if config.SIMULATION_MODE == 'debug':
-                            print(
-                                f"[World Context Warning] Item in '{location}' missing 'object' or 'state': {item_data}")
-                else:
-                    if config.SIMULATION_MODE == 'debug':
-                        print(
-                            f"[World Context Warning] Item in '{location}' is not a dictionary: {item_data}")
-
-        if item_descriptions:
-            context += "Items and features you observe:\n"
-            for item_desc in item_descriptions:
-                context += f"- {item_desc}\n"
-        else:
-            # Refined message when no specific items are listed
-            context += "There are no specific items demanding attention right now.\n"
+        # --- Items/Objects and their State ---
+        context += self._context_fragment(location, "items")
 
         return context.strip()
 
@@ -275,17 +535,17 @@ class WorldState:
         state += f"Global Context: {self.global_context}\n"
         state += f"Agent Locations: {self.agent_locations}\n"
         state += "Location Details:\n"
-        for loc_name in self.location_descriptions:
+        for loc_name, location in self.locations.items():
             state += f"  - {loc_name}:\n"
-            state += f"    Description: {self.location_descriptions.get(loc_name, 'N/A')}\n"
-            state += f"    Exits: {self.location_connectivity.get(loc_name, [])}\n"
+            state += f"    Description: {location.description}\n"
+            state += f"    Exits: {location.exit_names()}\n"
             state += f"    Properties: {self.location_properties.get(loc_name, {})}\n"
             state += f"    Agents Here: {self.get_agents_at(loc_name)}\n"
 
         # Clarified
         state += f"Registered Agents for Events: {list(self.registered_agents.keys())}\n"
         state += f"Event Log ({len(self.event_log)} total, showing last {config.MAX_RECENT_EVENTS}):\n"
-        display_events = self.event_log[-config.MAX_RECENT_EVENTS:]
+        display_events = list(self.event_log)[-config.MAX_RECENT_EVENTS:]
         for event in display_events:  # Corrected variable name
             state += f"  - St{event.step} [{event.triggered_by}@{event.location or 'Global'}/{event.scope}] {event.description}\n"
         return state + "-------------------"
@@ -327,6 +587,9 @@ class WorldState:
                         print(
                             f"[World State Apply Error]: Invalid format for location_property update: {update_tuple}"
                         )
+                elif update_type == "agent_route":
+                    # ('agent_route', agent_name, [remaining hops]) after the first hop of a multi-hop MOVE
+                    self.set_agent_route(target_name, update_tuple[2])
                 # Add more update types here (e.g., add_item_to_location, remove_item_from_location)
                 
                 elif update_type == "item_state":
@@ -339,88 +602,65 @@ class WorldState:
                         # New state for the primary item (and linked item)
                         new_item_state = update_tuple[3]
 
-                        items_in_location = self.get_location_property(
-                            location_name, "contains")
-                        # item_actually_updated flag removed as linked logic is now inside the state change block
-                        original_item_found = False
-
-                        if isinstance(items_in_location, list):
-                            for item_data in items_in_location:  # item_data is for the primary item
-                                if isinstance(item_data, dict) and item_data.get("object") == item_name_to_update:
-                                    original_item_found = True
-                                    old_state = item_data.get("state")
-                                    if old_state != new_item_state:
-                                        # Directly update the primary item's state
-                                        item_data["state"] = new_item_state
-
-                                        if config.SIMULATION_MODE == 'debug':
-                                            print(
-                                                f"[World State Update]: Item '{item_name_to_update}' in '{location_name}' state changed from '{old_state}' to '{new_item_state}' (Trigger: {triggered_by})."
-                                            )
-                                        # Log a specific event for the primary item state change
-                                        self.log_event(
-                                            description=f"The state of {item_name_to_update} (in {location_name}) is now '{new_item_state}'.",
-                                            scope="local",
-                                            location=location_name,
-                                            triggered_by=triggered_by
-                                        )
-
-                                        # --- START: Handle Linked Objects ---
-                                        linked_to_info = item_data.get(
-                                            "linked_to")
-                                        if isinstance(linked_to_info, dict) and "location" in linked_to_info and "object_key" in linked_to_info:
-                                            linked_loc_name = linked_to_info["location"]
-                                            # Key of the item in the other location
-                                            linked_obj_key = linked_to_info["object_key"]
-
-                                            linked_location_items = self.get_location_property(
-                                                linked_loc_name, "contains")
-                                            if isinstance(linked_location_items, list):
-                                                for linked_item_data in linked_location_items:
-                                                    if isinstance(linked_item_data, dict) and linked_item_data.get("object") == linked_obj_key:
-                                                        old_linked_state = linked_item_data.get(
-                                                            "state")
-                                                        if old_linked_state != new_item_state:  # Propagate the new state
-                                                            linked_item_data["state"] = new_item_state
-                                                            if config.SIMULATION_MODE == 'debug':
-                                                                print(
-                                                                    f"[World State Update - Linked]: Item '{linked_obj_key}' in '{linked_loc_name}' state "
-                                                                    f"changed from '{old_linked_state}' to '{new_item_state}' "
-                                                                    f"(due to link from '{item_name_to_update}' in '{location_name}' by {triggered_by})."
-                                                                )
-                                                            # Log an event for the linked item's change so agents there can perceive it
-                                                            self.log_event(
-                                                                description=f"The {linked_obj_key} is now '{new_item_state}', as it's linked to an item affected by {triggered_by}'s action.",
-                                                                scope="local",
-                                                                location=linked_loc_name,
-                                                                triggered_by="SystemLink"  # Special trigger for system-driven linked changes
-                                                            )
-                                                        break  # Found and processed the linked item
-                                                else:  # Inner loop's else: if linked item not found in linked_location_items
-                                                    if config.SIMULATION_MODE == 'debug':
-                                                        print(
-                                                            f"[World State Apply Warning]: Linked item '{linked_obj_key}' in '{linked_loc_name}' "
-                                                            f"(linked from '{item_name_to_update}' in '{location_name}') not found in 'contains' list."
-                                                        )
-                                            else:  # linked_location_items is not a list
-                                                if config.SIMULATION_MODE == 'debug':
-                                                    print(
-                                                        f"[World State Apply Error]: 'contains' property for linked location '{linked_loc_name}' "
-                                                        "is not a list or is missing when trying to update linked item state."
-                                                    )
-                                        # --- END: Handle Linked Objects ---
-                                    else:  # old_state == new_item_state
-                                        if config.SIMULATION_MODE == 'debug':
-                                            print(
-                                                f"[World State Info]: Item '{item_name_to_update}' in '{location_name}' state is already '{new_item_state}'. No change made.")
-                                    break  # Primary item found and processed.
-
-                            if not original_item_found:
+                        item_data = self.get_item(location_name, item_name_to_update)
+                        if item_data is None:
+                            if location_name not in self.location_properties:
+                                print(
+                                    f"[World State Apply Error]: Location '{location_name}' not found when trying to update item state.")
+                            else:
                                 print(
                                     f"[World State Apply Warning]: Could not update item '{item_name_to_update}' in '{location_name}'. Item not found in 'contains' list during update attempt.")
-                        else:  # items_in_location is not a list
-                            print(
-                                f"[World State Apply Error]: 'contains' property for '{location_name}' is not a list or is missing when trying to update item state.")
+                            continue
+
+                        old_state = item_data.get("state")
+                        if old_state != new_item_state:
+                            # Directly update the primary item's state (on this world's own copy)
+                            self._own_location(location_name)
+                            item_data = self.get_item(location_name, item_name_to_update)
+                            item_data["state"] = new_item_state
+                            self._invalidate_context(location_name, "items")
+
+                            if config.SIMULATION_MODE == 'debug':
+                                print(
+                                    f"[World State Update]: Item '{item_name_to_update}' in '{location_name}' state changed from '{old_state}' to '{new_item_state}' (Trigger: {triggered_by})."
+                                )
+                            # Log a specific event for the primary item state change
+                            self.log_event(
+                                description=f"The state of {item_name_to_update} (in {location_name}) is now '{new_item_state}'.",
+                                scope="local",
+                                location=location_name,
+                                triggered_by=triggered_by
+                            )
+
+                            # --- START: Handle Linked Objects (pointer resolved at load time) ---
+                            linked = self.get_linked_item(location_name, item_name_to_update)
+                            if linked is not None:
+                                self._own_location(linked[0])
+                                linked_loc_name, linked_item_data = self.get_linked_item(
+                                    location_name, item_name_to_update)
+                                linked_obj_key = linked_item_data.get("object")
+                                old_linked_state = linked_item_data.get("state")
+                                if old_linked_state != new_item_state:  # Propagate the new state
+                                    linked_item_data["state"] = new_item_state
+                                    self._invalidate_context(linked_loc_name, "items")
+                                    if config.SIMULATION_MODE == 'debug':
+                                        print(
+                                            f"[World State Update - Linked]: Item '{linked_obj_key}' in '{linked_loc_name}' state "
+                                            f"changed from '{old_linked_state}' to '{new_item_state}' "
+                                            f"(due to link from '{item_name_to_update}' in '{location_name}' by {triggered_by})."
+                                        )
+                                    # Log an event for the linked item's change so agents there can perceive it
+                                    self.log_event(
+                                        description=f"The {linked_obj_key} is now '{new_item_state}', as it's linked to an item affected by {triggered_by}'s action.",
+                                        scope="local",
+                                        location=linked_loc_name,
+                                        triggered_by="SystemLink"  # Special trigger for system-driven linked changes
+                                    )
+                            # --- END: Handle Linked Objects ---
+                        else:  # old_state == new_item_state
+                            if config.SIMULATION_MODE == 'debug':
+                                print(
+                                    f"[World State Info]: Item '{item_name_to_update}' in '{location_name}' state is already '{new_item_state}'. No change made.")
                     else:  # len(update_tuple) != 4
                         print(
                             f"[World State Apply Error]: Invalid format for item_state update: {update_tuple}"
@@ -445,27 +685,20 @@ class WorldState:
                 print(
                     f"[WorldState Error] Add Item: Location '{location_name}' not found.")
             return False
-
-        # Ensure 'contains' is a list
-        if "contains" not in self.location_properties[location_name] or not isinstance(self.location_properties[location_name]["contains"], list):
-            self.location_properties[location_name]["contains"] = []
+        self._own_location(location_name)
 
         # Check if item already exists (by name) to avoid duplicates, or decide policy
-        for item_data in self.location_properties[location_name]["contains"]:
-            if isinstance(item_data, dict) and item_data.get("object") == item_name:
-                if config.SIMULATION_MODE == 'debug':
-                    print(
-                        f"[WorldState Info] Add Item: Item '{item_name}' already exists in '{location_name}'. Not adding again.")
-                # Optionally, update existing item's state/desc here, or just return False
-                return False  # For now, don't add if name exists
-
-        new_item = {
-            "object": item_name,
-            "state": item_state,
-            "optional_description": item_description
-            # "linked_to": {} # Could be added if director specifies linkage
-        }
-        self.location_properties[location_name]["contains"].append(new_item)
+        if self.get_item(location_name, item_name) is not None:
+            if config.SIMULATION_MODE == 'debug':
+                print(
+                    f"[WorldState Info] Add Item: Item '{item_name}' already exists in '{location_name}'. Not adding again.")
+            # Optionally, update existing item's state/desc here, or just return False
+            return False  # For now, don't add if name exists
+
+        new_item = Item(item_name, item_state, item_description)  # linked_to could be added if the Director specified a linkage
+        self.location_properties[location_name].setdefault("contains", []).append(new_item)
+        self.items_by_location.setdefault(location_name, {})[self.item_key(item_name)] = new_item
+        self._invalidate_context(location_name, "items")
 
         # log_msg = f"{triggered_by} causes '{item_name}' (described as: {item_description}, state: {item_state}) to appear in {location_name}."
         # self.log_event(
@@ -486,52 +719,40 @@ class WorldState:
                     f"[WorldState Error] Modify Item State: Location '{location_name}' not found.")
             return False
 
-        items_in_location = self.get_location_property(
-            location_name, "contains")
-        if not isinstance(items_in_location, list):
-            if config.SIMULATION_MODE == 'debug':
-                print(
-                    f"[WorldState Error] Modify Item State: 'contains' for '{location_name}' is not a list.")
-            return False
-
-        item_found_and_updated = False
-        for item_data in items_in_location:
-            if isinstance(item_data, dict) and item_data.get("object") == item_name:
-                old_state = item_data.get("state")
-                if old_state != new_state:
-                    item_data["state"] = new_state
-                    item_found_and_updated = True  # Mark as updated
-
-                    log_msg = f"The state of '{item_name}' in {location_name} changes from '{old_state}' to '{new_state}' (due to {triggered_by})."
-                    self.log_event(
-                        description=log_msg,
-                        scope="local",
-                        location=location_name,
-                        triggered_by=triggered_by
-                    )
-                    if config.SIMULATION_MODE == 'debug':
-                        print(
-                            f"[WorldState Update] Modify Item State: '{item_name}' in '{location_name}' changed to '{new_state}' by {triggered_by}.")
-
-                    # --- Handle Linked Objects (copied and adapted from apply_state_updates) ---
-                    linked_to_info = item_data.get("linked_to")
-                    if isinstance(linked_to_info, dict) and "location" in linked_to_info and "object_key" in linked_to_info:
-                        linked_loc_name = linked_to_info["location"]
-                        linked_obj_key = linked_to_info["object_key"]
-                        # Recursively call or directly implement linked update logic here
-                        # For simplicity, let's assume modify_item_state can be called for the linked item
-                        # This might need careful handling to avoid infinite loops if links are bidirectional AND state changes trigger more state changes.
-                        # However, here the trigger is external (Director), so it should be fine.
-                        self.modify_item_state(
-                            linked_loc_name, linked_obj_key, new_state, triggered_by=f"SystemLink (from {item_name})")
-                    # --- End Handle Linked Objects ---
-                    break  # Item found and updated
-                else:  # State is already the new_state
-                    if config.SIMULATION_MODE == 'debug':
-                        print(
-                            f"[WorldState Info] Modify Item State: '{item_name}' in '{location_name}' is already '{new_state}'. No change by {triggered_by}.")
-                    item_found_and_updated = True  # Still counts as "found" for returning True
-                    break
+        item_data = self.get_item(location_name, item_name)
+        item_found_and_updated = item_data is not None  # Found counts even if the state is unchanged
+        if item_data is not None:
+            old_state = item_data.get("state")
+            if old_state != new_state:
+                self._own_location(location_name)
+                item_data = self.get_item(location_name, item_name)
+                item_data["state"] = new_state
+                self._invalidate_context(location_name, "items")
+
+                log_msg = f"The state of '{item_name}' in {location_name} changes from '{old_state}' to '{new_state}' (due to {triggered_by})."
+                self.log_event(
+                    description=log_msg,
+                    scope="local",
+                    location=location_name,
+                    triggered_by=triggered_by
+                )
+                if config.SIMULATION_MODE == 'debug':
+                    print(
+                        f"[WorldState Update] Modify Item State: '{item_name}' in '{location_name}' changed to '{new_state}' by {triggered_by}.")
+
+                # --- Handle Linked Objects (pointer resolved at load time) ---
+                linked = self.get_linked_item(location_name, item_name)
+                if linked is not None:
+                    linked_loc_name, linked_item_data = linked
+                    # The trigger is external (Director) and an unchanged state stops the
+                    # recursion, so bidirectional links terminate.
+                    self.modify_item_state(
+                        linked_loc_name, linked_item_data.get("object"), new_state, triggered_by=f"SystemLink (from {item_name})")
+                # --- End Handle Linked Objects ---
+            else:  # State is already the new_state
+                if config.SIMULATION_MODE == 'debug':
+                    print(
+                        f"[WorldState Info] Modify Item State: '{item_name}' in '{location_name}' is already '{new_state}'. No change by {triggered_by}.")
 
         if not item_found_and_updated and config.SIMULATION_MODE == 'debug':
             print(